@@ -4,14 +4,18 @@ pragma solidity ^0.8.0;
 import "@openzeppelin/contracts/access/Ownable.sol";
 import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
 import "@openzeppelin/contracts/security/ReentrancyGuard.sol";
+import "@openzeppelin/contracts/utils/math/SafeCast.sol";
 import "@chainlink/contracts/src/v0.8/interfaces/AggregatorV3Interface.sol";
 
 /// @author Colton Milbrandt
 /// @title Gwin, Risk-Tranche AMM
 contract GwinProtocol is Ownable, ReentrancyGuard {
-    // pool ID -> user address -> user balances struct
+    using SafeCast for uint256;
+    using SafeCast for int256;
+
+    // pool ID -> user address -> user shares struct, see retrieveCEthBalance for balances
     mapping(uint256 => mapping(address => Bal)) public ethStakedBalance;
-    // parentID -> user adddress -> user balances struct
+    // parentID -> user adddress -> user shares struct, see getParentUserCEthBalance for balances
     mapping(uint256 => mapping(address => ParentBal))
         public ethStakedWithParent;
     // token address -> staker address -> amount
@@ -20,6 +24,8 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
     mapping(address => uint256) public uniquePositions;
     // pool ID    ->   address  ->  isUnique
     mapping(uint256 => mapping(address => bool)) public isUniqueEthStaker;
+    // pool ID    ->   address  ->  index in ethStakers
+    mapping(uint256 => mapping(address => uint256)) public ethStakerIndex;
     // aggregator key -> aggregator
     mapping(bytes32 => AggregatorV3Interface) public aggregators;
     // aggreagator key -> feed decimals
@@ -28,14 +34,24 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
     bytes32[] public aggregatorKeys;
     //    pool ID --> struct
     mapping(uint256 => Pool) public pool;
+    //    pool ID --> last settlement of each pool
+    mapping(uint256 => Settlement) public lastSettlement;
+    //    pool ID --> total shares issued by each tranche
+    mapping(uint256 => PoolShares) public poolShares;
     //    pool ID --> parent pool
     mapping(uint256 => ParentPoolBal) public parentPoolBal;
     //    pool ID -> parent pool ID
     mapping(uint256 => uint256) public parentPoolId;
     // parent pool ID -> child pool IDs
     mapping(uint256 => Pool) public parentPoolChildren;
-    // pool ID --> array of ETH stakers
+    // pool ID --> array of ETH stakers with shares of the pool
     mapping(uint256 => address[]) public ethStakers;
+    // parent pool ID --> array of ETH stakers with cooled shares of the parent pool
+    mapping(uint256 => address[]) public parentEthStakers;
+    // parent pool ID -> address -> index in parentEthStakers
+    mapping(uint256 => mapping(address => uint256)) public parentEthStakerIndex;
+    // parent pool ID -> address -> isUnique
+    mapping(uint256 => mapping(address => bool)) public isUniqueParentEthStaker;
     // array of stakers
     address[] public stakers;
     // array of the allowed tokens
@@ -44,27 +60,37 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
     uint256[] public poolIds;
 
     // ********* Decimal Values *********
-    uint256 decimals = 10**18;
-    uint8 usdDecimalsUint = 8;
-    uint256 usdDecimals = 10**usdDecimalsUint;
-    uint256 bps = 10**12;
+    uint256 constant decimals = 10**18;
+    uint8 constant usdDecimalsUint = 8;
+    uint256 constant usdDecimals = 10**usdDecimalsUint;
+    uint256 constant bps = 10**12;
+
+    // ****** Pool Field Selectors ******
+    // bitmask of the computed PoolWithBalances fields to fill
+    uint256 public constant currentPriceField = 1;
+    uint256 public constant healthField = 2;
+    uint256 public constant balancePreviewField = 4;
+    uint256 public constant userPreviewField = 8;
+    uint256 public constant allFields = 15;
 
     // ************* Values *************
     uint256 newPoolId = 0;
 
     // ************* Structs *************
+    // packed into five storage slots, widen to uint256/int256 before multiplying
     struct Pool {
-        uint256 id;
-        uint256 parentId;
-        uint256 lastSettledUsdPrice;
-        uint256 currentUsdPrice;
+        uint64 id;
+        uint64 parentId;
+        uint64 lastSettledUsdPrice; // in usdDecimals
+        uint64 currentUsdPrice;
         bytes32 basePriceFeedKey;
         bytes32 quotePriceFeedKey;
-        uint256 hEthBal;
-        uint256 cEthBal;
-        int256 hRate;
-        int256 cRate;
+        uint128 hEthBal;
+        uint128 cEthBal;
+        int64 hRate;
+        int64 cRate;
         uint8 poolType; // as in classic (0) or modified (1)
+        uint64 cethPerHeth; // cEth per hEth target, fixed by the rates at initialization
     }
 
     struct PoolWithBalances {
@@ -87,24 +113,102 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         uint256 userHEthBalPreview;
     }
 
+    struct Settlement {
+        uint80 baseRoundId; // feed rounds the pool was last fully settled at
+        uint80 quoteRoundId;
+    }
+
+    struct PoolShares {
+        uint256 cShares;
+        uint256 hShares;
+        uint256 cEpoch; // incremented each time the tranche is liquidated
+        uint256 hEpoch;
+    }
+
     struct ParentPoolBal {
         uint256 cEthBal;
         uint256 hEthBal;
+        uint256 cShares;
+        uint256 cEpoch;
+        uint256 cEthNeeded; // sum of hEthBal * cethPerHeth over the child pools
         uint256[] childPoolIds;
     }
 
     struct Bal {
-        uint256 cBal;
-        uint256 cPercent;
-        uint256 hBal;
-        uint256 hPercent;
+        uint256 cShares;
+        uint256 hShares;
+        uint256 cEpoch; // shares from an older epoch were liquidated
+        uint256 hEpoch;
     }
 
     struct ParentBal {
-        uint256 cBal;
-        uint256 cPercent;
+        uint256 cShares;
+        uint256 cEpoch;
+    }
+
+    struct FeedRound {
+        bytes32 baseKey; // zero for an unused slot
+        bytes32 quoteKey;
+        uint256 price;
+        uint80 baseRoundId;
+        uint80 quoteRoundId;
+    }
+
+    struct TrancheAction {
+        uint256 poolId;
+        bool isDeposit; // deposit if true, withdrawal if false
+        bool isCooled;
+        bool isHeated;
+        uint256 cAmount;
+        uint256 hAmount;
+        bool isAll; // withdraw all of the selected tranches, ignored for deposits
     }
 
+    // ************* Events *************
+    event PoolInitialized(
+        uint256 indexed poolId,
+        uint256 indexed parentId,
+        address indexed creator,
+        uint8 poolType,
+        bytes32 basePriceFeedKey,
+        bytes32 quotePriceFeedKey,
+        int256 cRate,
+        int256 hRate,
+        uint256 cEthBal,
+        uint256 hEthBal
+    );
+    event Deposit(
+        uint256 indexed poolId,
+        address indexed user,
+        uint256 cAmount,
+        uint256 hAmount
+    );
+    event Withdraw(
+        uint256 indexed poolId,
+        address indexed user,
+        uint256 cAmount,
+        uint256 hAmount
+    );
+    event Settled(
+        uint256 indexed poolId,
+        uint256 lastSettledUsdPrice,
+        uint256 currentUsdPrice,
+        uint256 cEthBal,
+        uint256 hEthBal
+    );
+    event ChildPoolsRebalanced(
+        uint256 indexed parentId,
+        uint256 cEthBal,
+        uint256 cEthNeeded
+    );
+    // parentId is set when the cooled tranche of the parent pool was liquidated
+    event TrancheLiquidated(
+        uint256 indexed poolId,
+        uint256 indexed parentId,
+        bool isCooled,
+        uint256 epoch
+    );
+
     IERC20 public gwinToken;
 
     constructor(address _gwinTokenAddress, address _link) public {
@@ -132,7 +236,7 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         int256 _hRate
     ) external payable returns (uint256) {
         poolIds.push(newPoolId);
-        pool[newPoolId].id = newPoolId;
+        pool[newPoolId].id = newPoolId.toUint64();
         pool[newPoolId].poolType = _type;
         require(
             pool[newPoolId].cEthBal == 0 && pool[newPoolId].hEthBal == 0,
@@ -140,13 +244,12 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         );
         require(_cRate < 0 && _hRate > 0, "Rates_Must_Oppose"); // rates should be opposite to function
         // add depositor to ethStakers[]
-        if (isUniqueEthStaker[newPoolId][msg.sender] == false) {
-            ethStakers[newPoolId].push(msg.sender);
-            isUniqueEthStaker[newPoolId][msg.sender] = true;
-        }
+        addToArray(newPoolId, msg.sender);
         // set cooled rate and heated rate (leverage)
-        pool[newPoolId].cRate = _cRate;
-        pool[newPoolId].hRate = _hRate;
+        pool[newPoolId].cRate = _cRate.toInt64();
+        pool[newPoolId].hRate = _hRate.toInt64();
+        pool[newPoolId].cethPerHeth = uint256(abs(_hRate) / abs(_cRate))
+            .toUint64();
         // set bytes32 keys/labels for price feeds
         pool[newPoolId].basePriceFeedKey = _baseCurrencyKey;
         pool[newPoolId].quotePriceFeedKey = _quoteCurrencyKey;
@@ -164,11 +267,11 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
             cDepositAmount = (msg.value * uint256(cEthPercent)) / bps;
             hDepositAmount = msg.value - cDepositAmount;
         }
-        // track deposit amounts and set weight
-        ethStakedBalance[newPoolId][msg.sender].hBal += hDepositAmount;
-        ethStakedBalance[newPoolId][msg.sender].hPercent = bps;
-        pool[newPoolId].hEthBal = hDepositAmount;
-        pool[newPoolId].cEthBal = cDepositAmount;
+        // track deposit amounts, first deposit issues shares 1:1 with Wei
+        ethStakedBalance[newPoolId][msg.sender].hShares += hDepositAmount;
+        poolShares[newPoolId].hShares = hDepositAmount;
+        pool[newPoolId].hEthBal = hDepositAmount.toUint128();
+        pool[newPoolId].cEthBal = cDepositAmount.toUint128();
         pool[newPoolId].parentId = _parentId;
         parentPoolId[newPoolId] = _parentId;
         // add price feed(s)
@@ -177,28 +280,40 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
             addAggregator(_quoteCurrencyKey, _quotePriceFeedAddress);
         }
         // initialize current price and last price values
-        pool[newPoolId].currentUsdPrice = retrieveCurrentPrice(newPoolId);
+        pool[newPoolId].currentUsdPrice = retrieveCurrentPrice(newPoolId)
+            .toUint64();
         pool[newPoolId].lastSettledUsdPrice = pool[newPoolId].currentUsdPrice;
         if (_parentId != 0) {
-            // set parent pool balances and weights
+            uint256 childCount = parentPoolBal[_parentId].childPoolIds.length;
+            if (childCount > 0) {
+                // settle the existing child pools so shares are issued against the current parent balance
+                interactByPool(parentPoolBal[_parentId].childPoolIds[0]);
+                // cancel user shares in any tranche that was zeroed by the price change
+                for (uint256 i = 0; i < childCount; i++) {
+                    liquidateIfZero(parentPoolBal[_parentId].childPoolIds[i]);
+                }
+            }
+            // issue parent pool shares, then set parent pool balances
+            issueParentCooledShares(_parentId, msg.sender, cDepositAmount);
+            if (cDepositAmount > 0) {
+                addToParentArray(_parentId, msg.sender);
+            }
             parentPoolBal[_parentId].childPoolIds.push(newPoolId);
             parentPoolBal[_parentId].cEthBal += cDepositAmount;
             parentPoolBal[_parentId].hEthBal += hDepositAmount;
-            ethStakedWithParent[_parentId][msg.sender].cBal += cDepositAmount;
-            ethStakedWithParent[_parentId][msg.sender].cPercent =
-                (ethStakedWithParent[_parentId][msg.sender].cBal * bps) /
-                parentPoolBal[_parentId].cEthBal;
+            parentPoolBal[_parentId].cEthNeeded +=
+                hDepositAmount *
+                pool[newPoolId].cethPerHeth;
             if (parentPoolBal[_parentId].childPoolIds.length > 1) {
-                // Re-Adjust user percentages
-                reAdjust(newPoolId, false, true, false);
                 // Balance allocations optimally to child pools
                 reAdjustChildPools(newPoolId);
             }
         } else {
-            // if not using a cooled parent pool, track cooled balances for each pool
-            ethStakedBalance[newPoolId][msg.sender].cBal += cDepositAmount;
-            ethStakedBalance[newPoolId][msg.sender].cPercent = bps;
+            // if not using a cooled parent pool, track cooled shares for each pool
+            ethStakedBalance[newPoolId][msg.sender].cShares += cDepositAmount;
+            poolShares[newPoolId].cShares = cDepositAmount;
         }
+        emitPoolInitialized(newPoolId);
         newPoolId++;
         return newPoolId - 1;
     }
@@ -223,51 +338,19 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         require(msg.value > 0, "Amount must be greater than zero.");
         require(_isCooled == true || _isHeated == true);
         require(_cAmount + _hAmount <= msg.value);
-        uint256 parentId = parentPoolId[_poolId];
 
         // Interact to rebalance Tranches with new price feed value
         interactByPool(_poolId);
-        // Re-adjust to update user balances after price change
-        reAdjust(_poolId, true, _isCooled, _isHeated);
-        // Deposit ETH
+        // Cancel user shares in any tranche that was zeroed by the price change
+        liquidateIfZero(_poolId);
+        // Deposit ETH, a single tranche deposit takes the full msg.value
         if (_isCooled == true && _isHeated == false) {
-            pool[_poolId].cEthBal += msg.value;
-            if (parentPoolId[_poolId] != 0) {
-                // add to parent balance
-                ethStakedWithParent[parentId][msg.sender].cBal += msg.value;
-                parentPoolBal[parentId].cEthBal += msg.value;
-            } else {
-                ethStakedBalance[_poolId][msg.sender].cBal += msg.value;
-            }
+            depositAmounts(_poolId, msg.value, 0);
         } else if (_isCooled == false && _isHeated == true) {
-            pool[_poolId].hEthBal += msg.value;
-            ethStakedBalance[_poolId][msg.sender].hBal += msg.value;
-            if (parentPoolId[_poolId] != 0) {
-                // add to parent balance
-                parentPoolBal[parentId].hEthBal += msg.value;
-            }
+            depositAmounts(_poolId, 0, msg.value);
         } else {
-            pool[_poolId].cEthBal += _cAmount;
-            if (parentPoolId[_poolId] != 0) {
-                // add to parent balance
-                ethStakedWithParent[parentId][msg.sender].cBal += _cAmount;
-                parentPoolBal[parentId].cEthBal += _cAmount;
-            } else {
-                ethStakedBalance[_poolId][msg.sender].cBal += _cAmount;
-            }
-            ethStakedBalance[_poolId][msg.sender].hBal += _hAmount;
-            pool[_poolId].hEthBal += _hAmount;
-            if (parentPoolId[_poolId] != 0) {
-                // add to parent balance
-                parentPoolBal[parentId].hEthBal += _hAmount;
-            }
+            depositAmounts(_poolId, _cAmount, _hAmount);
         }
-        if (isUniqueEthStaker[_poolId][msg.sender] == false) {
-            ethStakers[_poolId].push(msg.sender);
-            isUniqueEthStaker[_poolId][msg.sender] = true;
-        }
-        // Re-Adjust user percentages
-        reAdjust(_poolId, false, _isCooled, _isHeated);
         // Re-Adjust all cooled child pool weights optimally
         reAdjustChildPools(_poolId);
     }
@@ -292,87 +375,93 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
             require(_cAmount > 0 || _hAmount > 0, "Zero_Withdrawal_Amount");
         }
         require(_isCooled == true || _isHeated == true);
-        uint256 parentId = parentPoolId[_poolId];
 
         // Interact to rebalance Tranches with new price feed value
         interactByPool(_poolId);
-        // Re-adjust the user balances based on price change
-        reAdjust(_poolId, true, _isCooled, _isHeated);
+        // Cancel user shares in any tranche that was zeroed by the price change
+        liquidateIfZero(_poolId);
+        uint256 amount = withdrawAmounts(
+            _poolId,
+            _isCooled,
+            _isHeated,
+            _cAmount,
+            _hAmount,
+            _isAll
+        );
+        // Re-Adjust all cooled child pool weights optimally
+        reAdjustChildPools(_poolId);
+        if (amount > 0) {
+            payable(msg.sender).transfer(amount);
+        }
+    }
 
-        // if withdrawing all, set amount according to pool or parent pool user balance
-        if (_isAll == true) {
-            if (_isCooled == true) {
-                if (parentPoolId[_poolId] != 0) {
-                    _cAmount = ethStakedWithParent[parentId][msg.sender].cBal;
-                    require(
-                        _cAmount <=
-                            ethStakedWithParent[parentId][msg.sender].cBal,
-                        "Insufficient_User_Funds"
-                    );
-                } else {
-                    _cAmount = ethStakedBalance[_poolId][msg.sender].cBal;
-                    require(
-                        _cAmount <= ethStakedBalance[_poolId][msg.sender].cBal,
-                        "Insufficient_User_Funds"
-                    );
-                }
-            }
-            if (_isHeated == true) {
-                _hAmount = ethStakedBalance[_poolId][msg.sender].hBal;
-                require(
-                    _hAmount <= ethStakedBalance[_poolId][msg.sender].hBal,
-                    "Insufficient_User_Funds"
-                );
+    /// @notice Deposit to and withdraw from the tranches of several pools in one transaction
+    /// @dev Each pool, or parent pool of child pools, is settled once before the actions and rebalanced once after them
+    /// @param _actions The deposits and withdrawals, applied in order, deposits must add up to msg.value
+    function batchTrancheActions(TrancheAction[] calldata _actions)
+        external
+        payable
+        nonReentrant
+    {
+        uint256[] memory parentIds = new uint256[](_actions.length);
+        // Interact once per pool or parent pool, then cancel shares in any zeroed tranche
+        for (uint256 i = 0; i < _actions.length; i++) {
+            require(
+                pool[_actions[i].poolId].basePriceFeedKey != 0x0,
+                "Pool_Is_Not_Initialized"
+            );
+            parentIds[i] = parentPoolId[_actions[i].poolId];
+            if (firstActionInGroup(_actions, parentIds, i)) {
+                interactByPool(_actions[i].poolId);
             }
+            liquidateIfZero(_actions[i].poolId);
         }
-        // Withdraw ETH
-        if (_cAmount > 0 && _hAmount > 0) {
-            // Cooled and Heated
-            pool[_poolId].cEthBal -= _cAmount;
-            if (parentPoolId[_poolId] != 0) {
-                // deduct from parent balance
-                ethStakedWithParent[parentId][msg.sender].cBal -= _cAmount;
-                parentPoolBal[parentId].cEthBal -= _cAmount;
-            } else {
-                ethStakedBalance[_poolId][msg.sender].cBal -= _cAmount;
-            }
-            ethStakedBalance[_poolId][msg.sender].hBal -= _hAmount;
-            if (parentPoolId[_poolId] != 0) {
-                parentPoolBal[parentId].hEthBal -= _hAmount;
-            }
-            pool[_poolId].hEthBal -= _hAmount;
-            payable(msg.sender).transfer(_cAmount + _hAmount);
-        } else {
-            // Either Cooled or Heated
-            if (_cAmount > 0) {
-                // Cooled, No Heated
-                if (parentPoolId[_poolId] != 0) {
-                    // deduct from user's parent balance
-                    ethStakedWithParent[parentId][msg.sender].cBal -= _cAmount;
-                    // deduct from parent balance
-                    parentPoolBal[parentId].cEthBal -= _cAmount;
-                } else {
-                    // deduct from user's pool balance
-                    ethStakedBalance[_poolId][msg.sender].cBal -= _cAmount;
-                    // adjust singular pool cEth bal ONLY IF not part of parent pool
-                    pool[_poolId].cEthBal -= _cAmount;
-                }
-                payable(msg.sender).transfer(_cAmount);
-            } else if (_hAmount > 0) {
-                // Heated, No Cooled
-                ethStakedBalance[_poolId][msg.sender].hBal -= _hAmount;
-                if (parentPoolId[_poolId] != 0) {
-                    parentPoolBal[parentId].hEthBal -= _hAmount;
-                }
-                pool[_poolId].hEthBal -= _hAmount;
-                payable(msg.sender).transfer(_hAmount);
+        uint256 deposited;
+        uint256 withdrawn;
+        for (uint256 i = 0; i < _actions.length; i++) {
+            (uint256 depositAmount, uint256 withdrawAmount) = applyTrancheAction(
+                _actions[i]
+            );
+            deposited += depositAmount;
+            withdrawn += withdrawAmount;
+        }
+        require(deposited == msg.value, "Deposits_Must_Equal_Value");
+        // Re-Adjust the cooled child pool weights of each parent once
+        for (uint256 i = 0; i < _actions.length; i++) {
+            if (
+                parentIds[i] != 0 && firstActionInGroup(_actions, parentIds, i)
+            ) {
+                reAdjustChildPools(_actions[i].poolId);
             }
         }
+        if (withdrawn > 0) {
+            payable(msg.sender).transfer(withdrawn);
+        }
+    }
 
-        // Re-Adjust user percentages
-        reAdjust(_poolId, false, _isCooled, _isHeated);
-        // Re-Adjust all cooled child pool weights optimally
-        reAdjustChildPools(_poolId);
+    /// @notice Settle a list of pools ahead of user interactions, open to anyone such as a keeper
+    /// @dev Pools already settled at the current feed rounds are skipped, child pools settle with their parent
+    /// @param _poolIds The IDs of the pools to settle
+    /// @return settledCount uint256 The number of pools that were not yet settled and were settled
+    function settlePools(uint256[] calldata _poolIds)
+        external
+        returns (uint256 settledCount)
+    {
+        for (uint256 i = 0; i < _poolIds.length; i++) {
+            require(
+                pool[_poolIds[i]].basePriceFeedKey != 0x0,
+                "Pool_Is_Not_Initialized"
+            );
+            if (isSettledAtCurrentRound(_poolIds[i])) {
+                continue;
+            }
+            // Interact to rebalance Tranches with new price feed value
+            interactByPool(_poolIds[i]);
+            // Re-Adjust all cooled child pool weights optimally
+            reAdjustChildPools(_poolIds[i]);
+            settledCount++;
+        }
+        return settledCount;
     }
 
     // Public functions
@@ -393,11 +482,17 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
             _poolId,
             retrieveCurrentPrice(_poolId)
         );
-        // derive user balance by percent pool ownership
-        uint256 userHeatedBalance = (heatedBalance *
-            ethStakedBalance[_poolId][msg.sender].hPercent) / bps;
-        uint256 userCooledBalance = (cooledBalance *
-            ethStakedBalance[_poolId][msg.sender].cPercent) / bps;
+        // derive user balance by share of pool ownership
+        uint256 userHeatedBalance = shareOfBalance(
+            heatedBalance,
+            userHeatedShares(_poolId, msg.sender),
+            poolShares[_poolId].hShares
+        );
+        uint256 userCooledBalance = shareOfBalance(
+            cooledBalance,
+            userCooledShares(_poolId, msg.sender),
+            poolShares[_poolId].cShares
+        );
         return (userHeatedBalance, userCooledBalance);
     }
 
@@ -408,48 +503,30 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         public
         view
         returns (uint256)
+    {
+        (uint256 price, , ) = retrieveCurrentRound(_poolId);
+        return price;
+    }
+
+    /// @notice Get the current price from feed along with the feed rounds it was read from
+    /// @dev Uses the feed decimals cached when the aggregator was added
+    /// @param _poolId The ID of the target pool
+    /// @return uint256 Current price from Chainlink price feed
+    /// @return uint80 Round ID of the base price feed
+    /// @return uint80 Round ID of the quote price feed, or 0 if there is none
+    function retrieveCurrentRound(uint256 _poolId)
+        public
+        view
+        returns (
+            uint256,
+            uint80,
+            uint80
+        )
     {
         // pool's priceFeedAddress is fed into the AggregatorV3Interface
-        require(
-            pool[_poolId].basePriceFeedKey != 0x0,
-            "Pool_Is_Not_Initialized"
-        );
-        int256 price;
-        if (pool[_poolId].quotePriceFeedKey == 0x0) {
-            bytes32 aggregatorKey = pool[_poolId].basePriceFeedKey;
-            address aggregatorAddress = address(aggregators[aggregatorKey]);
-            AggregatorV3Interface priceFeed = AggregatorV3Interface(
-                aggregatorAddress
-            );
-            (
-                ,
-                /*uint80 roundID*/
-                price, /*uint startedAt*/ /*uint timeStamp*/ /*uint80 answeredInRound*/
-                ,
-                ,
-
-            ) = priceFeed.latestRoundData();
-            // set number of decimals for token value
-            uint256 priceFeedDecimals = 10**priceFeed.decimals();
-            uint256 decimalDifference;
-            if (priceFeedDecimals > usdDecimals) {
-                // convert to native decimals for math
-                decimalDifference = priceFeedDecimals / usdDecimals;
-                price = price / int256(decimalDifference);
-            } else if (priceFeedDecimals < usdDecimals) {
-                decimalDifference = usdDecimals / priceFeedDecimals;
-                price = price * int256(decimalDifference);
-            }
-            // return token price
-            return uint256(price);
-        } else {
-            price = getDerivedPrice(
-                address(aggregators[pool[_poolId].basePriceFeedKey]),
-                address(aggregators[pool[_poolId].quotePriceFeedKey]),
-                uint8(usdDecimalsUint)
-            );
-            return uint256(price);
-        }
+        bytes32 baseKey = pool[_poolId].basePriceFeedKey;
+        require(baseKey != 0x0, "Pool_Is_Not_Initialized");
+        return roundOfFeeds(baseKey, pool[_poolId].quotePriceFeedKey);
     }
 
     /// @notice Get derived price based on dual price feeds
@@ -494,7 +571,13 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (uint256)
     {
-        return ethStakedBalance[_poolId][_user].cPercent;
+        // derive percent by share of pool ownership
+        return
+            shareOfBalance(
+                bps,
+                userCooledShares(_poolId, _user),
+                poolShares[_poolId].cShares
+            );
     }
 
     /// @notice Get user last settled percent of single hEth pool
@@ -504,7 +587,13 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (uint256)
     {
-        return ethStakedBalance[_poolId][_user].hPercent;
+        // derive percent by share of pool ownership
+        return
+            shareOfBalance(
+                bps,
+                userHeatedShares(_poolId, _user),
+                poolShares[_poolId].hShares
+            );
     }
 
     /// @notice Get user last settled balance in single cEth pool
@@ -514,7 +603,13 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (uint256)
     {
-        return ethStakedBalance[_poolId][_user].cBal;
+        // derive balance by share of pool ownership
+        return
+            shareOfBalance(
+                pool[_poolId].cEthBal,
+                userCooledShares(_poolId, _user),
+                poolShares[_poolId].cShares
+            );
     }
 
     /// @notice Get user last settled balance in single hEth pool
@@ -524,10 +619,13 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (uint256)
     {
-        // derive balance by percent
-        uint256 perc = retrieveHEthPercentBalance(_poolId, _user);
-        uint256 bal = retrieveProtocolHEthBalance(_poolId);
-        return (bal * perc) / bps;
+        // derive balance by share of pool ownership
+        return
+            shareOfBalance(
+                pool[_poolId].hEthBal,
+                userHeatedShares(_poolId, _user),
+                poolShares[_poolId].hShares
+            );
     }
 
     // USER - address at index of stakers array
@@ -543,6 +641,29 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         return ethStakers[_poolId][_index];
     }
 
+    /// @notice Get the number of addresses with an open position in a pool
+    /// @dev Cooled positions of a child pool are held with its parent pool, see retrieveParentEthStakersLength
+    /// @param _poolId The pool ID target
+    /// @return uint256 length of stakers array
+    function retrieveEthStakersLength(uint256 _poolId)
+        public
+        view
+        returns (uint256)
+    {
+        return ethStakers[_poolId].length;
+    }
+
+    /// @notice Get the number of addresses with a cooled position in a parent pool
+    /// @param _parentId The parent pool ID target
+    /// @return uint256 length of parent pool stakers array
+    function retrieveParentEthStakersLength(uint256 _parentId)
+        public
+        view
+        returns (uint256)
+    {
+        return parentEthStakers[_parentId].length;
+    }
+
     /// @notice Get balance of cEth pool
     /// @param _poolId The pool ID
     /// @return uint256 The balance of cEth pool
@@ -563,9 +684,13 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (uint256)
     {
-        uint256 perc = getParentUserCEthPercent(_poolId, _user);
-        uint256 bal = getParentPoolCEthBalance(_poolId);
-        return (bal * perc) / bps;
+        uint256 parentId = parentPoolId[_poolId];
+        return
+            shareOfBalance(
+                parentPoolBal[parentId].cEthBal,
+                userParentCooledShares(parentId, _user),
+                parentPoolBal[parentId].cShares
+            );
     }
 
     /// @notice Get user percent ownership of parent pool
@@ -578,7 +703,12 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         returns (uint256)
     {
         uint256 parentId = parentPoolId[_poolId];
-        return ethStakedWithParent[parentId][_user].cPercent;
+        return
+            shareOfBalance(
+                bps,
+                userParentCooledShares(parentId, _user),
+                parentPoolBal[parentId].cShares
+            );
     }
 
     /// @notice Get cEth balance in parent pool
@@ -662,10 +792,13 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         uint256 hEthBalEst;
         uint256 cEthBalEst;
         (hEthBalEst, cEthBalEst) = previewPoolBalancesAtPrice(_poolId, _price);
-        // Percents provide accurate balance
-        uint256 perc = retrieveCEthPercentBalance(_poolId, _user);
-        uint256 bal = cEthBalEst;
-        return (bal * perc) / bps;
+        // Shares provide accurate balance
+        return
+            shareOfBalance(
+                cEthBalEst,
+                userCooledShares(_poolId, _user),
+                poolShares[_poolId].cShares
+            );
     }
 
     /// @notice Get user hEth balance preview at current price
@@ -717,10 +850,13 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         uint256 hEthBalEst;
         uint256 cEthBalEst;
         (hEthBalEst, cEthBalEst) = previewPoolBalancesAtPrice(_poolId, _price);
-        // Percents provide accurate balance
-        uint256 perc = retrieveHEthPercentBalance(_poolId, _user);
-        uint256 bal = hEthBalEst;
-        return (bal * perc) / bps;
+        // Shares provide accurate balance
+        return
+            shareOfBalance(
+                hEthBalEst,
+                userHeatedShares(_poolId, _user),
+                poolShares[_poolId].hShares
+            );
     }
 
     /// @notice Get user cEth balance preview at selected price
@@ -733,9 +869,13 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         uint256 _price,
         address _user
     ) public view returns (uint256) {
-        uint256 perc = getParentUserCEthPercent(_poolId, _user);
-        uint256 bal = getEstCEthInParentPool(_poolId, _price);
-        return (bal * perc) / bps;
+        uint256 parentId = parentPoolId[_poolId];
+        return
+            shareOfBalance(
+                getEstCEthInParentPool(_poolId, _price),
+                userParentCooledShares(parentId, _user),
+                parentPoolBal[parentId].cShares
+            );
     }
 
     /// @notice Get user's parent pool cEth Bal
@@ -747,8 +887,7 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (uint256)
     {
-        uint256 parentId = parentPoolId[_poolId];
-        return ethStakedWithParent[parentId][_user].cBal;
+        return getParentUserCEthBalance(_poolId, _user);
     }
 
     /// @notice Get pool cEth balance preview
@@ -819,28 +958,12 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (uint256)
     {
-        uint256 health;
         // get the hEthBal and cEthBal previews for the pool
         (uint256 hEthBalPreview, uint256 cEthBalPreview) = previewPoolBalances(
             _poolId
         );
-        if (cEthBalPreview == 0 || hEthBalPreview == 0) {
-            return 0;
-        }
-        // calculate expected cEth percent of paired pools
-        int256 cEthPercent = (abs(pool[_poolId].hRate) * int256(bps)) /
-            (abs(pool[_poolId].hRate) + abs(pool[_poolId].cRate));
-        // calculate actual cEth percent of paired pools
-        uint256 cooledRatio = ((cEthBalPreview * bps) /
-            (cEthBalPreview + hEthBalPreview));
-        if (_isCooled == true) {
-            //            expected         actual
-            health = (uint256(cEthPercent) * 100) / cooledRatio;
-        } else {
-            //          actual          expected
-            health = (cooledRatio * 100) / uint256(cEthPercent);
-        }
-        return health;
+        return
+            poolHealth(pool[_poolId], hEthBalPreview, cEthBalPreview, _isCooled);
     }
 
     /// @notice Get an array of all the Pool structs that exist
@@ -859,52 +982,37 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
     function getAllPoolsWithBalances(address _user)
         public
         view
-        returns (PoolWithBalances[] memory poolsWithBalances)
+        returns (PoolWithBalances[] memory)
     {
-        Pool[] memory pools = getAllPools();
-        poolsWithBalances = new PoolWithBalances[](pools.length);
-        for (uint256 i = 0; i < pools.length; i++) {
-            // get the hEthBal and cEthBal previews for the pool[i]
-            (
-                uint256 hEthBalPreview,
-                uint256 cEthBalPreview
-            ) = previewPoolBalances(pools[i].id);
-            poolsWithBalances[i].id = pools[i].id;
-            poolsWithBalances[i].parentId = pools[i].parentId;
-            poolsWithBalances[i].lastSettledUsdPrice = pools[i]
-                .lastSettledUsdPrice;
-            poolsWithBalances[i].currentPrice = retrieveCurrentPrice(
-                pools[i].id
-            );
-            poolsWithBalances[i].basePriceFeedKey = pools[i].basePriceFeedKey;
-            poolsWithBalances[i].quotePriceFeedKey = pools[i].quotePriceFeedKey;
-            poolsWithBalances[i].hEthBal = pools[i].hEthBal;
-            poolsWithBalances[i].cEthBal = pools[i].cEthBal;
-            poolsWithBalances[i].hRate = pools[i].hRate;
-            poolsWithBalances[i].cRate = pools[i].cRate;
-            poolsWithBalances[i].hHealth = getPoolHealth(pools[i].id, false);
-            poolsWithBalances[i].cHealth = getPoolHealth(pools[i].id, true);
-            poolsWithBalances[i].poolType = pools[i].poolType;
-            poolsWithBalances[i].cBalancePreview = cEthBalPreview;
-            poolsWithBalances[i].hBalancePreview = hEthBalPreview;
-            if (pools[i].parentId != 0) {
-                // if pool has a parent pool, get cEth balance for user in parent pool (sum of all children)
-                poolsWithBalances[i]
-                    .userCEthBalPreview = previewParentUserCEthBalance(
-                    pools[i].id,
-                    _user
-                );
-            } else {
-                // if pool has no parent pool, get cEth balance for user in single pool
-                poolsWithBalances[i]
-                    .userCEthBalPreview = previewUserCEthBalance(
-                    pools[i].id,
-                    _user
-                );
-            }
-            poolsWithBalances[i].userHEthBalPreview = previewUserHEthBalance(
-                pools[i].id,
-                _user
+        return getPoolsWithBalances(_user, 0, poolIds.length, allFields);
+    }
+
+    /// @notice Get a page of Pool structs with balances, only filling the computed fields requested
+    /// @dev Each pool is simulated once, the health and user fields reuse that preview
+    /// @param _user The user's address for the user balance previews
+    /// @param _offset The index in poolIds of the first pool returned
+    /// @param _limit The maximum number of pools returned
+    /// @param _fields Bitmask of currentPriceField, healthField, balancePreviewField and userPreviewField
+    /// @return poolsWithBalances PoolWithBalances[] memory array of the requested pools
+    function getPoolsWithBalances(
+        address _user,
+        uint256 _offset,
+        uint256 _limit,
+        uint256 _fields
+    ) public view returns (PoolWithBalances[] memory poolsWithBalances) {
+        if (_offset >= poolIds.length) {
+            return new PoolWithBalances[](0);
+        }
+        uint256 count = poolIds.length - _offset;
+        if (_limit < count) {
+            count = _limit;
+        }
+        poolsWithBalances = new PoolWithBalances[](count);
+        for (uint256 i = 0; i < count; i++) {
+            poolsWithBalances[i] = poolWithBalances(
+                poolIds[_offset + i],
+                _user,
+                _fields
             );
         }
         return poolsWithBalances;
@@ -920,10 +1028,7 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (int256)
     {
-        int256 profit = ((int256(_currentUsdPrice) -
-            int256(pool[_poolId].lastSettledUsdPrice)) * int256(bps)) /
-            int256(pool[_poolId].lastSettledUsdPrice);
-        return profit;
+        return profitAtPrice(pool[_poolId].lastSettledUsdPrice, _currentUsdPrice);
     }
 
     //@@  SIMULATE INTERACT  @@// - view only of simulated rebalance of the cooled and heated tranches
@@ -932,53 +1037,7 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         view
         returns (uint256, uint256)
     {
-        int256 assetUsdProfit = getProfit(_poolId, _simAssetUsd); // returns ETH/USD profit in terms of basis points
-        if (assetUsdProfit == 0) {
-            // if price hasn't changed, balances have not changed
-            return (pool[_poolId].hEthBal, pool[_poolId].cEthBal);
-        }
-        if (bothPoolsHaveBalance(_poolId) == false) {
-            // skip if there is not opposing balances to settle
-            return (pool[_poolId].hEthBal, pool[_poolId].cEthBal);
-        }
-
-        // find expected return and use it to calculate allocation difference for each tranche
-        (
-            int256 cooledAllocationDiff,
-            int256 cooledChange,
-            uint256 nonNaturalMultiplier
-        ) = trancheSpecificCalcs(_poolId, true, assetUsdProfit, _simAssetUsd);
-        (
-            int256 heatedAllocationDiff,
-            int256 heatedChange,
-
-        ) = trancheSpecificCalcs(_poolId, false, assetUsdProfit, _simAssetUsd);
-        // use allocation differences to figure the absolute allocation total
-        uint256 absAllocationTotal;
-        {
-            // scope to avoid 'stack too deep' error
-            int256 absHeatedAllocationDiff = abs(heatedAllocationDiff);
-            int256 absCooledAllocationDiff = abs(cooledAllocationDiff);
-            int256 minAbsAllocation = absCooledAllocationDiff >
-                absHeatedAllocationDiff
-                ? absHeatedAllocationDiff
-                : absCooledAllocationDiff;
-            int256 nonNaturalDifference = heatedAllocationDiff +
-                cooledAllocationDiff;
-
-            uint256 adjNonNaturalDiff = (uint256(abs(nonNaturalDifference)) *
-                nonNaturalMultiplier) / bps;
-            absAllocationTotal = uint256(minAbsAllocation) + adjNonNaturalDiff;
-        }
-
-        return
-            simulateReallocate(
-                _poolId,
-                _simAssetUsd,
-                cooledChange,
-                cooledAllocationDiff,
-                absAllocationTotal
-            ); // reallocate the protocol ETH according to price movement
+        return simulatePool(pool[_poolId], _simAssetUsd);
     }
 
     /// @notice Shows the estimated price movement of a position
@@ -993,45 +1052,80 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         bool _isCooled,
         bool _isAll
     ) public view returns (int256[] memory) {
-        uint256 assetUsdPrice = retrieveCurrentPrice(_poolId);
-        // set bottom range of percents
-        int256 currentPercent = -50_0000000000;
-        int256 assetUsdAtIndex;
+        (
+            uint256[] memory hEthEsts,
+            uint256[] memory cEthEsts
+        ) = getRangeOfReturnsAtResolution(
+                _poolId,
+                _address,
+                11,
+                -50_0000000000,
+                50_0000000000
+            );
         // create array to record values at different prices
         int256[] memory estBals = new int256[](11);
         for (uint256 index = 0; index < 11; index++) {
-            // use percent change to get simulated price feed value at index
-            assetUsdAtIndex =
-                (int256(assetUsdPrice) * (int256(bps) + currentPercent)) /
-                int256(bps);
-            // simulate interact to preview settled balances
-            uint256 hBalEst;
-            uint256 cBalEst;
-            (hBalEst, cBalEst) = simulateInteract(
-                _poolId,
-                uint256(assetUsdAtIndex)
-            );
             // calculate estimated balance at price feed value
             uint256 balanceRequested;
             if (_isCooled == false || _isAll == true) {
-                balanceRequested =
-                    (hBalEst * ethStakedBalance[_poolId][_address].hPercent) /
-                    bps;
+                balanceRequested = hEthEsts[index];
             }
             if (_isCooled == true || _isAll == true) {
-                balanceRequested +=
-                    (cBalEst * ethStakedBalance[_poolId][_address].cPercent) /
-                    bps;
+                balanceRequested += cEthEsts[index];
             }
             // record estimated balance at price
             estBals[index] = int256(balanceRequested);
-            // increment percent by 10%
-            currentPercent += 10_0000000000;
         }
         // return array of estimated balance at different prices
         return (estBals);
     }
 
+    /// @notice Shows the estimated hEth and cEth balances of a user over a range of price movements
+    /// @dev The pool, price feeds and user shares are read once, every point is simulated in memory
+    /// @param _poolId The pool ID
+    /// @param _address The address to get the user balance estimates of
+    /// @param _points The number of evenly spaced prices to estimate, including both ends
+    /// @param _minPercent The lowest price change in basis points, i.e. -50_0000000000 for -50%
+    /// @param _maxPercent The highest price change in basis points, i.e. 50_0000000000 for +50%
+    /// @return hEthEsts uint256[] memory estimated hEth balances from the lowest to the highest price
+    /// @return cEthEsts uint256[] memory estimated cEth balances from the lowest to the highest price
+    function getRangeOfReturnsAtResolution(
+        uint256 _poolId,
+        address _address,
+        uint256 _points,
+        int256 _minPercent,
+        int256 _maxPercent
+    )
+        public
+        view
+        returns (uint256[] memory hEthEsts, uint256[] memory cEthEsts)
+    {
+        require(_points > 1, "Invalid_Resolution");
+        require(
+            _minPercent > -int256(bps) && _minPercent <= _maxPercent,
+            "Invalid_Range"
+        );
+        (hEthEsts, cEthEsts) = poolBalancesOverRange(
+            pool[_poolId],
+            retrieveCurrentPrice(_poolId),
+            _points,
+            _minPercent,
+            _maxPercent
+        );
+        // scale the pool estimates down to the user's shares
+        scaleToShares(
+            hEthEsts,
+            userHeatedShares(_poolId, _address),
+            poolShares[_poolId].hShares
+        );
+        scaleToShares(
+            cEthEsts,
+            userCooledShares(_poolId, _address),
+            poolShares[_poolId].cShares
+        );
+        return (hEthEsts, cEthEsts);
+    }
+
     // Internal functions
 
     /// @notice Scales the price to desired decimals
@@ -1056,188 +1150,815 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
 
     /// @notice rebalances the cooled and heated tranches/pools based on price movement
     /// @param _poolId The poolID of the targeted pool
-    function interact(uint256 _poolId) private {
-        // get current price to determine profit
-        uint256 currentAssetUsd = retrieveCurrentPrice(_poolId);
-        pool[_poolId].currentUsdPrice = currentAssetUsd;
-        int256 assetUsdProfit = getProfit(_poolId, currentAssetUsd); // returns ETH/USD profit in terms of basis points
-        if (assetUsdProfit == 0) {
-            // if price hasn't changed, balances have not changed
-            return;
-        }
-        if (bothPoolsHaveBalance(_poolId) == false) {
-            // skip if there is not opposing balances to settle
+    /// @param _rounds Feed rounds already read in this settlement, shared between pools on the same feeds
+    function interact(uint256 _poolId, FeedRound[] memory _rounds) private {
+        Settlement storage settlement = lastSettlement[_poolId];
+        // get current price and feed rounds to determine profit
+        FeedRound memory round = cachedRound(_poolId, _rounds);
+        if (
+            settlement.baseRoundId == round.baseRoundId &&
+            settlement.quoteRoundId == round.quoteRoundId
+        ) {
+            // oracle has not moved since the last settlement, balances have not changed
             return;
         }
+        pool[_poolId].currentUsdPrice = round.price.toUint64();
+        // a one sided pool only takes the price, its balances do not move
+        settle(_poolId, round.price);
+        // mark the rounds either way, so a one sided pool is not settled again until a feed moves
+        settlement.baseRoundId = round.baseRoundId;
+        settlement.quoteRoundId = round.quoteRoundId;
+    }
 
-        // find expected return and use it to calculate allocation difference for each tranche
-        (
-            int256 cooledAllocationDiff,
-            int256 cooledChange,
-            uint256 nonNaturalMultiplier
-        ) = trancheSpecificCalcs(
-                _poolId,
-                true,
-                assetUsdProfit,
-                currentAssetUsd
-            );
-        (
-            int256 heatedAllocationDiff,
-            int256 heatedChange, // nonNaturalMultiplier excluded
-
-        ) = trancheSpecificCalcs(
-                _poolId,
-                false,
-                assetUsdProfit,
-                currentAssetUsd
-            );
-        // use allocation differences to figure the absolute allocation total
-        uint256 absAllocationTotal;
-        {
-            // scope to avoid 'stack too deep' error
-            int256 absHeatedAllocationDiff = abs(heatedAllocationDiff);
-            int256 absCooledAllocationDiff = abs(cooledAllocationDiff);
-            int256 minAbsAllocation = absCooledAllocationDiff >
-                absHeatedAllocationDiff
-                ? absHeatedAllocationDiff
-                : absCooledAllocationDiff;
-            int256 nonNaturalDifference = heatedAllocationDiff +
-                cooledAllocationDiff;
-
-            uint256 adjNonNaturalDiff = (uint256(abs(nonNaturalDifference)) *
-                nonNaturalMultiplier) / bps;
-            absAllocationTotal = uint256(minAbsAllocation) + adjNonNaturalDiff;
+    /// @notice Checks whether a pool, or every child pool of its parent, is settled at the current feed rounds
+    /// @param _poolId The poolID of the targeted pool
+    /// @return bool True if there is nothing to settle
+    function isSettledAtCurrentRound(uint256 _poolId)
+        private
+        view
+        returns (bool)
+    {
+        uint256 parentId = parentPoolId[_poolId];
+        if (parentId == 0) {
+            return settledAtRound(_poolId, new FeedRound[](1));
         }
-        // calculate the actual allocation for the cooled tranche
-        int256 cooledAllocation;
-        if (cooledAllocationDiff < 0) {
-            if (
-                // the cEthBal USD value - absAllocation (in usdDecimals)
-                int256((pool[_poolId].cEthBal * currentAssetUsd) / decimals) -
-                    int256(absAllocationTotal) >
-                0
-            ) {
-                cooledAllocation = -int256(absAllocationTotal);
-            } else {
-                cooledAllocation = -int256(
-                    (pool[_poolId].cEthBal * currentAssetUsd) / decimals
-                ); // the cEthBal USD value (in UsDecimals * Decimals)
-            }
-        } else {
-            if (
-                int256((pool[_poolId].hEthBal * currentAssetUsd) / decimals) -
-                    int256(absAllocationTotal) >
-                0
-            ) {
-                cooledAllocation = int256(absAllocationTotal); // absolute allocation in UsDecimals
-            } else {
-                cooledAllocation = int256(
-                    (pool[_poolId].hEthBal * currentAssetUsd) / decimals
-                );
+        uint256[] storage childPoolIds = parentPoolBal[parentId].childPoolIds;
+        FeedRound[] memory rounds = new FeedRound[](childPoolIds.length);
+        for (uint256 i = 0; i < childPoolIds.length; i++) {
+            if (settledAtRound(childPoolIds[i], rounds) == false) {
+                return false;
             }
         }
-        // reallocate the protocol ETH according to price movement
-        reallocate(_poolId, currentAssetUsd, cooledChange, cooledAllocation);
+        return true;
     }
 
-    /// @notice Uses the USD values to calculate ETH balances of tranches
-    /// @param _poolId The targeted poool
-    /// @param _currentAssetUsd The current assets price from price feed
-    /// @param _cooledChange The natural change of the value of the cooled pool
-    /// @param _cooledAllocation The allocation to the cooled pool
-    function reallocate(
-        uint256 _poolId,
-        uint256 _currentAssetUsd, // in usdDecimal form
-        int256 _cooledChange,
-        int256 _cooledAllocation
-    ) private {
-        uint256 totalLockedUsd = ((pool[_poolId].cEthBal +
-            pool[_poolId].hEthBal) * _currentAssetUsd) / decimals; // USD balance of protocol in usdDecimal terms
-        int256 cooledBalAfterAllocation = ((int256(
-            pool[_poolId].cEthBal * pool[_poolId].lastSettledUsdPrice
-        ) + _cooledChange) / int256(decimals)) + _cooledAllocation;
-        int256 heatedBalAfterAllocation = int256(totalLockedUsd) - // heated USD balance in usdDecimal terms
-            cooledBalAfterAllocation;
-        pool[_poolId].cEthBal =
-            (uint256(cooledBalAfterAllocation) * decimals) /
-            _currentAssetUsd; // new cEth Balance in Wei
-        pool[_poolId].hEthBal =
-            (uint256(heatedBalAfterAllocation) * decimals) /
-            _currentAssetUsd; // new hEth Balance in Wei
-        pool[_poolId].lastSettledUsdPrice = pool[_poolId].currentUsdPrice;
+    /// @notice Checks whether a pool was settled at the current feed rounds
+    /// @param _poolId The poolID of the targeted pool
+    /// @param _rounds Feed rounds already read, shared between pools on the same feeds
+    /// @return bool True if the pool is settled
+    function settledAtRound(uint256 _poolId, FeedRound[] memory _rounds)
+        private
+        view
+        returns (bool)
+    {
+        Settlement memory settlement = lastSettlement[_poolId];
+        FeedRound memory round = cachedRound(_poolId, _rounds);
+        return
+            settlement.baseRoundId == round.baseRoundId &&
+            settlement.quoteRoundId == round.quoteRoundId;
+    }
+
+    /// @notice Gets the current round of a pool's feeds, reading each distinct pair of feeds once
+    /// @param _poolId The poolID of the targeted pool
+    /// @param _rounds Feed rounds already read, unused slots are filled as new feeds are read
+    /// @return FeedRound The current round of the pool's feeds
+    function cachedRound(uint256 _poolId, FeedRound[] memory _rounds)
+        private
+        view
+        returns (FeedRound memory)
+    {
+        bytes32 baseKey = pool[_poolId].basePriceFeedKey;
+        bytes32 quoteKey = pool[_poolId].quotePriceFeedKey;
+        uint256 i;
+        for (; i < _rounds.length && _rounds[i].baseKey != 0x0; i++) {
+            if (
+                _rounds[i].baseKey == baseKey &&
+                _rounds[i].quoteKey == quoteKey
+            ) {
+                return _rounds[i];
+            }
+        }
+        // first pool on these feeds, read them into the next unused slot
+        require(baseKey != 0x0, "Pool_Is_Not_Initialized");
+        FeedRound memory round = _rounds[i];
+        round.baseKey = baseKey;
+        round.quoteKey = quoteKey;
+        (round.price, round.baseRoundId, round.quoteRoundId) = roundOfFeeds(
+            baseKey,
+            quoteKey
+        );
+        return round;
+    }
+
+    /// @notice Reads the current price and rounds of a base feed, derived through a quote feed if set
+    /// @dev Uses the feed decimals cached when the aggregator was added
+    /// @param _baseKey The key of the base price feed
+    /// @param _quoteKey The key of the quote price feed, or 0x0 for none
+    /// @return uint256 Current price in usdDecimals
+    /// @return uint80 Round ID of the base price feed
+    /// @return uint80 Round ID of the quote price feed, or 0 if there is none
+    function roundOfFeeds(bytes32 _baseKey, bytes32 _quoteKey)
+        private
+        view
+        returns (
+            uint256,
+            uint80,
+            uint80
+        )
+    {
+        (uint80 baseRoundId, int256 basePrice, , , ) = aggregators[_baseKey]
+            .latestRoundData();
+        // convert to native decimals for math
+        basePrice = scalePrice(
+            basePrice,
+            currencyKeyDecimals[_baseKey],
+            usdDecimalsUint
+        );
+        if (_quoteKey == 0x0) {
+            return (uint256(basePrice), baseRoundId, 0);
+        }
+        // use two price feeds to derive a new feed
+        (uint80 quoteRoundId, int256 quotePrice, , , ) = aggregators[_quoteKey]
+            .latestRoundData();
+        quotePrice = scalePrice(
+            quotePrice,
+            currencyKeyDecimals[_quoteKey],
+            usdDecimalsUint
+        );
+        return (
+            uint256((basePrice * int256(usdDecimals)) / quotePrice),
+            baseRoundId,
+            quoteRoundId
+        );
+    }
+
+    /// @notice Settles the cooled and heated tranches of a pool at a price
+    /// @param _poolId The poolID of the targeted pool
+    /// @param _currentAssetUsd The current price from the price feed
+    /// @return bool False if the pool could not be settled for lack of opposing balances, its last settled price still moves
+    function settle(uint256 _poolId, uint256 _currentAssetUsd)
+        private
+        returns (bool)
+    {
+        // load the pool once, settle in memory and write the balances back
+        Pool memory settledPool = pool[_poolId];
+        int256 assetUsdProfit = profitAtPrice(
+            settledPool.lastSettledUsdPrice,
+            _currentAssetUsd
+        ); // returns ETH/USD profit in terms of basis points
+        if (assetUsdProfit == 0) {
+            // if price hasn't changed, balances have not changed
+            return true;
+        }
+        if (settledPool.cEthBal == 0 || settledPool.hEthBal == 0) {
+            // nothing to settle against, take the price so the next depositor into the empty tranche does not absorb the move
+            pool[_poolId].lastSettledUsdPrice = _currentAssetUsd.toUint64();
+            return false;
+        }
+        (uint256 hEthBal, uint256 cEthBal) = settlementKernel(
+            settledPool,
+            _currentAssetUsd,
+            assetUsdProfit
+        );
+        pool[_poolId].cEthBal = cEthBal.toUint128(); // new cEth Balance in Wei
+        setHEthBal(_poolId, hEthBal); // new hEth Balance in Wei
+        pool[_poolId].lastSettledUsdPrice = _currentAssetUsd.toUint64();
+        emit Settled(
+            _poolId,
+            settledPool.lastSettledUsdPrice,
+            _currentAssetUsd,
+            cEthBal,
+            hEthBal
+        );
+        return true;
+    }
+
+    /// @notice Emits PoolInitialized from the stored pool, kept apart from initializePool for stack depth
+    /// @param _poolId The initialized pool
+    function emitPoolInitialized(uint256 _poolId) private {
+        Pool storage initializedPool = pool[_poolId];
+        emit PoolInitialized(
+            _poolId,
+            initializedPool.parentId,
+            msg.sender,
+            initializedPool.poolType,
+            initializedPool.basePriceFeedKey,
+            initializedPool.quotePriceFeedKey,
+            initializedPool.cRate,
+            initializedPool.hRate,
+            initializedPool.cEthBal,
+            initializedPool.hEthBal
+        );
+    }
+
+    /// @notice Adds the staker to the array of ETH stakers if not already present
+    /// @param _poolId The targeted poool
+    /// @param _staker The address of the staker
+    function addToArray(uint256 _poolId, address _staker) private {
+        if (isUniqueEthStaker[_poolId][_staker] == false) {
+            ethStakerIndex[_poolId][_staker] = ethStakers[_poolId].length;
+            ethStakers[_poolId].push(_staker);
+            isUniqueEthStaker[_poolId][_staker] = true;
+        }
     }
 
     /// @notice Removes the staker from the array of ETH stakers
+    /// @dev Swaps the last staker into the removed index and pops, O(1)
     /// @param _poolId The targeted poool
-    /// @param index The index to remove
-    /// @dev can be expanded on to further optimize efficiency by removing redundancy
-    function removeFromArray(uint256 _poolId, uint256 index) private {
-        ethStakers[_poolId][index] = ethStakers[_poolId][
+    /// @param _staker The address of the staker
+    function removeFromArray(uint256 _poolId, address _staker) private {
+        if (isUniqueEthStaker[_poolId][_staker] == false) {
+            return;
+        }
+        uint256 index = ethStakerIndex[_poolId][_staker];
+        address lastStaker = ethStakers[_poolId][
             ethStakers[_poolId].length - 1
         ];
+        ethStakers[_poolId][index] = lastStaker;
+        ethStakerIndex[_poolId][lastStaker] = index;
         ethStakers[_poolId].pop();
+        delete ethStakerIndex[_poolId][_staker];
+        isUniqueEthStaker[_poolId][_staker] = false;
     }
 
-    /// @notice calculates allocation difference for a tranche/pool
-    /// @param _poolId The targeted poool
-    /// @param _isCooled Boolean value representing whether pool is cooled or not
-    /// @param _assetUsdProfit The profit based on the price feed
-    /// @param _currentAssetUsd The current price feed value
-    function trancheSpecificCalcs(
+    /// @notice Adds the staker to the array of parent pool ETH stakers if not already present
+    /// @param _parentId The targeted parent pool
+    /// @param _staker The address of the staker
+    function addToParentArray(uint256 _parentId, address _staker) private {
+        if (isUniqueParentEthStaker[_parentId][_staker] == false) {
+            parentEthStakerIndex[_parentId][_staker] = parentEthStakers[
+                _parentId
+            ].length;
+            parentEthStakers[_parentId].push(_staker);
+            isUniqueParentEthStaker[_parentId][_staker] = true;
+        }
+    }
+
+    /// @notice Removes the staker from the array of parent pool ETH stakers
+    /// @dev Swaps the last staker into the removed index and pops, O(1)
+    /// @param _parentId The targeted parent pool
+    /// @param _staker The address of the staker
+    function removeFromParentArray(uint256 _parentId, address _staker) private {
+        if (isUniqueParentEthStaker[_parentId][_staker] == false) {
+            return;
+        }
+        uint256 index = parentEthStakerIndex[_parentId][_staker];
+        address lastStaker = parentEthStakers[_parentId][
+            parentEthStakers[_parentId].length - 1
+        ];
+        parentEthStakers[_parentId][index] = lastStaker;
+        parentEthStakerIndex[_parentId][lastStaker] = index;
+        parentEthStakers[_parentId].pop();
+        delete parentEthStakerIndex[_parentId][_staker];
+        isUniqueParentEthStaker[_parentId][_staker] = false;
+    }
+
+    /// @notice Sets the hEth balance of a pool, keeping its parent pool's cEth needed in step
+    /// @param _poolId The targeted pool
+    /// @param _hEthBal The new hEth balance in Wei
+    function setHEthBal(uint256 _poolId, uint256 _hEthBal) private {
+        uint256 parentId = parentPoolId[_poolId];
+        if (parentId != 0) {
+            uint256 cethPerHeth = pool[_poolId].cethPerHeth;
+            // add before subtracting so the running sum never underflows
+            parentPoolBal[parentId].cEthNeeded =
+                parentPoolBal[parentId].cEthNeeded +
+                (_hEthBal * cethPerHeth) -
+                (uint256(pool[_poolId].hEthBal) * cethPerHeth);
+        }
+        pool[_poolId].hEthBal = _hEthBal.toUint128();
+    }
+
+    /// @notice Checks that no earlier action settles with the same pool or parent pool
+    /// @param _actions The batched actions
+    /// @param _parentIds The parent ID of the pool of each action, 0 for none
+    /// @param _index The index of the action to check
+    /// @return bool True if the action is the first of its pool or parent pool
+    function firstActionInGroup(
+        TrancheAction[] calldata _actions,
+        uint256[] memory _parentIds,
+        uint256 _index
+    ) private pure returns (bool) {
+        for (uint256 j = 0; j < _index; j++) {
+            if (
+                _actions[j].poolId == _actions[_index].poolId ||
+                (_parentIds[_index] != 0 && _parentIds[j] == _parentIds[_index])
+            ) {
+                return false;
+            }
+        }
+        return true;
+    }
+
+    /// @notice Applies a batched deposit or withdrawal to a settled pool
+    /// @param _action The deposit or withdrawal
+    /// @return deposited uint256 The amount deposited in Wei
+    /// @return withdrawn uint256 The amount withdrawn in Wei
+    function applyTrancheAction(TrancheAction calldata _action)
+        private
+        returns (uint256 deposited, uint256 withdrawn)
+    {
+        require(_action.isCooled == true || _action.isHeated == true);
+        uint256 cAmount = _action.isCooled == true ? _action.cAmount : 0;
+        uint256 hAmount = _action.isHeated == true ? _action.hAmount : 0;
+        if (_action.isDeposit == true) {
+            require(cAmount + hAmount > 0, "Amount must be greater than zero.");
+            depositAmounts(_action.poolId, cAmount, hAmount);
+            return (cAmount + hAmount, 0);
+        }
+        if (_action.isAll == false) {
+            require(cAmount > 0 || hAmount > 0, "Zero_Withdrawal_Amount");
+        }
+        withdrawn = withdrawAmounts(
+            _action.poolId,
+            _action.isCooled,
+            _action.isHeated,
+            cAmount,
+            hAmount,
+            _action.isAll
+        );
+        return (0, withdrawn);
+    }
+
+    /// @notice Deposits settled amounts to the tranches of a pool, issuing shares before adding to the balances
+    /// @param _poolId The ID of the target pool
+    /// @param _cAmount Cooled deposit amount in Wei
+    /// @param _hAmount Heated deposit amount in Wei
+    function depositAmounts(
+        uint256 _poolId,
+        uint256 _cAmount,
+        uint256 _hAmount
+    ) private {
+        uint256 parentId = parentPoolId[_poolId];
+        if (_cAmount > 0) {
+            if (parentId != 0) {
+                // add to parent balance
+                issueParentCooledShares(parentId, msg.sender, _cAmount);
+                parentPoolBal[parentId].cEthBal += _cAmount;
+                addToParentArray(parentId, msg.sender);
+            } else {
+                issueCooledShares(_poolId, msg.sender, _cAmount);
+                addToArray(_poolId, msg.sender);
+            }
+            pool[_poolId].cEthBal += _cAmount.toUint128();
+        }
+        if (_hAmount > 0) {
+            issueHeatedShares(_poolId, msg.sender, _hAmount);
+            setHEthBal(_poolId, pool[_poolId].hEthBal + _hAmount);
+            if (parentId != 0) {
+                // add to parent balance
+                parentPoolBal[parentId].hEthBal += _hAmount;
+            }
+            addToArray(_poolId, msg.sender);
+        }
+        emit Deposit(_poolId, msg.sender, _cAmount, _hAmount);
+    }
+
+    /// @notice Withdraws from the tranches of a settled pool, burning shares before deducting from the balances
+    /// @dev Does not transfer, the caller pays out the returned amount
+    /// @param _poolId The ID of the target pool
+    /// @param _isCooled Bool value representing whether it's a cooled withdrawal
+    /// @param _isHeated Bool value representing whether it's a heated withdrawal
+    /// @param _cAmount Cooled withdrawal amount in Wei
+    /// @param _hAmount Heated withdrawal amount in Wei
+    /// @param _isAll Bool value representing whether all funds are withdrawn
+    /// @return uint256 The amount withdrawn in Wei
+    function withdrawAmounts(
         uint256 _poolId,
         bool _isCooled,
-        int256 _assetUsdProfit,
-        uint256 _currentAssetUsd
+        bool _isHeated,
+        uint256 _cAmount,
+        uint256 _hAmount,
+        bool _isAll
+    ) private returns (uint256) {
+        uint256 parentId = parentPoolId[_poolId];
+
+        // if withdrawing all, set amount according to pool or parent pool user balance
+        if (_isAll == true) {
+            if (_isCooled == true) {
+                if (parentPoolId[_poolId] != 0) {
+                    _cAmount = getParentUserCEthBalance(_poolId, msg.sender);
+                } else {
+                    _cAmount = retrieveCEthBalance(_poolId, msg.sender);
+                }
+            }
+            if (_isHeated == true) {
+                _hAmount = retrieveHEthBalance(_poolId, msg.sender);
+            }
+        }
+        // Withdraw ETH, burning shares at the settled balances before deducting from them
+        if (_cAmount > 0 && _hAmount > 0) {
+            // Cooled and Heated
+            if (parentPoolId[_poolId] != 0) {
+                // deduct from parent balance
+                burnParentCooledShares(
+                    parentId,
+                    msg.sender,
+                    _cAmount,
+                    _isAll && _isCooled
+                );
+                parentPoolBal[parentId].cEthBal -= _cAmount;
+            } else {
+                burnCooledShares(
+                    _poolId,
+                    msg.sender,
+                    _cAmount,
+                    _isAll && _isCooled
+                );
+            }
+            pool[_poolId].cEthBal -= _cAmount.toUint128();
+            burnHeatedShares(_poolId, msg.sender, _hAmount, _isAll && _isHeated);
+            if (parentPoolId[_poolId] != 0) {
+                parentPoolBal[parentId].hEthBal -= _hAmount;
+            }
+            setHEthBal(_poolId, pool[_poolId].hEthBal - _hAmount);
+        } else {
+            // Either Cooled or Heated
+            if (_cAmount > 0) {
+                // Cooled, No Heated
+                if (parentPoolId[_poolId] != 0) {
+                    // deduct from user's parent shares
+                    burnParentCooledShares(
+                        parentId,
+                        msg.sender,
+                        _cAmount,
+                        _isAll && _isCooled
+                    );
+                    // deduct from parent balance
+                    parentPoolBal[parentId].cEthBal -= _cAmount;
+                } else {
+                    // deduct from user's pool shares
+                    burnCooledShares(
+                        _poolId,
+                        msg.sender,
+                        _cAmount,
+                        _isAll && _isCooled
+                    );
+                    // adjust singular pool cEth bal ONLY IF not part of parent pool
+                    pool[_poolId].cEthBal -= _cAmount.toUint128();
+                }
+            } else if (_hAmount > 0) {
+                // Heated, No Cooled
+                burnHeatedShares(
+                    _poolId,
+                    msg.sender,
+                    _hAmount,
+                    _isAll && _isHeated
+                );
+                if (parentPoolId[_poolId] != 0) {
+                    parentPoolBal[parentId].hEthBal -= _hAmount;
+                }
+                setHEthBal(_poolId, pool[_poolId].hEthBal - _hAmount);
+            }
+        }
+
+        // Remove user from ethStakers[] once fully withdrawn from the pool, and from the parent pool stakers separately
+        if (
+            userCooledShares(_poolId, msg.sender) == 0 &&
+            userHeatedShares(_poolId, msg.sender) == 0
+        ) {
+            removeFromArray(_poolId, msg.sender);
+        }
+        if (
+            parentId != 0 && userParentCooledShares(parentId, msg.sender) == 0
+        ) {
+            removeFromParentArray(parentId, msg.sender);
+        }
+        emit Withdraw(_poolId, msg.sender, _cAmount, _hAmount);
+        return _cAmount + _hAmount;
+    }
+
+    /// @notice Simulates the settlement of a pool loaded into memory
+    /// @param _pool The pool loaded into memory
+    /// @param _price The price to simulate in usdDecimals
+    /// @return uint256 The simulated hEth balance in Wei
+    /// @return uint256 The simulated cEth balance in Wei
+    function simulatePool(Pool memory _pool, uint256 _price)
+        private
+        pure
+        returns (uint256, uint256)
+    {
+        int256 assetUsdProfit = profitAtPrice(
+            _pool.lastSettledUsdPrice,
+            _price
+        ); // returns ETH/USD profit in terms of basis points
+        if (assetUsdProfit == 0 || _pool.cEthBal == 0 || _pool.hEthBal == 0) {
+            // if price hasn't changed or there are not opposing balances, balances have not changed
+            return (_pool.hEthBal, _pool.cEthBal);
+        }
+        return settlementKernel(_pool, _price, assetUsdProfit);
+    }
+
+    /// @notice Simulates the pool balances at evenly spaced price changes from the current price
+    /// @param _pool The pool loaded into memory
+    /// @param _price The current price in usdDecimals
+    /// @param _points The number of prices to simulate, at least two
+    /// @param _minPercent The lowest price change in basis points
+    /// @param _maxPercent The highest price change in basis points
+    /// @return hEthBals uint256[] memory simulated hEth balances of the pool
+    /// @return cEthBals uint256[] memory simulated cEth balances of the pool
+    function poolBalancesOverRange(
+        Pool memory _pool,
+        uint256 _price,
+        uint256 _points,
+        int256 _minPercent,
+        int256 _maxPercent
     )
         private
-        view
-        returns (
-            int256,
-            int256,
-            uint256
-        )
+        pure
+        returns (uint256[] memory hEthBals, uint256[] memory cEthBals)
     {
-        // use tranche/pool balances to estimate expected return
-        // and determine balanced re-allocation between pools
-        uint256 trancheBal;
-        int256 r;
-        // get tranche balance and basis points for expected return
+        hEthBals = new uint256[](_points);
+        cEthBals = new uint256[](_points);
+        for (uint256 i = 0; i < _points; i++) {
+            // use percent change to get simulated price feed value at index
+            int256 percent = _minPercent +
+                ((_maxPercent - _minPercent) * int256(i)) /
+                int256(_points - 1);
+            (hEthBals[i], cEthBals[i]) = simulatePool(
+                _pool,
+                uint256(
+                    (int256(_price) * (int256(bps) + percent)) / int256(bps)
+                )
+            );
+        }
+        return (hEthBals, cEthBals);
+    }
+
+    /// @notice Scales pool balances down to a holder's shares in place
+    /// @param _bals The pool balances
+    /// @param _shares The holder's shares
+    /// @param _totalShares The total shares of the tranche
+    function scaleToShares(
+        uint256[] memory _bals,
+        uint256 _shares,
+        uint256 _totalShares
+    ) private pure {
+        for (uint256 i = 0; i < _bals.length; i++) {
+            _bals[i] = shareOfBalance(_bals[i], _shares, _totalShares);
+        }
+    }
+
+    /// @notice Calculates the health of a tranche from previewed pool balances
+    /// @param _pool The pool loaded into memory
+    /// @param _hEthBalPreview The previewed hEth balance of the pool
+    /// @param _cEthBalPreview The previewed cEth balance of the pool
+    /// @param _isCooled Bool value representing whether getting cooled or heated health
+    /// @return uint256 The tranche health
+    function poolHealth(
+        Pool memory _pool,
+        uint256 _hEthBalPreview,
+        uint256 _cEthBalPreview,
+        bool _isCooled
+    ) private pure returns (uint256) {
+        if (_cEthBalPreview == 0 || _hEthBalPreview == 0) {
+            return 0;
+        }
+        // calculate expected cEth percent of paired pools
+        int256 cEthPercent = (abs(_pool.hRate) * int256(bps)) /
+            (abs(_pool.hRate) + abs(_pool.cRate));
+        // calculate actual cEth percent of paired pools
+        uint256 cooledRatio = ((_cEthBalPreview * bps) /
+            (_cEthBalPreview + _hEthBalPreview));
         if (_isCooled == true) {
-            trancheBal = pool[_poolId].cEthBal; // in Wei
-            r = pool[_poolId].cRate; // basis points
-        } else {
-            trancheBal = pool[_poolId].hEthBal; // in Wei
-            r = pool[_poolId].hRate; // basis points
-        }
-        uint256 cooledRatio = ((pool[_poolId].cEthBal * bps) /
-            (pool[_poolId].cEthBal + pool[_poolId].hEthBal));
-        uint256 nonNaturalRatio = _assetUsdProfit > 0
-            ? cooledRatio
-            : ((1 * bps) - cooledRatio);
-        int256 trancheChange = (int256(trancheBal) * int256(_currentAssetUsd)) -
-            (int256(trancheBal) * int256(pool[_poolId].lastSettledUsdPrice));
+            //            expected         actual
+            return (uint256(cEthPercent) * 100) / cooledRatio;
+        }
+        //          actual          expected
+        return (cooledRatio * 100) / uint256(cEthPercent);
+    }
+
+    /// @notice Builds the PoolWithBalances struct of a pool, only filling the computed fields requested
+    /// @param _poolId The pool ID
+    /// @param _user The user's address for the user balance previews
+    /// @param _fields Bitmask of the computed fields to fill
+    /// @return poolWithBal PoolWithBalances memory struct of the pool
+    function poolWithBalances(
+        uint256 _poolId,
+        address _user,
+        uint256 _fields
+    ) private view returns (PoolWithBalances memory poolWithBal) {
+        Pool memory storedPool = pool[_poolId];
+        poolWithBal.id = storedPool.id;
+        poolWithBal.parentId = storedPool.parentId;
+        poolWithBal.lastSettledUsdPrice = storedPool.lastSettledUsdPrice;
+        poolWithBal.basePriceFeedKey = storedPool.basePriceFeedKey;
+        poolWithBal.quotePriceFeedKey = storedPool.quotePriceFeedKey;
+        poolWithBal.hEthBal = storedPool.hEthBal;
+        poolWithBal.cEthBal = storedPool.cEthBal;
+        poolWithBal.hRate = storedPool.hRate;
+        poolWithBal.cRate = storedPool.cRate;
+        poolWithBal.poolType = storedPool.poolType;
+        if (_fields == 0) {
+            return poolWithBal;
+        }
+        // every computed field depends on the current price, read the feeds once
+        uint256 price = retrieveCurrentPrice(_poolId);
+        if (_fields & currentPriceField != 0) {
+            poolWithBal.currentPrice = price;
+        }
+        if (
+            _fields & (healthField | balancePreviewField | userPreviewField) ==
+            0
+        ) {
+            return poolWithBal;
+        }
+        // simulate the pool once, health and user previews reuse the result
+        (uint256 hEthBalPreview, uint256 cEthBalPreview) = simulatePool(
+            storedPool,
+            price
+        );
+        if (_fields & healthField != 0) {
+            poolWithBal.hHealth = poolHealth(
+                storedPool,
+                hEthBalPreview,
+                cEthBalPreview,
+                false
+            );
+            poolWithBal.cHealth = poolHealth(
+                storedPool,
+                hEthBalPreview,
+                cEthBalPreview,
+                true
+            );
+        }
+        if (_fields & balancePreviewField != 0) {
+            poolWithBal.cBalancePreview = cEthBalPreview;
+            poolWithBal.hBalancePreview = hEthBalPreview;
+        }
+        if (_fields & userPreviewField != 0) {
+            if (storedPool.parentId != 0) {
+                // if pool has a parent pool, get cEth balance for user in parent pool (sum of all children)
+                poolWithBal.userCEthBalPreview = previewParentUserCEthBalanceAtPrice(
+                    _poolId,
+                    price,
+                    _user
+                );
+            } else {
+                // if pool has no parent pool, get cEth balance for user in single pool
+                poolWithBal.userCEthBalPreview = shareOfBalance(
+                    cEthBalPreview,
+                    userCooledShares(_poolId, _user),
+                    poolShares[_poolId].cShares
+                );
+            }
+            poolWithBal.userHEthBalPreview = shareOfBalance(
+                hEthBalPreview,
+                userHeatedShares(_poolId, _user),
+                poolShares[_poolId].hShares
+            );
+        }
+        return poolWithBal;
+    }
+
+    /// @notice Settles both tranches of a pool at a price in a single pass
+    /// @dev Shared by interact and simulateInteract so settlement and previews cannot drift apart
+    /// @param _pool The pool loaded into memory, must have opposing balances
+    /// @param _price The price to settle at in usdDecimals
+    /// @param _assetUsdProfit The profit at the price in basis points, must not be zero
+    /// @return uint256 The settled hEth balance in Wei
+    /// @return uint256 The settled cEth balance in Wei
+    function settlementKernel(
+        Pool memory _pool,
+        uint256 _price,
+        int256 _assetUsdProfit
+    ) private pure returns (uint256, uint256) {
+        // natural change of the value of the cooled tranche
+        int256 cooledChange = trancheChange(
+            _pool.cEthBal,
+            _price,
+            _pool.lastSettledUsdPrice
+        );
+        int256 cooledAllocation = cooledAllocationAtPrice(
+            _pool,
+            _price,
+            _assetUsdProfit,
+            cooledChange
+        );
+        // reallocate the protocol ETH according to price movement
+        uint256 totalLockedUsd = ((uint256(_pool.cEthBal) + _pool.hEthBal) *
+            _price) / decimals; // USD balance of protocol in usdDecimal terms
+        int256 cooledBalAfterAllocation = ((int256(
+            uint256(_pool.cEthBal) * _pool.lastSettledUsdPrice
+        ) + cooledChange) / int256(decimals)) + cooledAllocation;
+        int256 heatedBalAfterAllocation = int256(totalLockedUsd) - // heated USD balance in usdDecimal terms
+            cooledBalAfterAllocation;
+        return (
+            (uint256(heatedBalAfterAllocation) * decimals) / _price, // new hEth Balance in Wei
+            (uint256(cooledBalAfterAllocation) * decimals) / _price // new cEth Balance in Wei
+        );
+    }
+
+    /// @notice calculates the allocation to the cooled tranche of a pool at a price
+    /// @param _pool The pool loaded into memory
+    /// @param _price The price to settle at in usdDecimals
+    /// @param _assetUsdProfit The profit at the price in basis points
+    /// @param _cooledChange The natural change of the value of the cooled tranche
+    /// @return int256 The allocation to the cooled tranche in usdDecimals
+    function cooledAllocationAtPrice(
+        Pool memory _pool,
+        uint256 _price,
+        int256 _assetUsdProfit,
+        int256 _cooledChange
+    ) private pure returns (int256) {
+        uint256 cooledRatio = (uint256(_pool.cEthBal) * bps) /
+            (uint256(_pool.cEthBal) + _pool.hEthBal);
+        // find expected return and use it to calculate allocation difference for each tranche
+        int256 cooledAllocationDiff = allocationDifference(
+            _pool.poolType,
+            _pool.cRate,
+            cooledRatio,
+            _cooledChange
+        );
+        int256 heatedAllocationDiff = allocationDifference(
+            _pool.poolType,
+            _pool.hRate,
+            cooledRatio,
+            trancheChange(_pool.hEthBal, _price, _pool.lastSettledUsdPrice)
+        );
+        // use allocation differences to figure the absolute allocation total
+        uint256 absAllocationTotal;
+        {
+            // scope to avoid 'stack too deep' error
+            uint256 nonNaturalMultiplier = _assetUsdProfit > 0
+                ? cooledRatio
+                : ((1 * bps) - cooledRatio);
+            int256 minAbsAllocation = abs(cooledAllocationDiff) >
+                abs(heatedAllocationDiff)
+                ? abs(heatedAllocationDiff)
+                : abs(cooledAllocationDiff);
+            absAllocationTotal =
+                uint256(minAbsAllocation) +
+                ((uint256(abs(heatedAllocationDiff + cooledAllocationDiff)) *
+                    nonNaturalMultiplier) / bps);
+        }
+        // calculate the actual allocation for the cooled tranche
+        if (cooledAllocationDiff < 0) {
+            // the cEthBal USD value (in usdDecimals)
+            int256 cooledUsd = int256((_pool.cEthBal * _price) / decimals);
+            if (cooledUsd - int256(absAllocationTotal) > 0) {
+                return -int256(absAllocationTotal);
+            }
+            return -cooledUsd;
+        }
+        int256 heatedUsd = int256((_pool.hEthBal * _price) / decimals);
+        if (heatedUsd - int256(absAllocationTotal) > 0) {
+            return int256(absAllocationTotal); // absolute allocation in UsDecimals
+        }
+        return heatedUsd;
+    }
+
+    /// @notice calculates allocation difference for a tranche from its expected payout
+    /// @param _poolType The type of pool, 0 for classic, 1 for modified
+    /// @param _rate The rate of the tranche in basis points
+    /// @param _cooledRatio The share of the pool held by the cooled tranche in basis points
+    /// @param _trancheChange The natural change of the value of the tranche
+    /// @return int256 The allocation difference in usdDecimals
+    function allocationDifference(
+        uint8 _poolType,
+        int256 _rate,
+        uint256 _cooledRatio,
+        int256 _trancheChange
+    ) private pure returns (int256) {
         int256 expectedPayout;
-        if (pool[_poolId].poolType == 0) {
+        if (_poolType == 0) {
             expectedPayout =
-                (trancheChange * ((1 * int256(bps)) + r)) /
+                (_trancheChange * ((1 * int256(bps)) + _rate)) /
                 int256(bps);
-        } else if (pool[_poolId].poolType == 1) {
-            if (cooledRatio > 50_0000000000) {
+        } else if (_poolType == 1) {
+            if (_cooledRatio > 50_0000000000) {
                 expectedPayout =
-                    (trancheChange *
-                        (int256(bps) + ((r - int256(cooledRatio))))) /
+                    (_trancheChange *
+                        (int256(bps) + ((_rate - int256(_cooledRatio))))) /
                     int256(bps);
             } else {
                 expectedPayout =
-                    (trancheChange *
+                    (_trancheChange *
                         (int256(bps) +
-                            ((r - (int256(bps) - int256(cooledRatio)))))) /
+                            ((_rate -
+                                (int256(bps) - int256(_cooledRatio)))))) /
                     int256(bps);
             }
         }
-        int256 allocationDifference = expectedPayout - trancheChange;
-        allocationDifference = allocationDifference / int256(decimals);
-        return (allocationDifference, trancheChange, nonNaturalRatio);
+        return (expectedPayout - _trancheChange) / int256(decimals);
+    }
+
+    /// @notice calculates the natural change of the value of a tranche
+    /// @param _trancheBal The tranche balance in Wei
+    /// @param _price The current price in usdDecimals
+    /// @param _lastSettledUsdPrice The last settled price in usdDecimals
+    /// @return int256 The change in value in usdDecimals * Wei
+    function trancheChange(
+        uint256 _trancheBal,
+        uint256 _price,
+        uint256 _lastSettledUsdPrice
+    ) private pure returns (int256) {
+        return
+            (int256(_trancheBal) * int256(_price)) -
+            (int256(_trancheBal) * int256(_lastSettledUsdPrice));
+    }
+
+    /// @notice calculates profit percentage between two prices
+    /// @param _lastSettledUsdPrice The last settled price
+    /// @param _currentUsdPrice The current price
+    /// @return int256 profit percent in basis points
+    function profitAtPrice(
+        uint256 _lastSettledUsdPrice,
+        uint256 _currentUsdPrice
+    ) private pure returns (int256) {
+        return
+            ((int256(_currentUsdPrice) - int256(_lastSettledUsdPrice)) *
+                int256(bps)) / int256(_lastSettledUsdPrice);
     }
 
     /// @notice checks whether both pools in pool pair have a balance
@@ -1255,31 +1976,14 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
     /// @param poolId The targeted pool
     /// @return uint256 The amount of cEth needed optimally to balance all child pools
     function cEthNeededForPools(uint256 poolId) public view returns (uint256) {
-        uint256 parentId = parentPoolId[poolId];
-        uint256 cEthNeeded;
-        for (
-            uint256 i = 0;
-            i < parentPoolBal[parentId].childPoolIds.length;
-            i++
-        ) {
-            uint256 poolIdIndex = parentPoolBal[parentId].childPoolIds[i];
-            if (pool[poolIdIndex].hEthBal == 0) {
-                cEthNeeded += 0;
-            } else {
-                int256 cethPerHeth = cethPerHethTarget(poolIdIndex);
-                cEthNeeded += (pool[poolIdIndex].hEthBal *
-                    uint256(cethPerHeth));
-            }
-        }
-        return cEthNeeded;
+        return parentPoolBal[parentPoolId[poolId]].cEthNeeded;
     }
 
     /// @notice determines optimal ratio of cEth per hEth for a child pool
     /// @param poolId The targeted pool
     /// @return int256 The optimal ratio of cEth per hEth in a child pool
     function cethPerHethTarget(uint256 poolId) public view returns (int256) {
-        int256 cethPerHeth = abs(pool[poolId].hRate) / abs(pool[poolId].cRate);
-        return cethPerHeth;
+        return int256(uint256(pool[poolId].cethPerHeth));
     }
 
     /// @notice uses available parent balances to optimally balance child pools
@@ -1290,7 +1994,7 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         if (parentId != 0) {
             // parent ID != 1
             // if pool has parent
-            uint256 cEthForBalance = cEthNeededForPools(poolId); // total cEth needed
+            uint256 cEthForBalance = parentPoolBal[parentId].cEthNeeded; // total cEth needed
             uint256 cEthStakedToTargetedRatio; // the ratio of cEth-in-pool/optimal-cEth
             if (cEthForBalance != 0) {
                 // avoid divide by zero error
@@ -1298,6 +2002,11 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
                     (parentPoolBal[parentId].cEthBal * bps) /
                     cEthForBalance; // percent of actual eth to amount needed for balance (bps)
             }
+            emit ChildPoolsRebalanced(
+                parentId,
+                parentPoolBal[parentId].cEthBal,
+                cEthForBalance
+            );
             for (
                 uint256 i = 0;
                 i < parentPoolBal[parentId].childPoolIds.length;
@@ -1305,7 +2014,7 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
             ) {
                 uint256 poolIdIndex = parentPoolBal[parentId].childPoolIds[i];
                 // get the ratio of cEth to each hEth
-                int256 cethPerHeth = cethPerHethTarget(poolIdIndex);
+                uint256 cethPerHeth = pool[poolIdIndex].cethPerHeth;
                 if (parentPoolBal[parentId].cEthBal == 0) {
                     // if parent pool cEth is zero, zero all individual pool balances too
                     pool[poolIdIndex].cEthBal = 0;
@@ -1318,22 +2027,20 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
                         // if hEth values exist to balance and parent has cEth balance
                         if (cEthStakedToTargetedRatio <= bps) {
                             // underweight/even cooled allocation to each child pool
-                            pool[poolIdIndex].cEthBal =
-                                (pool[poolIdIndex].hEthBal *
-                                    uint256(cethPerHeth) *
-                                    cEthStakedToTargetedRatio) /
-                                bps;
+                            pool[poolIdIndex].cEthBal = ((pool[poolIdIndex]
+                                .hEthBal *
+                                cethPerHeth *
+                                cEthStakedToTargetedRatio) / bps).toUint128();
                         } else {
                             // overweight cooled allocation to each child pool
                             uint256 cEthOverEven = parentPoolBal[parentId]
                                 .cEthBal - cEthForBalance;
-                            pool[poolIdIndex].cEthBal =
-                                (pool[poolIdIndex].hEthBal *
-                                    uint256(cethPerHeth)) +
+                            pool[poolIdIndex].cEthBal = ((pool[poolIdIndex]
+                                .hEthBal * cethPerHeth) +
                                 (cEthOverEven /
                                     parentPoolBal[parentId]
                                         .childPoolIds
-                                        .length);
+                                        .length)).toUint128();
                         }
                     } else {
                         // if values didn't exist to balance, leave cEth balances as is
@@ -1368,9 +2075,12 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         uint256 parentId = parentPoolId[poolId];
         if (parentId == 0) {
             // if no parent, settle single pool
-            interact(poolId);
+            interact(poolId, new FeedRound[](1));
         } else {
-            // settle all relevant pools
+            // settle all relevant pools, reading each distinct feed once
+            FeedRound[] memory rounds = new FeedRound[](
+                parentPoolBal[parentId].childPoolIds.length
+            );
             uint256 cEthInChildPools;
             uint256 hEthInChildPools;
             for (
@@ -1380,7 +2090,7 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
             ) {
                 uint256 poolIdIndex = parentPoolBal[parentId].childPoolIds[i];
                 // settle each pool
-                interact(poolIdIndex);
+                interact(poolIdIndex, rounds);
                 // add all balances to get parent pool balances
                 cEthInChildPools += pool[poolIdIndex].cEthBal;
                 hEthInChildPools += pool[poolIdIndex].hEthBal;
@@ -1391,231 +2101,274 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         }
     }
 
-    /// @notice Adjusts only the affected user pool percentages and balances
+    /// @notice Liquidates every user in a zero balance tranche
+    /// @dev Starts a new tranche epoch, shares from older epochs count as zero and are cleared lazily
     /// @param _poolId The pool ID of the selected pool
-    /// @param _beforeTx Boolean representing whether the function is running before interact is called
-    /// @param _isCooled Boolean representing whether the pool is cooled
-    /// @param _isHeated Boolean representing whether the pool is heated
-    function reAdjust(
-        uint256 _poolId,
-        bool _beforeTx,
-        bool _isCooled,
-        bool _isHeated
-    ) private {
+    function liquidateIfZero(uint256 _poolId) private {
         uint256 parentId = parentPoolId[_poolId];
-        if (_beforeTx == true) {
-            // BEFORE deposit, only balances are affected based on percentages
-            liquidateIfZero(_poolId); // reset percentages on zeroed balances
-            for (
-                uint256 ethStakersIndex = 0;
-                ethStakersIndex < ethStakers[_poolId].length;
-                ethStakersIndex++
-            ) {
-                // adjust balances based on percentage claim
-                address addrC = ethStakers[_poolId][ethStakersIndex];
-                if (parentPoolId[_poolId] == 0) {
-                    // track by single pool
-                    ethStakedBalance[_poolId][addrC].cBal =
-                        (pool[_poolId].cEthBal *
-                            ethStakedBalance[_poolId][addrC].cPercent) /
-                        bps;
-                } else {
-                    // track by parent pool
-                    ethStakedWithParent[parentId][addrC].cBal =
-                        (parentPoolBal[parentId].cEthBal *
-                            ethStakedWithParent[parentId][addrC].cPercent) /
-                        bps;
-                }
-                // adjust heated balance by pool
-                ethStakedBalance[_poolId][addrC].hBal =
-                    (pool[_poolId].hEthBal *
-                        ethStakedBalance[_poolId][addrC].hPercent) /
-                    bps;
-            }
-        } else {
-            // AFTER tx, only affected pool percentages change (ex. cooled)
-            uint256 indexToRemove; // to track index of user in ethStakers array if account emptied
-            bool indexNeedsRemoved = false; // to differentiate indexToRemove == 0 from default ethStakers[0]
-            if (_isCooled == true && _isHeated == false) {
-                // only Cooled tranche percentage numbers are affected by cooled tx
-                for (
-                    uint256 ethStakersIndex = 0;
-                    ethStakersIndex < ethStakers[_poolId].length;
-                    ethStakersIndex++
-                ) {
-                    address addrC = ethStakers[_poolId][ethStakersIndex];
-                    if (parentPoolId[_poolId] == 0) {
-                        // track by single pool
-                        if (pool[_poolId].cEthBal == 0) {
-                            // if pool cEth balance is zero, user balance is zero
-                            ethStakedBalance[_poolId][addrC].cPercent = 0;
-                        } else {
-                            // if pool cEth bal is positive, use user bal to calculate percent
-                            ethStakedBalance[_poolId][addrC].cPercent =
-                                (ethStakedBalance[_poolId][addrC].cBal * bps) /
-                                pool[_poolId].cEthBal;
-                        }
-                    } else {
-                        // track by parent pool
-                        if (parentPoolBal[parentId].cEthBal == 0) {
-                            // if parent cEth balance is zero, user balance is zero
-                            ethStakedWithParent[parentId][addrC].cPercent = 0;
-                        } else {
-                            // if parent cEth bal is positive, use user bal to calculate percent
-                            ethStakedWithParent[parentId][addrC].cPercent =
-                                (ethStakedWithParent[parentId][addrC].cBal *
-                                    bps) /
-                                parentPoolBal[parentId].cEthBal;
-                        }
-                    }
-                }
-            } else if (_isCooled == false && _isHeated == true) {
-                // only Heated tranche percentage numbers are affected by heated tx
-                for (
-                    uint256 ethStakersIndex = 0;
-                    ethStakersIndex < ethStakers[_poolId].length;
-                    ethStakersIndex++
-                ) {
-                    // heated percentages are always by single pool
-                    address addrC = ethStakers[_poolId][ethStakersIndex];
-                    if (pool[_poolId].hEthBal == 0) {
-                        // if pool hEth bal is zero, user percent is also zero
-                        ethStakedBalance[_poolId][addrC].hPercent = 0;
-                    } else {
-                        // if pool hEth bal is positive, use user bal to calculate percent
-                        ethStakedBalance[_poolId][addrC].hPercent =
-                            (ethStakedBalance[_poolId][addrC].hBal * bps) /
-                            pool[_poolId].hEthBal;
-                    }
-                }
-            } else {
-                // Cooled and Heated tranche percentage numbers are affected by tx
-                for (
-                    uint256 ethStakersIndex = 0;
-                    ethStakersIndex < ethStakers[_poolId].length;
-                    ethStakersIndex++
-                ) {
-                    address addrC = ethStakers[_poolId][ethStakersIndex];
-                    if (parentPoolId[_poolId] == 0) {
-                        // track by single pool
-                        if (pool[_poolId].cEthBal == 0) {
-                            // if pool cEth bal is zero, user % is also zero
-                            ethStakedBalance[_poolId][addrC].cPercent = 0;
-                        } else {
-                            // if pool cEth bal exists, use user bal to calculate percent
-                            ethStakedBalance[_poolId][addrC].cPercent =
-                                (ethStakedBalance[_poolId][addrC].cBal * bps) /
-                                pool[_poolId].cEthBal;
-                        }
-                    } else {
-                        // track by parent pool
-                        if (parentPoolBal[parentId].cEthBal == 0) {
-                            // if parent pool cEth bal is zero, user % is also zero
-                            ethStakedWithParent[parentId][addrC].cPercent = 0;
-                        } else {
-                            // if parent cEth bal is positive, use user bal to calculate percent
-                            ethStakedWithParent[parentId][addrC].cPercent =
-                                (ethStakedWithParent[parentId][addrC].cBal *
-                                    bps) /
-                                parentPoolBal[parentId].cEthBal;
-                        }
-                    }
-                    // track heated by single pool
-                    if (pool[_poolId].hEthBal == 0) {
-                        // if pool hEth bal is zero, user % is also zero
-                        ethStakedBalance[_poolId][addrC].hPercent = 0;
-                    } else {
-                        // if pool hEth bal is positive, use user bal to calculate percent
-                        ethStakedBalance[_poolId][addrC].hPercent =
-                            (ethStakedBalance[_poolId][addrC].hBal * bps) /
-                            pool[_poolId].hEthBal;
-                    }
-                }
-            }
+        if (
+            parentId != 0 &&
+            parentPoolBal[parentId].cEthBal == 0 &&
+            parentPoolBal[parentId].cShares != 0
+        ) {
+            parentPoolBal[parentId].cShares = 0;
+            parentPoolBal[parentId].cEpoch++;
+            emit TrancheLiquidated(
+                _poolId,
+                parentId,
+                true,
+                parentPoolBal[parentId].cEpoch
+            );
+        }
+        if (pool[_poolId].cEthBal == 0 && poolShares[_poolId].cShares != 0) {
+            poolShares[_poolId].cShares = 0;
+            poolShares[_poolId].cEpoch++;
+            emit TrancheLiquidated(
+                _poolId,
+                0,
+                true,
+                poolShares[_poolId].cEpoch
+            );
+        }
+        if (pool[_poolId].hEthBal == 0 && poolShares[_poolId].hShares != 0) {
+            poolShares[_poolId].hShares = 0;
+            poolShares[_poolId].hEpoch++;
+            emit TrancheLiquidated(
+                _poolId,
+                0,
+                false,
+                poolShares[_poolId].hEpoch
+            );
         }
     }
 
-    /// @notice Liquidates every user in a zero balance tranche
+    /// @notice Returns a user's cooled shares of a single pool in the current epoch
     /// @param _poolId The pool ID of the selected pool
-    function liquidateIfZero(uint256 _poolId) private {
-        // when user balance falls to zero, user percent needs to be set to zero
-        for (
-            uint256 ethStakersIndex = 0;
-            ethStakersIndex < ethStakers[_poolId].length;
-            ethStakersIndex++
+    /// @param _user The address of the user
+    /// @return uint256 The user's cooled shares, or zero if liquidated
+    function userCooledShares(uint256 _poolId, address _user)
+        private
+        view
+        returns (uint256)
+    {
+        if (
+            ethStakedBalance[_poolId][_user].cEpoch != poolShares[_poolId].cEpoch
         ) {
-            uint256 parentId = parentPoolId[_poolId];
-            address addrC = ethStakers[_poolId][ethStakersIndex];
-            if (parentId != 0 && parentPoolBal[parentId].cEthBal == 0) {
-                ethStakedWithParent[parentId][addrC].cPercent = 0;
-                ethStakedWithParent[parentId][addrC].cBal = 0;
-            }
-            if (pool[_poolId].cEthBal == 0) {
-                // if pool is liquidated, reset user to zero
-                ethStakedBalance[_poolId][addrC].cPercent = 0;
-                ethStakedBalance[_poolId][addrC].cBal = 0;
-            }
-            if (pool[_poolId].hEthBal == 0) {
-                // if pool is liquidated, reset user to zero
-                ethStakedBalance[_poolId][addrC].hBal = 0;
-                ethStakedBalance[_poolId][addrC].hPercent = 0;
-            }
+            return 0;
         }
+        return ethStakedBalance[_poolId][_user].cShares;
     }
 
-    /// @notice Uses the USD values to simulate ETH balances of tranches
-    /// @param _poolId The targeted pool
-    /// @param _simAssetUsd The current assets price from price feed
-    /// @param _cooledChange The natural change of the value of the cooled pool
-    /// @param _cooledAllocationDiff The allocation to the cooled pool
-    /// @param _absAllocationTotal The absolute value of the allocation total
-    function simulateReallocate(
-        uint256 _poolId,
-        uint256 _simAssetUsd, // in usdDecimal form
-        int256 _cooledChange,
-        int256 _cooledAllocationDiff,
-        uint256 _absAllocationTotal
-    ) private view returns (uint256, uint256) {
-        // calculate the actual allocation for the cooled tranche
-        int256 cooledAllocation;
-        if (_cooledAllocationDiff < 0) {
-            if (
-                // the cEthBal USD value - absAllocation (in usdDecimals)
-                int256((pool[_poolId].cEthBal * _simAssetUsd) / decimals) -
-                    int256(_absAllocationTotal) >
-                0
-            ) {
-                cooledAllocation = -int256(_absAllocationTotal);
-            } else {
-                cooledAllocation = -int256(
-                    (pool[_poolId].cEthBal * _simAssetUsd) / decimals
-                ); // the cEthBal USD value (in UsDecimals * Decimals)
-            }
-        } else {
-            if (
-                int256((pool[_poolId].hEthBal * _simAssetUsd) / decimals) -
-                    int256(_absAllocationTotal) >
-                0
-            ) {
-                cooledAllocation = int256(_absAllocationTotal); // absolute allocation in UsDecimals
-            } else {
-                cooledAllocation = int256(
-                    (pool[_poolId].hEthBal * _simAssetUsd) / decimals
-                );
-            }
+    /// @notice Returns a user's heated shares of a single pool in the current epoch
+    /// @param _poolId The pool ID of the selected pool
+    /// @param _user The address of the user
+    /// @return uint256 The user's heated shares, or zero if liquidated
+    function userHeatedShares(uint256 _poolId, address _user)
+        private
+        view
+        returns (uint256)
+    {
+        if (
+            ethStakedBalance[_poolId][_user].hEpoch != poolShares[_poolId].hEpoch
+        ) {
+            return 0;
         }
-        uint256 totalLockedUsd = ((pool[_poolId].cEthBal +
-            pool[_poolId].hEthBal) * _simAssetUsd) / decimals; // USD balance of protocol in usdDecimal terms
-        int256 cooledBalAfterAllocation = ((int256(
-            pool[_poolId].cEthBal * pool[_poolId].lastSettledUsdPrice
-        ) + _cooledChange) / int256(decimals)) + cooledAllocation;
-        int256 heatedBalAfterAllocation = int256(totalLockedUsd) - // heated USD balance in usdDecimal terms
-            cooledBalAfterAllocation;
-        uint256 cEthSimBal = (uint256(cooledBalAfterAllocation) * decimals) /
-            _simAssetUsd; // new cEth Balance in Wei
-        uint256 hEthSimBal = (uint256(heatedBalAfterAllocation) * decimals) /
-            _simAssetUsd; // new hEth Balance in Wei
-        return (hEthSimBal, cEthSimBal);
+        return ethStakedBalance[_poolId][_user].hShares;
+    }
+
+    /// @notice Returns a user's cooled shares of a parent pool in the current epoch
+    /// @param _parentId The parent pool ID
+    /// @param _user The address of the user
+    /// @return uint256 The user's cooled shares, or zero if liquidated
+    function userParentCooledShares(uint256 _parentId, address _user)
+        private
+        view
+        returns (uint256)
+    {
+        if (
+            ethStakedWithParent[_parentId][_user].cEpoch !=
+            parentPoolBal[_parentId].cEpoch
+        ) {
+            return 0;
+        }
+        return ethStakedWithParent[_parentId][_user].cShares;
+    }
+
+    /// @notice Clears a user's cooled shares left over from a liquidated epoch
+    /// @param _poolId The pool ID of the selected pool
+    /// @param _user The address of the user
+    function syncCooledEpoch(uint256 _poolId, address _user) private {
+        Bal storage userBal = ethStakedBalance[_poolId][_user];
+        if (userBal.cEpoch != poolShares[_poolId].cEpoch) {
+            userBal.cShares = 0;
+            userBal.cEpoch = poolShares[_poolId].cEpoch;
+        }
+    }
+
+    /// @notice Clears a user's heated shares left over from a liquidated epoch
+    /// @param _poolId The pool ID of the selected pool
+    /// @param _user The address of the user
+    function syncHeatedEpoch(uint256 _poolId, address _user) private {
+        Bal storage userBal = ethStakedBalance[_poolId][_user];
+        if (userBal.hEpoch != poolShares[_poolId].hEpoch) {
+            userBal.hShares = 0;
+            userBal.hEpoch = poolShares[_poolId].hEpoch;
+        }
+    }
+
+    /// @notice Clears a user's parent cooled shares left over from a liquidated epoch
+    /// @param _parentId The parent pool ID
+    /// @param _user The address of the user
+    function syncParentCooledEpoch(uint256 _parentId, address _user) private {
+        ParentBal storage userBal = ethStakedWithParent[_parentId][_user];
+        if (userBal.cEpoch != parentPoolBal[_parentId].cEpoch) {
+            userBal.cShares = 0;
+            userBal.cEpoch = parentPoolBal[_parentId].cEpoch;
+        }
+    }
+
+    /// @notice Issues cooled shares of a single pool for a deposit
+    /// @dev Must run before the deposit is added to the pool cEth balance
+    /// @param _poolId The pool ID of the selected pool
+    /// @param _user The address of the depositor
+    /// @param _amount The deposit amount in Wei
+    function issueCooledShares(
+        uint256 _poolId,
+        address _user,
+        uint256 _amount
+    ) private {
+        syncCooledEpoch(_poolId, _user);
+        uint256 shares = sharesForDeposit(
+            _amount,
+            pool[_poolId].cEthBal,
+            poolShares[_poolId].cShares
+        );
+        ethStakedBalance[_poolId][_user].cShares += shares;
+        poolShares[_poolId].cShares += shares;
+    }
+
+    /// @notice Issues heated shares of a single pool for a deposit
+    /// @dev Must run before the deposit is added to the pool hEth balance
+    /// @param _poolId The pool ID of the selected pool
+    /// @param _user The address of the depositor
+    /// @param _amount The deposit amount in Wei
+    function issueHeatedShares(
+        uint256 _poolId,
+        address _user,
+        uint256 _amount
+    ) private {
+        syncHeatedEpoch(_poolId, _user);
+        uint256 shares = sharesForDeposit(
+            _amount,
+            pool[_poolId].hEthBal,
+            poolShares[_poolId].hShares
+        );
+        ethStakedBalance[_poolId][_user].hShares += shares;
+        poolShares[_poolId].hShares += shares;
+    }
+
+    /// @notice Issues cooled shares of a parent pool for a deposit
+    /// @dev Must run before the deposit is added to the parent cEth balance
+    /// @param _parentId The parent pool ID
+    /// @param _user The address of the depositor
+    /// @param _amount The deposit amount in Wei
+    function issueParentCooledShares(
+        uint256 _parentId,
+        address _user,
+        uint256 _amount
+    ) private {
+        syncParentCooledEpoch(_parentId, _user);
+        uint256 shares = sharesForDeposit(
+            _amount,
+            parentPoolBal[_parentId].cEthBal,
+            parentPoolBal[_parentId].cShares
+        );
+        ethStakedWithParent[_parentId][_user].cShares += shares;
+        parentPoolBal[_parentId].cShares += shares;
+    }
+
+    /// @notice Burns cooled shares of a single pool for a withdrawal
+    /// @dev Must run before the withdrawal is deducted from the pool cEth balance
+    /// @param _poolId The pool ID of the selected pool
+    /// @param _user The address of the withdrawer
+    /// @param _amount The withdrawal amount in Wei
+    /// @param _isAll Bool value representing whether all user shares are burned
+    function burnCooledShares(
+        uint256 _poolId,
+        address _user,
+        uint256 _amount,
+        bool _isAll
+    ) private {
+        syncCooledEpoch(_poolId, _user);
+        uint256 shares = _isAll
+            ? ethStakedBalance[_poolId][_user].cShares
+            : sharesForWithdrawal(
+                _amount,
+                pool[_poolId].cEthBal,
+                poolShares[_poolId].cShares
+            );
+        require(
+            shares <= ethStakedBalance[_poolId][_user].cShares,
+            "Insufficient_User_Funds"
+        );
+        ethStakedBalance[_poolId][_user].cShares -= shares;
+        poolShares[_poolId].cShares -= shares;
+    }
+
+    /// @notice Burns heated shares of a single pool for a withdrawal
+    /// @dev Must run before the withdrawal is deducted from the pool hEth balance
+    /// @param _poolId The pool ID of the selected pool
+    /// @param _user The address of the withdrawer
+    /// @param _amount The withdrawal amount in Wei
+    /// @param _isAll Bool value representing whether all user shares are burned
+    function burnHeatedShares(
+        uint256 _poolId,
+        address _user,
+        uint256 _amount,
+        bool _isAll
+    ) private {
+        syncHeatedEpoch(_poolId, _user);
+        uint256 shares = _isAll
+            ? ethStakedBalance[_poolId][_user].hShares
+            : sharesForWithdrawal(
+                _amount,
+                pool[_poolId].hEthBal,
+                poolShares[_poolId].hShares
+            );
+        require(
+            shares <= ethStakedBalance[_poolId][_user].hShares,
+            "Insufficient_User_Funds"
+        );
+        ethStakedBalance[_poolId][_user].hShares -= shares;
+        poolShares[_poolId].hShares -= shares;
+    }
+
+    /// @notice Burns cooled shares of a parent pool for a withdrawal
+    /// @dev Must run before the withdrawal is deducted from the parent cEth balance
+    /// @param _parentId The parent pool ID
+    /// @param _user The address of the withdrawer
+    /// @param _amount The withdrawal amount in Wei
+    /// @param _isAll Bool value representing whether all user shares are burned
+    function burnParentCooledShares(
+        uint256 _parentId,
+        address _user,
+        uint256 _amount,
+        bool _isAll
+    ) private {
+        syncParentCooledEpoch(_parentId, _user);
+        uint256 shares = _isAll
+            ? ethStakedWithParent[_parentId][_user].cShares
+            : sharesForWithdrawal(
+                _amount,
+                parentPoolBal[_parentId].cEthBal,
+                parentPoolBal[_parentId].cShares
+            );
+        require(
+            shares <= ethStakedWithParent[_parentId][_user].cShares,
+            "Insufficient_User_Funds"
+        );
+        ethStakedWithParent[_parentId][_user].cShares -= shares;
+        parentPoolBal[_parentId].cShares -= shares;
     }
 
     /// @notice Returns the absolute value of an int
@@ -1624,6 +2377,54 @@ contract GwinProtocol is Ownable, ReentrancyGuard {
         return x >= 0 ? x : -x;
     }
 
+    /// @notice Returns the number of shares a deposit is worth
+    /// @param _amount The deposit amount in Wei
+    /// @param _trancheBal The tranche balance before the deposit
+    /// @param _totalShares The total shares issued by the tranche
+    /// @return uint256 The shares to issue for the deposit
+    function sharesForDeposit(
+        uint256 _amount,
+        uint256 _trancheBal,
+        uint256 _totalShares
+    ) private pure returns (uint256) {
+        if (_totalShares == 0 || _trancheBal == 0) {
+            // an empty tranche issues shares 1:1 with Wei
+            return _amount;
+        }
+        return (_amount * _totalShares) / _trancheBal;
+    }
+
+    /// @notice Returns the number of shares a withdrawal is worth, rounded up
+    /// @param _amount The withdrawal amount in Wei
+    /// @param _trancheBal The tranche balance before the withdrawal
+    /// @param _totalShares The total shares issued by the tranche
+    /// @return uint256 The shares to burn for the withdrawal
+    function sharesForWithdrawal(
+        uint256 _amount,
+        uint256 _trancheBal,
+        uint256 _totalShares
+    ) private pure returns (uint256) {
+        require(_trancheBal > 0, "Insufficient_User_Funds");
+        // round up so that a withdrawal never burns less than it is worth
+        return ((_amount * _totalShares) + _trancheBal - 1) / _trancheBal;
+    }
+
+    /// @notice Returns the portion of a balance owned by a number of shares
+    /// @param _bal The balance to divide, i.e. a tranche balance or bps
+    /// @param _shares The number of shares owned
+    /// @param _totalShares The total shares issued
+    /// @return uint256 The portion of the balance owned
+    function shareOfBalance(
+        uint256 _bal,
+        uint256 _shares,
+        uint256 _totalShares
+    ) private pure returns (uint256) {
+        if (_totalShares == 0) {
+            return 0;
+        }
+        return (_bal * _shares) / _totalShares;
+    }
+
     //////// ERC-20 FOR FUTURE USE /////////
 
     //@@  STAKE TOKENS  @@// - for future use with ERC-20s
@@ -0,0 +1,50 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+/**
+ * @title MockMulticall3
+ * @notice The aggregate3 and getBlockNumber functions of Multicall3, which live
+ * networks have deployed at 0xcA11bde05977b3631167028862bE2a173976CA11
+ * @notice Use this contract on local chains to read many views in one eth_call
+ */
+contract MockMulticall3 {
+    struct Call3 {
+        address target;
+        bool allowFailure;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    /// @notice Makes each call in order, reverting if a call that does not allow failure fails
+    /// @param calls The target, failure flag and calldata of each call
+    /// @return returnData The success and return data of each call
+    function aggregate3(Call3[] calldata calls)
+        public
+        payable
+        returns (Result[] memory returnData)
+    {
+        uint256 length = calls.length;
+        returnData = new Result[](length);
+        for (uint256 i = 0; i < length; i++) {
+            Call3 calldata calli = calls[i];
+            Result memory result = returnData[i];
+            (result.success, result.returnData) = calli.target.call(
+                calli.callData
+            );
+            require(
+                calli.allowFailure || result.success,
+                "Multicall3: call failed"
+            );
+        }
+    }
+
+    /// @notice Returns the block number, so results can be tied to the block they were read at
+    /// @return blockNumber The current block number
+    function getBlockNumber() public view returns (uint256 blockNumber) {
+        blockNumber = block.number;
+    }
+}
@@ -0,0 +1,148 @@
+from brownie import network, accounts
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account
+from scripts.deploy import deploy_gwin_protocol_and_gwin_token
+from web3 import Web3
+import json
+import os
+
+# NOTE: Run this on a local network, the 1000 staker pool funds and deposits from 1000 generated accounts
+#
+#   brownie run scripts/benchmark_scaling.py --network ganache
+#   brownie run scripts/benchmark_scaling.py main reports/scaling.json 1,10,100 1,5,10 --network ganache
+#
+# Transactions report gas_used, views report their estimated gas as an eth_call
+
+DEFAULT_REPORT_PATH = "reports/scaling_benchmark.json"
+STAKER_COUNTS = [1, 10, 100, 1000]
+CHILD_COUNTS = list(range(1, 11))
+STAKER_FUNDING = Web3.toWei(0.05, "ether")
+STAKER_DEPOSIT = Web3.toWei(0.001, "ether")
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+ALL_FIELDS = 15  # currentPriceField | healthField | balancePreviewField | userPreviewField
+
+stakers = []
+
+
+def get_stakers(count):
+    # generated accounts are reused between runs, only new ones are funded
+    while len(stakers) < count:
+        staker = accounts.add()
+        funder = get_account(index=5 + len(stakers) % 5)
+        funder.transfer(staker, STAKER_FUNDING)
+        stakers.append(staker)
+    return stakers[:count]
+
+
+def initialize_pool(gwin_protocol, price_feed, parent_id, c_rate, h_rate, account):
+    return gwin_protocol.initializePool(0, parent_id, price_feed.address, "0x455448", ZERO_ADDRESS, "0x0", c_rate, h_rate, {"from": account, "value": Web3.toWei(20, "ether")})
+
+
+def deposit(gwin_protocol, pool_id, is_cooled, account, amount=STAKER_DEPOSIT):
+    #                                           isCooled, isHeated, cAmount, hAmount {from, msg.value}
+    return gwin_protocol.depositToTranche(pool_id, is_cooled, not is_cooled, amount if is_cooled else 0, 0 if is_cooled else amount, {"from": account, "value": amount})
+
+
+def benchmark_stakers(count):
+    account = get_account() # Protocol
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    pool_stakers = get_stakers(count)
+    results = {}
+
+    tx = initialize_pool(gwin_protocol, eth_usd_price_feed, 0, -50_0000000000, 50_0000000000, account)
+    results["initializePool"] = tx.gas_used
+    # alternate the stakers between the tranches
+    for index, staker in enumerate(pool_stakers):
+        deposit(gwin_protocol, 0, index % 2 == 0, staker)
+    staker = pool_stakers[-1]
+
+    # Deposits, the first after a price change pays for settlement
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+    results["depositToTranche_settle"] = deposit(gwin_protocol, 0, True, staker).gas_used
+    results["depositToTranche"] = deposit(gwin_protocol, 0, False, staker).gas_used
+
+    # Withdrawals
+    eth_usd_price_feed.updateAnswer(1200_00000000, {"from": account})
+    #                                      isCooled, isHeated, cAmount, hAmount, isAll {from}
+    tx = gwin_protocol.withdrawFromTranche(0, True, False, STAKER_DEPOSIT // 2, 0, False, {"from": staker})
+    results["withdrawFromTranche_settle"] = tx.gas_used
+    tx = gwin_protocol.withdrawFromTranche(0, False, True, 0, 0, True, {"from": staker})
+    results["withdrawFromTranche_all"] = tx.gas_used
+
+    # Views
+    results["getAllPoolsWithBalances"] = gwin_protocol.getAllPoolsWithBalances.estimate_gas(staker)
+    results["getRangeOfReturns"] = gwin_protocol.getRangeOfReturns.estimate_gas(0, staker, True, True)
+    results["getRangeOfReturnsAtResolution_101"] = gwin_protocol.getRangeOfReturnsAtResolution.estimate_gas(0, staker, 101, -50_0000000000, 50_0000000000)
+    return results
+
+
+def benchmark_children(count):
+    account = get_account() # Protocol
+    non_owner = get_account(index=1) # Alice
+    non_owner_two = get_account(index=2) # Bob
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    results = {}
+
+    # Child pools of parent 1 with increasing heated rates, the last one initialized is recorded
+    for index in range(count):
+        tx = initialize_pool(gwin_protocol, eth_usd_price_feed, 1, -100_0000000000, (index + 1) * 100_0000000000, account)
+        deposit(gwin_protocol, index, False, non_owner_two)
+    results["initializePool_child"] = tx.gas_used
+
+    # A child deposit after a price change settles and rebalances every child of the parent
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+    results["depositToTranche_settle"] = deposit(gwin_protocol, 0, True, non_owner).gas_used
+    results["depositToTranche"] = deposit(gwin_protocol, 0, True, non_owner).gas_used
+
+    # Withdrawals
+    eth_usd_price_feed.updateAnswer(1200_00000000, {"from": account})
+    #                                      isCooled, isHeated, cAmount, hAmount, isAll {from}
+    tx = gwin_protocol.withdrawFromTranche(0, True, False, STAKER_DEPOSIT // 2, 0, False, {"from": non_owner})
+    results["withdrawFromTranche_settle"] = tx.gas_used
+    tx = gwin_protocol.withdrawFromTranche(0, True, False, 0, 0, True, {"from": non_owner})
+    results["withdrawFromTranche_all"] = tx.gas_used
+
+    # Keeper settlement of the parent after another price change
+    eth_usd_price_feed.updateAnswer(1300_00000000, {"from": account})
+    results["settlePools"] = gwin_protocol.settlePools([0], {"from": non_owner}).gas_used
+
+    # Views
+    results["getAllPoolsWithBalances"] = gwin_protocol.getAllPoolsWithBalances.estimate_gas(non_owner)
+    results["getPoolsWithBalances_page"] = gwin_protocol.getPoolsWithBalances.estimate_gas(non_owner, 0, 1, ALL_FIELDS)
+    results["getRangeOfReturns"] = gwin_protocol.getRangeOfReturns.estimate_gas(0, non_owner, True, True)
+    return results
+
+
+def run_benchmark(staker_counts=STAKER_COUNTS, child_counts=CHILD_COUNTS):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        raise Exception("Only for local benchmarking!")
+    results = {"stakers": {}, "children": {}}
+    for count in staker_counts:
+        print(f"Benchmarking a pool with {count} stakers...")
+        results["stakers"][str(count)] = benchmark_stakers(count)
+    for count in child_counts:
+        print(f"Benchmarking a parent with {count} child pools...")
+        results["children"][str(count)] = benchmark_children(count)
+    return results
+
+
+def print_report(results):
+    for dimension, runs in results.items():
+        if not runs:
+            continue
+        counts = list(runs.keys())
+        print(f'\n{dimension:<36}' + "".join(f"{count:>10}" for count in counts))
+        for name in runs[counts[0]]:
+            print(f"{name:<36}" + "".join(f"{runs[count][name]:>10}" for count in counts))
+
+
+def main(output=DEFAULT_REPORT_PATH, staker_counts=None, child_counts=None):
+    # counts can be passed from the command line as comma separated strings, i.e. "1,10,100"
+    staker_counts = [int(count) for count in staker_counts.split(",")] if staker_counts else STAKER_COUNTS
+    child_counts = [int(count) for count in child_counts.split(",")] if child_counts else CHILD_COUNTS
+    results = run_benchmark(staker_counts, child_counts)
+    print_report(results)
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Report written to {output}")
@@ -0,0 +1,83 @@
+from brownie import network
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account
+from scripts.deploy import deploy_gwin_protocol_and_gwin_token
+from collections import Counter
+from web3 import Web3
+import json
+import os
+
+# NOTE: Opcode counts come from debug_traceTransaction, run this on a local Ganache network
+#
+# Save a report before a change and compare against it after:
+#   brownie run scripts/benchmark_storage.py main reports/before.json --network ganache
+#   brownie run scripts/benchmark_storage.py main reports/after.json reports/before.json --network ganache
+
+DEFAULT_REPORT_PATH = "reports/storage_benchmark.json"
+
+
+def storage_profile(tx):
+    # count storage opcodes in the transaction trace
+    ops = Counter(step["op"] for step in tx.trace)
+    return {"gas_used": tx.gas_used, "sload": ops["SLOAD"], "sstore": ops["SSTORE"]}
+
+
+def run_benchmark():
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        raise Exception("Only for local benchmarking!")
+    account = get_account() # Protocol
+    non_owner = get_account(index=1) # Alice
+    non_owner_two = get_account(index=2) # Bob
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    results = {}
+
+    # Initialize a standalone pool and two child pools sharing a parent
+    tx = gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    results["initializePool"] = storage_profile(tx)
+    tx = gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 100_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    tx = gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 400_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    results["initializePool_child"] = storage_profile(tx)
+
+    # Deposits, the first after a price change pays for settlement
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+    #                                     isCooled, isHeated, cAmount, hAmount {from, msg.value}
+    tx = gwin_protocol.depositToTranche(0, True, False, Web3.toWei(1, "ether"), 0, {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    results["depositToTranche_settle"] = storage_profile(tx)
+    tx = gwin_protocol.depositToTranche(0, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner_two, "value": Web3.toWei(1, "ether")})
+    results["depositToTranche"] = storage_profile(tx)
+    tx = gwin_protocol.depositToTranche(1, True, False, Web3.toWei(1, "ether"), 0, {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    results["depositToTranche_child"] = storage_profile(tx)
+
+    # Withdrawals
+    eth_usd_price_feed.updateAnswer(1200_00000000, {"from": account})
+    #                                      isCooled, isHeated, cAmount, hAmount, isAll {from}
+    tx = gwin_protocol.withdrawFromTranche(0, True, False, Web3.toWei(0.5, "ether"), 0, False, {"from": non_owner})
+    results["withdrawFromTranche_settle"] = storage_profile(tx)
+    tx = gwin_protocol.withdrawFromTranche(0, False, True, 0, 0, True, {"from": non_owner_two})
+    results["withdrawFromTranche_all"] = storage_profile(tx)
+    tx = gwin_protocol.withdrawFromTranche(1, True, False, 0, 0, True, {"from": non_owner})
+    results["withdrawFromTranche_child"] = storage_profile(tx)
+    return results
+
+
+def print_report(results, baseline=None):
+    print(f'{"call":<30}{"gas":>12}{"SLOAD":>8}{"SSTORE":>8}')
+    for name, profile in results.items():
+        line = f'{name:<30}{profile["gas_used"]:>12}{profile["sload"]:>8}{profile["sstore"]:>8}'
+        if baseline and name in baseline:
+            before = baseline[name]
+            line += f'   (gas {profile["gas_used"] - before["gas_used"]:+}, SLOAD {profile["sload"] - before["sload"]:+}, SSTORE {profile["sstore"] - before["sstore"]:+})'
+        print(line)
+
+
+def main(output=DEFAULT_REPORT_PATH, baseline_path=None):
+    results = run_benchmark()
+    baseline = None
+    if baseline_path is not None:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Report written to {output}")
@@ -1,5 +1,5 @@
 from brownie import GwinToken, GwinProtocol, network, config, web3
-from scripts.helpful_scripts import deploy_mocks, get_account, get_contract, fund_with_link, LOCAL_BLOCKCHAIN_ENVIRONMENTS, TEST_BLOCKCHAIN_ENVIRONMENTS, NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS
+from scripts.helpful_scripts import deploy_mocks, get_account, get_contract, fund_with_link, contract_initial_value, LOCAL_BLOCKCHAIN_ENVIRONMENTS, TEST_BLOCKCHAIN_ENVIRONMENTS, NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS
 from web3 import Web3
 
 # NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
@@ -21,13 +21,16 @@ def deploy_gwin_protocol_and_gwin_token():
         publish_source=config["networks"][network.show_active()].get("verify", False),
     )
     print('Gwin Protocol is deployed!')
+    # the registered price feeds are shared by the deployments on a network, so every answer is reset below
     eth_usd_price_feed = get_contract("eth_usd_price_feed")
     xau_usd_price_feed = get_contract("xau_usd_price_feed")
     btc_usd_price_feed = get_contract("btc_usd_price_feed")
     jpy_usd_price_feed = get_contract("jpy_usd_price_feed")
     if network.show_active() in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
-        eth_usd_price_feed.updateAnswer(1000_00000000, {"from": account})
-        xau_usd_price_feed.updateAnswer(Web3.toWei(1600, "ether"), {"from": account})
+        eth_usd_price_feed.updateAnswer(contract_initial_value["eth_usd_price_feed"], {"from": account})
+        xau_usd_price_feed.updateAnswer(contract_initial_value["xau_usd_price_feed"], {"from": account})
+        btc_usd_price_feed.updateAnswer(contract_initial_value["btc_usd_price_feed"], {"from": account})
+        jpy_usd_price_feed.updateAnswer(contract_initial_value["jpy_usd_price_feed"], {"from": account})
     tx1 = gwin_ERC20.transfer(gwin_protocol.address, gwin_ERC20.totalSupply() - KEPT_BALANCE, {"from": account})
     tx1.wait(1)
 
@@ -2,12 +2,37 @@ from brownie import GwinProtocol, GwinToken, network, exceptions, config, web3
 from pyparsing import null_debug_action
 from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, INITIAL_VALUE, DECIMALS, get_account, get_contract, rounded, roundedDec, extra_rounded, rnd
 from scripts.deploy import deploy_gwin_protocol_and_gwin_token
+from scripts.price_driver import build_scenario, drive_prices
 from web3 import Web3
-import time
+import json
 
 # NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
 
-def main():
+# Pools to initialize, in order, pool IDs are assigned in this order
+# Feeds are named as in the brownie config, a pool without a quote feed has "quote_feed": None
+# Load a JSON file of the same shape instead with: brownie run scripts/deploy_pools.py main pools.json
+POOLS = [
+    # 2x ETH/USD pool with stable parent
+    {"name": "ETH 2x", "type": 0, "parent_id": 1, "base_feed": "eth_usd_price_feed", "base_key": "0x4554482f555344", "quote_feed": None, "quote_key": "0x0", "c_rate": -100_0000000000, "h_rate": 100_0000000000},
+    # 5x ETH/USD pool with stable parent
+    {"name": "ETH 5x", "type": 0, "parent_id": 1, "base_feed": "eth_usd_price_feed", "base_key": "0x4554482f555344", "quote_feed": None, "quote_key": "0x0", "c_rate": -100_0000000000, "h_rate": 400_0000000000},
+    # 10x ETH/USD pool with stable parent
+    {"name": "ETH 10x", "type": 0, "parent_id": 1, "base_feed": "eth_usd_price_feed", "base_key": "0x4554482f555344", "quote_feed": None, "quote_key": "0x0", "c_rate": -100_0000000000, "h_rate": 900_0000000000},
+    # 2x long XAU / stable XAU pool
+    {"name": "XAU 2x", "type": 1, "parent_id": 0, "base_feed": "eth_usd_price_feed", "base_key": "0x4554482f555344", "quote_feed": "xau_usd_price_feed", "quote_key": "0x5841552f555344", "c_rate": -100_0000000000, "h_rate": 100_0000000000},
+    # 2x long BTC / stable BTC pool
+    {"name": "BTC 2x", "type": 1, "parent_id": 0, "base_feed": "eth_usd_price_feed", "base_key": "0x4554482f555344", "quote_feed": "btc_usd_price_feed", "quote_key": "0x4254432f555344", "c_rate": -100_0000000000, "h_rate": 100_0000000000},
+    # 2x long JPY / stable JPY pool
+    {"name": "JPY 2x", "type": 1, "parent_id": 0, "base_feed": "eth_usd_price_feed", "base_key": "0x4554482f555344", "quote_feed": "jpy_usd_price_feed", "quote_key": "0x4a50592f555344", "c_rate": -100_0000000000, "h_rate": 100_0000000000},
+]
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+# initializePool gas for each sibling child pool mined ahead of a child pool in the same batch, which its estimate
+# cannot see: settling, liquidation checks and rebalancing of one more child, with headroom. Unused gas is not charged.
+SIBLING_GAS = 150_000
+
+
+def main(pools_path=None, mode="pipelined", scenario="step", source=None):
     # 'amount' determined by environment - i.e. the ETH you wish to distribute between all the pools
     if network.show_active() in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         amount = 100
@@ -20,97 +45,69 @@ def main():
         non_owner = get_account(index=4)
     
     gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    price_feeds = {
+        "eth_usd_price_feed": eth_usd_price_feed,
+        "xau_usd_price_feed": xau_usd_price_feed,
+        "btc_usd_price_feed": btc_usd_price_feed,
+        "jpy_usd_price_feed": jpy_usd_price_feed,
+    }
 
-    #@@@@@@@@@@@@| Create 2x ETH/USD pool with stable parent |@@@@@@@@@@@@#
-    parent_id = 1 # parent ID: 1
-    pool_type = 0 # classic type pool
-    pool_h_rate = 100_0000000000 # 2x leverage
-    pool_c_rate = -100_0000000000 # stable
-    tx = gwin_protocol.initializePool(pool_type, parent_id, eth_usd_price_feed.address, "0x4554482f555344", "0x0000000000000000000000000000000000000000", "0x0", pool_c_rate, pool_h_rate, {"from": account, "value": Web3.toWei(amount, "ether")})
-    tx.wait(1)
-    pool_2x_id = 0
-
-    #@@@@@@@@@@@@| Create 5x ETH/USD pool with stable parent |@@@@@@@@@@@@#
-    pool_type = 0 # classic type pool | parent ID: 1
-    pool_h_rate = 400_0000000000 # 5x leverage
-    pool_c_rate = -100_0000000000 # stable
-    tx = gwin_protocol.initializePool(pool_type, parent_id, eth_usd_price_feed.address, "0x4554482f555344", "0x0000000000000000000000000000000000000000", "0x0", pool_c_rate, pool_h_rate, {"from": account, "value": Web3.toWei(amount, "ether")})
-    tx.wait(1)
-    pool_5x_id = 1
-
-    #@@@@@@@@@@@@| Create 10x ETH/USD pool with stable parent |@@@@@@@@@@@@#
-    pool_type = 0 # classic type pool | parent ID: 1
-    pool_h_rate = 900_0000000000 # 10x leverage
-    pool_c_rate = -100_0000000000 # stable
-    tx = gwin_protocol.initializePool(pool_type, parent_id, eth_usd_price_feed.address, "0x4554482f555344", "0x0000000000000000000000000000000000000000", "0x0", pool_c_rate, pool_h_rate, {"from": account, "value": Web3.toWei(amount, "ether")})
-    tx.wait(1)
-    pool_10x_id = 2
-
-    #@@@@@@@@@@@@| Create 2x long XAU / stable XAU pool |@@@@@@@@@@@@#
-    pool_type = 1 # modified type pool
-    parent_id = 0 # no parent pool
-    pool_h_rate = 100_0000000000 # 2x leverage
-    pool_c_rate = -100_0000000000 # stable
-    tx = gwin_protocol.initializePool(pool_type, parent_id, eth_usd_price_feed.address, "0x4554482f555344", xau_usd_price_feed.address, "0x5841552f555344", pool_c_rate, pool_h_rate, {"from": account, "value": Web3.toWei(amount, "ether")})
-    tx.wait(1)
-    pool_XAU_id = 3
-
-    #@@@@@@@@@@@@| Create 2x long BTC / stable BTC pool |@@@@@@@@@@@@#
-    pool_type = 1 # modified type pool
-    parent_id = 0 # no parent pool
-    pool_h_rate = 100_0000000000 # 2x leverage
-    pool_c_rate = -100_0000000000 # stable
-    tx = gwin_protocol.initializePool(pool_type, parent_id, eth_usd_price_feed.address, "0x4554482f555344", btc_usd_price_feed.address, "0x4254432f555344", pool_c_rate, pool_h_rate, {"from": account, "value": Web3.toWei(amount, "ether")})
-    tx.wait(1)
-    pool_BTC_id = 4
-
-    #@@@@@@@@@@@@| Create 2x long BTC / stable BTC pool |@@@@@@@@@@@@#
-    pool_type = 1 # modified type pool
-    parent_id = 0 # no parent pool
-    pool_h_rate = 100_0000000000 # 2x leverage
-    pool_c_rate = -100_0000000000 # stable
-    tx = gwin_protocol.initializePool(pool_type, parent_id, eth_usd_price_feed.address, "0x4554482f555344", jpy_usd_price_feed.address, "0x4a50592f555344", pool_c_rate, pool_h_rate, {"from": account, "value": Web3.toWei(amount, "ether")})
-    tx.wait(1)
-    pool_JPY_id = 5
+    pool_ids = deploy_pools(gwin_protocol, load_pools(pools_path), price_feeds, account, amount, mode == "pipelined")
+    for name, pool_id in pool_ids.items():
+        print(f"pool {pool_id}: {name}")
 
     # Print contract address
     print(f"gwin deployed to: " + gwin_protocol.address)
 
-    # list of pool IDs
-    pool_ids = [pool_10x_id, pool_XAU_id, pool_BTC_id, pool_JPY_id]
-    # list of price feed instances
-    price_feeds = [eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed]
-
     if network.show_active() in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
-        updatePriceFeeds(account, non_owner, pool_ids, gwin_protocol, price_feeds)
-    
-        
-def updatePriceFeeds(account, non_owner, pool_ids, gwin_protocol, price_feeds):
-    direction = "up"
-    count = 10
-    amount = None
-    while True:
-        if count % 20 == 0:
-            if direction == "down":
-                direction = "up"
-            else:
-                direction = "down"
-        if direction == "down":
-            amount = -10_00000000
-        else:
-            amount = 10_00000000
-        # retrieve the current price for the pool
-        price = price_feeds[0].latestRoundData()
-        # adjust the price based on the percentage change
-        adj_price = price[1] + amount
-        # update the price feed for the pool
-        price_feeds[0].updateAnswer(adj_price, {"from": non_owner})
-        print(f"New price is: ")
-        print(f"Price feed address: " + str(price_feeds[0]))
-        print(adj_price)
-        count += 1
-        # exit the loop when the block number reaches 100
-        if count == 1000:
-            break
-        # pause the script for 20 seconds
-        time.sleep(20)
\ No newline at end of file
+        # move the prices at a pace you can trade along with, see scripts/price_driver.py
+        drive_prices(price_feeds, build_scenario(price_feeds, scenario, source), non_owner, realtime=True)
+
+
+def load_pools(pools_path=None):
+    if not pools_path:
+        return POOLS
+    with open(pools_path) as f:
+        return json.load(f)
+
+
+def initialize_pool_args(pool, price_feeds):
+    quote_feed = price_feeds[pool["quote_feed"]].address if pool.get("quote_feed") else ZERO_ADDRESS
+    return (pool["type"], pool["parent_id"], price_feeds[pool["base_feed"]].address, pool["base_key"], quote_feed, pool["quote_key"], pool["c_rate"], pool["h_rate"])
+
+
+def pending_siblings(pools):
+    """The number of child pools of the same parent ahead of each pool in the list, which a gas estimate made
+    before any of them is mined does not include. Other pools ahead of a pool only make it cheaper, i.e. by adding a feed."""
+    counts = []
+    seen = {}
+    for pool in pools:
+        counts.append(seen.get(pool["parent_id"], 0) if pool["parent_id"] != 0 else 0)
+        seen[pool["parent_id"]] = seen.get(pool["parent_id"], 0) + 1
+    return counts
+
+
+def deploy_pools(gwin_protocol, pools, price_feeds, account, amount, pipelined=True):
+    """Initializes the pools and returns their IDs by name.
+    Pipelined, every pool is estimated against the current chain, signed with the next nonce and broadcast without
+    waiting, then the receipts are awaited and checked together, so the whole list takes one confirmation round trip.
+    Otherwise each transaction is confirmed before the next one is sent."""
+    first_pool_id = len(gwin_protocol.getAllPools())
+    batches = [pools] if pipelined else [[pool] for pool in pools]
+    for batch in batches:
+        txs = []
+        nonce = account.nonce
+        for index, (pool, siblings) in enumerate(zip(batch, pending_siblings(batch))):
+            args = initialize_pool_args(pool, price_feeds)
+            params = {"from": account, "value": Web3.toWei(pool.get("amount", amount), "ether")}
+            if pipelined:
+                gas_limit = gwin_protocol.initializePool.estimate_gas(*args, params) + siblings * SIBLING_GAS
+                params.update({"nonce": nonce + index, "gas_limit": gas_limit, "required_confs": 0})
+            txs.append(gwin_protocol.initializePool(*args, params))
+        for tx in txs:
+            tx.wait(1)
+        # a reverted transaction is not raised without confirmations, so every receipt is checked
+        failed = [f"{pool['name']} ({tx.revert_msg or 'reverted'})" for pool, tx in zip(batch, txs) if tx.status != 1]
+        if failed:
+            raise Exception(f"Pool initialization failed for: {', '.join(failed)}")
+    return {pool["name"]: first_pool_id + index for index, pool in enumerate(pools)}
@@ -0,0 +1,326 @@
+"""Batched reads of GwinProtocol state.
+
+GwinClient groups many GwinProtocol view calls, across pools and users, into Multicall3 aggregate3
+calls of up to batch_size calls each, and decodes the results into plain dataclasses. A read that
+takes several batches pins them all to one block, so the results are consistent with each other.
+
+Multicall3 is deployed at the same address on most live networks, see "multicall" in the brownie
+config, and get_contract deploys MockMulticall3 on local chains. On a network without it, the
+calls are made one at a time.
+
+Dumping a deployment takes four rounds of batches: the pools, their shares and staker counts, the
+stakers, and then the share balances of each staker. Cooled positions of child pools are held with
+their parent pool, so its stakers are read alongside those of the pools. Balances are derived from
+the shares the same way retrieveCEthBalance, retrieveHEthBalance and getParentUserCEthBalance derive
+them.
+
+Read heavy services can give the client a ViewCache. Results are then kept per (function, args,
+block number) and only the misses are sent to the node. Running follow in the service's event loop
+tracks the head, which also saves the block number lookup each read otherwise makes, and drops the
+cached results on each new block or GwinProtocol event.
+
+    brownie run scripts/gwin_client.py --network ganache
+"""
+from brownie import chain
+from collections import OrderedDict
+from dataclasses import dataclass
+from scripts.helpful_scripts import get_contract
+from scripts.log_streamer import LogStreamer
+from scripts.settlement_engine import POOL_STRUCT_FIELDS, share_of_balance
+import asyncio
+import sys
+
+BATCH_SIZE = 1000  # calls per aggregate3 eth_call
+CACHE_BYTES = 64 * 1024 * 1024  # default memory cap of a ViewCache
+MISSING = object()
+
+
+@dataclass
+class PoolState:
+    id: int
+    parent_id: int
+    last_settled_usd_price: int  # in usdDecimals
+    current_usd_price: int
+    base_price_feed_key: str
+    quote_price_feed_key: str
+    h_eth_bal: int
+    c_eth_bal: int
+    h_rate: int
+    c_rate: int
+    pool_type: int  # as in classic (0) or modified (1)
+    ceth_per_heth: int
+    c_shares: int = 0  # total shares issued by each tranche
+    h_shares: int = 0
+    c_epoch: int = 0
+    h_epoch: int = 0
+
+
+@dataclass
+class ParentPoolState:
+    id: int
+    c_eth_bal: int
+    h_eth_bal: int
+    c_shares: int
+    c_epoch: int
+    c_eth_needed: int
+
+
+@dataclass
+class UserBalance:
+    pool_id: int
+    user: str
+    c_eth_bal: int  # for a child pool, the user's cooled balance of its parent pool
+    h_eth_bal: int
+
+
+@dataclass
+class ParentUserBalance:
+    parent_id: int
+    user: str
+    c_eth_bal: int
+
+
+@dataclass
+class ProtocolState:
+    block_number: int
+    pools: dict  # pool ID => PoolState
+    parent_pools: dict  # parent pool ID => ParentPoolState
+    user_balances: list
+    parent_user_balances: list
+
+
+def pool_state(values, shares):
+    # values of the pool(poolId) getter or a getAllPools entry, and of the poolShares getter
+    c_shares, h_shares, c_epoch, h_epoch = shares
+    return PoolState(**dict(zip(POOL_STRUCT_FIELDS, values)), c_shares=c_shares, h_shares=h_shares, c_epoch=c_epoch, h_epoch=h_epoch)
+
+
+def size_of(value):
+    # rough memory use of a key or decoded result, counting the contents of tuples and lists
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class ViewCache:
+    """LRU cache of view results keyed by (function name, args, block number), evicting the least
+    recently used results once their estimated size passes max_bytes."""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key => (result, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=MISSING):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, result):
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+        size = size_of(key) + size_of(result)
+        self.entries[key] = (result, size)
+        self.size += size
+        while self.size > self.max_bytes and self.entries:
+            self.size -= self.entries.popitem(last=False)[1][1]
+            self.evictions += 1
+
+    def invalidate(self):
+        self.entries.clear()
+        self.size = 0
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class GwinClient:
+    def __init__(self, gwin_protocol, multicall=None, batch_size=BATCH_SIZE, cache=None):
+        self.gwin_protocol = gwin_protocol
+        self.multicall = multicall if multicall is not None else get_contract("multicall")
+        self.batch_size = batch_size
+        self.cache = cache
+        self.block_number = None  # head tracked by follow, looked up on each read otherwise
+        self.round_trips = 0  # eth_calls made, to compare batch sizes
+
+    def call_many(self, calls, block_identifier=None):
+        """Makes (function name, args) GwinProtocol view calls and returns their decoded results in order.
+        With a cache, results are read at the head unless a block is given and only misses are called."""
+        if self.cache is None:
+            return self.uncached_call_many(calls, block_identifier)
+        block_number = self.head() if block_identifier is None else block_identifier
+        if not isinstance(block_number, int):
+            # "latest" and block hashes do not name a fixed state
+            return self.uncached_call_many(calls, block_number)
+        keys = [(name, tuple(args), block_number) for name, args in calls]
+        results = [self.cache.get(key) for key in keys]
+        missed = [index for index, result in enumerate(results) if result is MISSING]
+        if missed:
+            for index, result in zip(missed, self.uncached_call_many([calls[index] for index in missed], block_number)):
+                results[index] = result
+                self.cache.put(keys[index], result)
+        return results
+
+    def view(self, name, *args, block_identifier=None):
+        """A single view call, i.e. client.view("getPoolHealth", 3, True)"""
+        return self.call_many([(name, list(args))], block_identifier)[0]
+
+    def head(self):
+        return self.block_number if self.block_number is not None else chain.height
+
+    def on_block(self, block_number):
+        # results of older blocks are not read again
+        if block_number != self.block_number:
+            self.block_number = block_number
+            if self.cache is not None:
+                self.cache.invalidate()
+
+    def on_event(self, event):
+        # a reorg replaces state under the same block number, so any event drops the cached results
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    async def follow(self, web3, poll_interval=1):
+        """Tracks the head and the GwinProtocol events until cancelled, for services running an event loop."""
+        streamer = LogStreamer(web3, poll_interval=poll_interval).watch(self.gwin_protocol)
+
+        async def follow_blocks():
+            while True:
+                self.on_block(await asyncio.get_running_loop().run_in_executor(None, lambda: web3.eth.block_number))
+                await asyncio.sleep(poll_interval)
+
+        async def follow_events():
+            async for event in streamer:
+                self.on_event(event)
+
+        await asyncio.gather(follow_blocks(), follow_events())
+
+    def uncached_call_many(self, calls, block_identifier=None):
+        methods = [getattr(self.gwin_protocol, name) for name, args in calls]
+        arguments = [args for name, args in calls]
+        if self.multicall is None:
+            self.round_trips += len(calls)
+            return [method(*args, block_identifier=block_identifier) for method, args in zip(methods, arguments)]
+        results = []
+        for start in range(0, len(calls), self.batch_size):
+            batch_methods = methods[start : start + self.batch_size]
+            batch = [
+                (self.gwin_protocol.address, False, method.encode_input(*args))
+                for method, args in zip(batch_methods, arguments[start : start + self.batch_size])
+            ]
+            self.round_trips += 1
+            returned = self.multicall.aggregate3.call(batch, block_identifier=block_identifier)
+            results += [method.decode_output(return_data) for method, (success, return_data) in zip(batch_methods, returned)]
+        return results
+
+    def pools(self, pool_ids, block_identifier=None):
+        pool_ids = list(pool_ids)
+        results = self.call_many([("pool", [pool_id]) for pool_id in pool_ids] + [("poolShares", [pool_id]) for pool_id in pool_ids], block_identifier)
+        return {pool_id: pool_state(values, shares) for pool_id, values, shares in zip(pool_ids, results[: len(pool_ids)], results[len(pool_ids) :])}
+
+    def parent_pools(self, parent_ids, block_identifier=None):
+        parent_ids = list(parent_ids)
+        results = self.call_many([("parentPoolBal", [parent_id]) for parent_id in parent_ids], block_identifier)
+        return {parent_id: ParentPoolState(parent_id, *values) for parent_id, values in zip(parent_ids, results)}
+
+    def user_balances(self, positions, pools=None, parent_pools=None, block_identifier=None):
+        """Balances of (pool ID, user) positions, reading the pool and parent pool states unless given."""
+        positions = list(positions)
+        if pools is None:
+            pools = self.pools({pool_id for pool_id, user in positions}, block_identifier)
+        if parent_pools is None:
+            parent_pools = self.parent_pools({pool.parent_id for pool in pools.values() if pool.parent_id != 0}, block_identifier)
+        return self.balances(positions, [], pools, parent_pools, block_identifier)[0]
+
+    def parent_user_balances(self, parent_positions, parent_pools=None, block_identifier=None):
+        """Cooled balances of (parent pool ID, user) positions, reading the parent pool states unless given."""
+        parent_positions = list(parent_positions)
+        if parent_pools is None:
+            parent_pools = self.parent_pools({parent_id for parent_id, user in parent_positions}, block_identifier)
+        return self.balances([], parent_positions, {}, parent_pools, block_identifier)[1]
+
+    def balances(self, positions, parent_positions, pools, parent_pools, block_identifier=None):
+        # the shares of pool and parent pool positions in one round, returns (UserBalance list, ParentUserBalance list)
+        parent_positions = sorted(
+            set(parent_positions) | {(pools[pool_id].parent_id, user) for pool_id, user in positions if pools[pool_id].parent_id != 0}
+        )
+        results = self.call_many(
+            [("ethStakedBalance", [pool_id, user]) for pool_id, user in positions]
+            + [("ethStakedWithParent", [parent_id, user]) for parent_id, user in parent_positions],
+            block_identifier,
+        )
+        parent_shares = dict(zip(parent_positions, results[len(positions) :]))
+        balances = []
+        for (pool_id, user), (c_shares, h_shares, c_epoch, h_epoch) in zip(positions, results[: len(positions)]):
+            pool = pools[pool_id]
+            if pool.parent_id != 0:
+                parent = parent_pools[pool.parent_id]
+                parent_c_shares, parent_c_epoch = parent_shares[(pool.parent_id, user)]
+                c_eth_bal = share_of_balance(parent.c_eth_bal, parent_c_shares, parent.c_shares, parent_c_epoch, parent.c_epoch)
+            else:
+                c_eth_bal = share_of_balance(pool.c_eth_bal, c_shares, pool.c_shares, c_epoch, pool.c_epoch)
+            h_eth_bal = share_of_balance(pool.h_eth_bal, h_shares, pool.h_shares, h_epoch, pool.h_epoch)
+            balances.append(UserBalance(pool_id, str(user), c_eth_bal, h_eth_bal))
+        parent_balances = []
+        for (parent_id, user), (c_shares, c_epoch) in parent_shares.items():
+            parent = parent_pools[parent_id]
+            parent_balances.append(ParentUserBalance(parent_id, str(user), share_of_balance(parent.c_eth_bal, c_shares, parent.c_shares, c_epoch, parent.c_epoch)))
+        return balances, parent_balances
+
+    def dump_state(self, block_identifier=None):
+        """Reads every pool, parent pool and staker balance, all at one block."""
+        block_number = self.head() if block_identifier is None else block_identifier
+        all_pools = self.call_many([("getAllPools", [])], block_number)[0]
+        pool_ids = [dict(zip(POOL_STRUCT_FIELDS, values))["id"] for values in all_pools]
+        parent_ids = sorted({dict(zip(POOL_STRUCT_FIELDS, values))["parent_id"] for values in all_pools} - {0})
+        results = self.call_many(
+            [("poolShares", [pool_id]) for pool_id in pool_ids]
+            + [("retrieveEthStakersLength", [pool_id]) for pool_id in pool_ids]
+            + [("parentPoolBal", [parent_id]) for parent_id in parent_ids]
+            + [("retrieveParentEthStakersLength", [parent_id]) for parent_id in parent_ids],
+            block_number,
+        )
+        count = len(pool_ids)
+        parent_count = len(parent_ids)
+        pools = {pool_id: pool_state(values, shares) for pool_id, values, shares in zip(pool_ids, all_pools, results[:count])}
+        staker_counts = results[count : 2 * count]
+        parent_pools = {parent_id: ParentPoolState(parent_id, *values) for parent_id, values in zip(parent_ids, results[2 * count : 2 * count + parent_count])}
+        parent_staker_counts = results[2 * count + parent_count :]
+        staker_indexes = [(pool_id, index) for pool_id, staker_count in zip(pool_ids, staker_counts) for index in range(staker_count)]
+        parent_staker_indexes = [(parent_id, index) for parent_id, staker_count in zip(parent_ids, parent_staker_counts) for index in range(staker_count)]
+        stakers = self.call_many(
+            [("ethStakers", [pool_id, index]) for pool_id, index in staker_indexes]
+            + [("parentEthStakers", [parent_id, index]) for parent_id, index in parent_staker_indexes],
+            block_number,
+        )
+        positions = [(pool_id, staker) for (pool_id, index), staker in zip(staker_indexes, stakers)]
+        parent_positions = [(parent_id, staker) for (parent_id, index), staker in zip(parent_staker_indexes, stakers[len(staker_indexes) :])]
+        user_balances, parent_user_balances = self.balances(positions, parent_positions, pools, parent_pools, block_number)
+        return ProtocolState(block_number, pools, parent_pools, user_balances, parent_user_balances)
+
+
+def main():
+    from brownie import GwinProtocol
+
+    client = GwinClient(GwinProtocol[-1])
+    state = client.dump_state()
+    positions = len(state.user_balances) + len(state.parent_user_balances)
+    print(f"Read {len(state.pools)} pools and {positions} positions at block {state.block_number} in {client.round_trips} calls")
@@ -5,13 +5,16 @@ from brownie import (
     LinkToken,
     MockV3Aggregator,
     MockOracle,
+    MockMulticall3,
     GwinProtocol,
     GwinToken,
     Contract,
+    chain,
     web3,
 )
 from web3 import Web3
-import time
+import asyncio
+import concurrent.futures
 import math
 import pytest
 
@@ -39,6 +42,7 @@ contract_to_mock = {
     "jpy_usd_price_feed": MockV3Aggregator,
     "test_price_feed": MockV3Aggregator,
     "oracle": MockOracle,
+    "multicall": MockMulticall3,
 }
 
 contract_decimals = {
@@ -79,31 +83,57 @@ def get_account(index=None, id=None):
     return accounts.add(config["wallets"]["from_key"])
 
 
-def get_contract(contract_name):
+class ContractRegistry(dict):
+    """(network, contract name) -> contract, each mock is deployed and each handle is built once per network.
+    A registered contract is checked against the chain before it is handed out, so a mock that was reverted
+    away, or lost to a reset or a restart of the local chain, is dropped and deployed again."""
+
+    def get(self, key, default=None):
+        contract = super().get(key)
+        if contract is None:
+            return default
+        if not is_live(contract):
+            del self[key]
+            return default
+        return contract
+
+
+contract_registry = ContractRegistry()
+
+
+def get_contract(contract_name, fresh=False):
     """If you want to use this function, go to the brownie config and add a new entry for
     the contract that you want to be able to 'get'. Then add an entry in the variable 'contract_to_mock'.
     You'll see examples like the 'link_token'.
         This script will then either:
             - Get a address from the config
             - Or deploy a mock to use for a network that doesn't have it
+        The contract is kept in contract_registry, so later calls on the same network return it
+        without deploying or building it again.
         Args:
             contract_name (string): This is the name that is referred to in the
             brownie config and 'contract_to_mock' variable.
+            fresh (bool, optional): Deploy a new mock, or build a new handle, that is not
+            registered. Use it for a mock that must not be shared, i.e. one whose answer is changed.
         Returns:
             brownie.network.contract.ProjectContract: The most recently deployed
             Contract of the type specificed by the dictionary. This could be either
             a mock or the 'real' contract on a live network.
     """
+    key = (network.show_active(), contract_name)
+    contract = contract_registry.get(key)
+    if contract is not None and not fresh:
+        return contract
     contract_type = contract_to_mock[contract_name]
     if network.show_active() in NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         if contract_type == MockV3Aggregator:
             print(f"deploying: " + contract_name)
-            deploy_mocks(contract_name, contract_decimals[contract_name], contract_initial_value[contract_name])
+            contract = deploy_mocks(contract_name, contract_decimals[contract_name], contract_initial_value[contract_name])
+        elif fresh or len(contract_type) <= 0 or not is_deployed(contract_type[-1]):
+            print(f"deploying: " + contract_name)
+            contract = deploy_mocks(contract_name)
         else:
-            if len(contract_type) <= 0:
-                print(f"deploying: " + contract_name)
-                deploy_mocks(contract_name)
-        contract = contract_type[-1]
+            contract = contract_type[-1]
     else:
         try:
             contract_address = config["networks"][network.show_active()][contract_name]
@@ -117,9 +147,27 @@ def get_contract(contract_name):
             print(
                 f"brownie run scripts/deploy_mocks.py --network {network.show_active()}"
             )
+            return None
+    if not fresh:
+        contract_registry[key] = contract
     return contract
 
 
+def is_live(contract):
+    # a mock deployed above the current height was reverted away, a mock below it may still be gone after a reset
+    tx = getattr(contract, "tx", None)
+    if tx is not None and tx.block_number is not None and tx.block_number > chain.height:
+        return False
+    return is_deployed(contract)
+
+
+def is_deployed(contract):
+    # deployments kept in the build folder are gone after a restart of the local chain
+    if network.show_active() not in NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        return True
+    return len(web3.eth.get_code(contract.address)) > 0
+
+
 def fund_with_link(
     contract_address, account=None, link_token=None, amount=1000000000000000000
 ):
@@ -137,17 +185,25 @@ def fund_with_link(
 def deploy_mocks(contract_name, decimals=DECIMALS, initial_value=INITIAL_VALUE):
     """
     Use this script if you want to deploy mocks to a testnet
+    Only the mock for contract_name is deployed, see get_contract to reuse deployed mocks
     """
     print(f"The active network is {network.show_active()}")
     print("Deploying Mocks...")
     account = get_account()
-    print("Deploying Mock Link Token...")
-    link_token = LinkToken.deploy({"from": account})
-    print("Deploying Mock Price Feed...")
-    mock_price_feed = MockV3Aggregator.deploy(
-        decimals, initial_value, {"from": account}
-    )
-    print(f"Deployed mock price feed for {contract_name} to {mock_price_feed.address}")
+    contract_type = contract_to_mock[contract_name]
+    if contract_type == MockV3Aggregator:
+        print("Deploying Mock Price Feed...")
+        mock = MockV3Aggregator.deploy(decimals, initial_value, {"from": account})
+    elif contract_type == MockOracle:
+        print("Deploying Mock Oracle...")
+        mock = MockOracle.deploy(get_contract("link_token").address, {"from": account})
+    elif contract_type == MockMulticall3:
+        print("Deploying Mock Multicall...")
+        mock = MockMulticall3.deploy({"from": account})
+    else:
+        print("Deploying Mock Link Token...")
+        mock = contract_type.deploy({"from": account})
+    print(f"Deployed mock {contract_name} to {mock.address}")
 
     # print("Deploying Mock VRFCoordinator...")
     # mock_vrf_coordinator = VRFCoordinatorV2Mock.deploy(
@@ -155,20 +211,19 @@ def deploy_mocks(contract_name, decimals=DECIMALS, initial_value=INITIAL_VALUE):
     # )
     # print(f"Deployed to {mock_vrf_coordinator.address}")
 
-    # print("Deploying Mock Oracle...")
-    # mock_oracle = MockOracle.deploy(link_token.address, {"from": account})
-    # print(f"Deployed to {mock_oracle.address}")
-
     # print("Deploying Mock Operator...")
     # mock_operator = MockOperator.deploy(link_token.address, account, {"from": account})
     # print(f"Deployed to {mock_operator.address}")
 
     print("Mocks Deployed!")
+    return mock
 
 
 def listen_for_event(brownie_contract, event, timeout=200, poll_interval=2):
     """Listen for an event to be fired from a contract.
-    We are waiting for the event to return, so this function is blocking.
+    We are waiting for the event to return, so this function is blocking, even when it is called
+    from a coroutine. In async code await wait_for_event in scripts/log_streamer.py instead.
+    To watch several contracts or events without blocking, use LogStreamer in scripts/log_streamer.py
     Args:
         brownie_contract ([brownie.network.contract.ProjectContract]):
         A brownie contract of some kind.
@@ -178,21 +233,22 @@ def listen_for_event(brownie_contract, event, timeout=200, poll_interval=2):
         poll_interval ([int]): How often to call your node to check for events.
         Defaults to 2 seconds.
     """
-    web3_contract = web3.eth.contract(
-        address=brownie_contract.address, abi=brownie_contract.abi
-    )
-    start_time = time.time()
-    current_time = time.time()
-    event_filter = web3_contract.events[event].createFilter(fromBlock="latest")
-    while current_time - start_time < timeout:
-        for event_response in event_filter.get_new_entries():
-            if event in event_response.event:
-                print("Found event!")
-                return event_response
-        time.sleep(poll_interval)
-        current_time = time.time()
-    print("Timeout reached, no event found.")
-    return {"event": None}
+    from scripts.log_streamer import wait_for_event
+
+    waiting = wait_for_event(web3, brownie_contract, event, timeout, poll_interval)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        event_response = asyncio.run(waiting)
+    else:
+        # asyncio.run raises inside a running event loop, so block on a loop of its own in another thread
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            event_response = executor.submit(asyncio.run, waiting).result()
+    if event_response is None:
+        print("Timeout reached, no event found.")
+        return {"event": None}
+    print("Found event!")
+    return event_response
 
 
 def get_verify_status():
@@ -218,10 +274,11 @@ def deploy_mock_protocol_in_use():
         {"from": account}, 
         publish_source=config["networks"][network.show_active()]["verify"]
     )
-    eth_usd_price_feed = get_contract("eth_usd_price_feed")
-    xau_usd_price_feed = get_contract("xau_usd_price_feed")
-    btc_usd_price_feed = get_contract("btc_usd_price_feed")
-    jpy_usd_price_feed = get_contract("jpy_usd_price_feed")
+    # its own price feeds, the answers below would move the registered feeds of other deployments
+    eth_usd_price_feed = get_contract("eth_usd_price_feed", fresh=True)
+    xau_usd_price_feed = get_contract("xau_usd_price_feed", fresh=True)
+    btc_usd_price_feed = get_contract("btc_usd_price_feed", fresh=True)
+    jpy_usd_price_feed = get_contract("jpy_usd_price_feed", fresh=True)
     eth_usd_price_feed.updateAnswer(1000_00000000, {"from": account})
     xau_usd_price_feed.updateAnswer(Web3.toWei(1600, "ether"), {"from": account})
     tx = gwin_ERC20.transfer(gwin_protocol.address, gwin_ERC20.totalSupply() - KEPT_BALANCE, {"from": account})
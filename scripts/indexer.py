@@ -0,0 +1,311 @@
+"""Incremental SQLite indexer of GwinProtocol state.
+
+Follows the GwinProtocol events with LogStreamer. For every block with events it reads the state
+those events touched, as of that block, and stores a row per changed key:
+
+    pool_state            pool balances, prices, rates and total shares of each tranche
+    parent_pool_state     ParentPoolBal of each parent pool
+    user_balances         ethStakedBalance shares of each user in each pool
+    parent_user_balances  ethStakedWithParent shares of each user in each parent pool
+
+A checkpoint holds the last block indexed, so a restart only processes new blocks. Rows of reorged
+out blocks are dropped and indexed again from the new canonical blocks. Reading state at past
+blocks needs an archive node when catching up on old history.
+
+Wei amounts and shares do not fit SQLite's 64 bit integers, so they are stored as decimal strings
+and the balance helpers below do the share math in Python, the same way the contract does.
+
+    brownie run scripts/indexer.py --network goerli
+    brownie run scripts/indexer.py main reports/gwin_index.db follow 8000000 --network goerli
+"""
+from eth_utils import to_hex
+from scripts.log_streamer import LogStreamer, REORG_DEPTH
+from scripts.settlement_engine import POOL_STRUCT_FIELDS, share_of_balance
+import asyncio
+import os
+import sqlite3
+import time
+
+DEFAULT_DB_PATH = "reports/gwin_index.db"
+BLOCKS_PER_BATCH = 10_000  # blocks of events held in memory and committed together while catching up
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block_number INTEGER NOT NULL,
+    block_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    block_number INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_by_timestamp ON blocks (timestamp);
+CREATE TABLE IF NOT EXISTS pool_state (
+    pool_id INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    parent_id INTEGER NOT NULL,
+    pool_type INTEGER NOT NULL,
+    c_rate INTEGER NOT NULL,
+    h_rate INTEGER NOT NULL,
+    last_settled_usd_price INTEGER NOT NULL,
+    current_usd_price INTEGER NOT NULL,
+    c_eth_bal TEXT NOT NULL,
+    h_eth_bal TEXT NOT NULL,
+    c_shares TEXT NOT NULL,
+    h_shares TEXT NOT NULL,
+    c_epoch INTEGER NOT NULL,
+    h_epoch INTEGER NOT NULL,
+    PRIMARY KEY (pool_id, block_number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS parent_pool_state (
+    parent_id INTEGER NOT NULL,
+    block_number INTEGER NOT NULL,
+    c_eth_bal TEXT NOT NULL,
+    h_eth_bal TEXT NOT NULL,
+    c_shares TEXT NOT NULL,
+    c_epoch INTEGER NOT NULL,
+    c_eth_needed TEXT NOT NULL,
+    PRIMARY KEY (parent_id, block_number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_balances (
+    pool_id INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    c_shares TEXT NOT NULL,
+    h_shares TEXT NOT NULL,
+    c_epoch INTEGER NOT NULL,
+    h_epoch INTEGER NOT NULL,
+    PRIMARY KEY (pool_id, user, block_number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS parent_user_balances (
+    parent_id INTEGER NOT NULL,
+    user TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    c_shares TEXT NOT NULL,
+    c_epoch INTEGER NOT NULL,
+    PRIMARY KEY (parent_id, user, block_number)
+) WITHOUT ROWID;
+"""
+
+STATE_TABLES = ["blocks", "pool_state", "parent_pool_state", "user_balances", "parent_user_balances"]
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    db = sqlite3.connect(db_path)
+    db.executescript(SCHEMA)
+    return db
+
+
+class Indexer:
+    def __init__(self, gwin_protocol, web3, db_path=DEFAULT_DB_PATH, from_block=0, confirmations=0):
+        self.gwin_protocol = gwin_protocol
+        self.web3 = web3
+        self.confirmations = confirmations
+        self.db = connect(db_path)
+        checkpoint = self.checkpoint()
+        if checkpoint is not None and checkpoint[1] is not None and checkpoint[1] != self.block_hash(checkpoint[0]):
+            # the chain changed while the indexer was stopped, index again from before any likely reorg
+            with self.db:
+                self.rollback(max(checkpoint[0] - REORG_DEPTH, from_block))
+            checkpoint = self.checkpoint()
+        self.last_block = checkpoint[0] if checkpoint is not None else from_block - 1
+        self.streamer = LogStreamer(web3, from_block=self.last_block + 1, poll_interval=0).watch(gwin_protocol)
+        # pool ID => parent pool ID, to find the parent balances a user action or rebalance touches
+        self.parent_ids = dict(self.db.execute("SELECT DISTINCT pool_id, parent_id FROM pool_state"))
+
+    def checkpoint(self):
+        return self.db.execute("SELECT block_number, block_hash FROM checkpoint").fetchone()
+
+    def block_hash(self, block_number):
+        return to_hex(self.web3.eth.get_block(block_number)["hash"])
+
+    def index(self, to_block=None):
+        """Indexes the blocks after the checkpoint up to to_block, or up to the head less the
+        confirmations, and returns the last block indexed."""
+        head = self.web3.eth.block_number - self.confirmations
+        to_block = head if to_block is None else min(int(to_block), head)
+        while self.last_block < to_block:
+            end = min(self.last_block + BLOCKS_PER_BATCH, to_block)
+            events = asyncio.run(collect_events(self.streamer, end))
+            with self.db:
+                self.apply(events, end)
+        return self.last_block
+
+    def follow(self, poll_interval=2):
+        while True:
+            self.index()
+            time.sleep(poll_interval)
+
+    def apply(self, events, end):
+        blocks = {}
+        for event in events:
+            if event.removed:
+                # the event's block was reorged out, so is everything indexed after it
+                self.rollback(event.block_number)
+                blocks = {number: block_events for number, block_events in blocks.items() if number < event.block_number}
+            else:
+                blocks.setdefault(event.block_number, []).append(event)
+        for block_number, block_events in blocks.items():
+            self.index_block(block_number, block_events[0].block_hash, block_events)
+        self.last_block = end
+        self.db.execute(
+            "INSERT OR REPLACE INTO checkpoint (id, block_number, block_hash) VALUES (0, ?, ?)",
+            (end, self.streamer.block_hashes.get(end) or self.block_hash(end)),
+        )
+
+    def rollback(self, block_number):
+        """Drops every row from block_number on, so those blocks are indexed again."""
+        for table in STATE_TABLES:
+            self.db.execute(f"DELETE FROM {table} WHERE block_number >= ?", (block_number,))
+        self.db.execute("UPDATE checkpoint SET block_number = ?, block_hash = NULL", (block_number - 1,))
+        self.last_block = block_number - 1
+        self.parent_ids = dict(self.db.execute("SELECT DISTINCT pool_id, parent_id FROM pool_state"))
+
+    def touched(self, events):
+        # the pools, parent pools and (pool, user) balances changed by a block's events
+        pools, parents, users, parent_users = set(), set(), set(), set()
+        for event in events:
+            args = event.args
+            if event.event == "PoolInitialized":
+                self.parent_ids[args["poolId"]] = args["parentId"]
+                pools.add(args["poolId"])
+                users.add((args["poolId"], args["creator"]))
+                if args["parentId"] != 0:
+                    parents.add(args["parentId"])
+                    parent_users.add((args["parentId"], args["creator"]))
+                    # a new child pool rebalances its siblings
+                    pools.update(self.children_of(args["parentId"]))
+            elif event.event in ("Deposit", "Withdraw"):
+                pools.add(args["poolId"])
+                users.add((args["poolId"], args["user"]))
+                parent_id = self.parent_ids.get(args["poolId"], 0)
+                if parent_id != 0:
+                    parents.add(parent_id)
+                    parent_users.add((parent_id, args["user"]))
+            elif event.event == "Settled":
+                pools.add(args["poolId"])
+                # settling a child pool also moves its parent pool's balances
+                if self.parent_ids.get(args["poolId"], 0) != 0:
+                    parents.add(self.parent_ids[args["poolId"]])
+            elif event.event == "ChildPoolsRebalanced":
+                parents.add(args["parentId"])
+                pools.update(self.children_of(args["parentId"]))
+            elif event.event == "TrancheLiquidated":
+                pools.add(args["poolId"])
+                if args["parentId"] != 0:
+                    parents.add(args["parentId"])
+        return pools, parents, users, parent_users
+
+    def children_of(self, parent_id):
+        return [pool_id for pool_id, pool_parent_id in self.parent_ids.items() if pool_parent_id == parent_id]
+
+    def index_block(self, block_number, block_hash, events):
+        pools, parents, users, parent_users = self.touched(events)
+        block = self.web3.eth.get_block(block_number)
+        self.db.execute(
+            "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)", (block_number, block_hash, block["timestamp"])
+        )
+        for pool_id in sorted(pools):
+            values = dict(zip(POOL_STRUCT_FIELDS, self.gwin_protocol.pool(pool_id, block_identifier=block_number)))
+            c_shares, h_shares, c_epoch, h_epoch = self.gwin_protocol.poolShares(pool_id, block_identifier=block_number)
+            self.db.execute(
+                "INSERT OR REPLACE INTO pool_state VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    pool_id,
+                    block_number,
+                    values["parent_id"],
+                    values["pool_type"],
+                    values["c_rate"],
+                    values["h_rate"],
+                    values["last_settled_usd_price"],
+                    values["current_usd_price"],
+                    str(values["c_eth_bal"]),
+                    str(values["h_eth_bal"]),
+                    str(c_shares),
+                    str(h_shares),
+                    c_epoch,
+                    h_epoch,
+                ),
+            )
+        for parent_id in sorted(parents):
+            c_eth_bal, h_eth_bal, c_shares, c_epoch, c_eth_needed = self.gwin_protocol.parentPoolBal(parent_id, block_identifier=block_number)
+            self.db.execute(
+                "INSERT OR REPLACE INTO parent_pool_state VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (parent_id, block_number, str(c_eth_bal), str(h_eth_bal), str(c_shares), c_epoch, str(c_eth_needed)),
+            )
+        for pool_id, user in sorted(users):
+            c_shares, h_shares, c_epoch, h_epoch = self.gwin_protocol.ethStakedBalance(pool_id, user, block_identifier=block_number)
+            self.db.execute(
+                "INSERT OR REPLACE INTO user_balances VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (pool_id, str(user), block_number, str(c_shares), str(h_shares), c_epoch, h_epoch),
+            )
+        for parent_id, user in sorted(parent_users):
+            c_shares, c_epoch = self.gwin_protocol.ethStakedWithParent(parent_id, user, block_identifier=block_number)
+            self.db.execute(
+                "INSERT OR REPLACE INTO parent_user_balances VALUES (?, ?, ?, ?, ?)",
+                (parent_id, str(user), block_number, str(c_shares), c_epoch),
+            )
+
+
+async def collect_events(streamer, to_block):
+    return [event async for event in streamer.stream(to_block)]
+
+
+# ************* Queries *************
+
+def cooled_balance_history(db, pool_id, since=0):
+    """Every user's cooled balance in a single pool at each indexed block since a timestamp,
+    as (block_number, timestamp, user, balance) rows."""
+    rows = db.execute(
+        """
+        SELECT p.block_number, b.timestamp, u.user, p.c_eth_bal, p.c_shares, p.c_epoch, u.c_shares, u.c_epoch
+        FROM pool_state p
+        JOIN blocks b ON b.block_number = p.block_number
+        JOIN user_balances u ON u.pool_id = p.pool_id AND u.block_number = (
+            SELECT MAX(block_number) FROM user_balances
+            WHERE pool_id = p.pool_id AND user = u.user AND block_number <= p.block_number
+        )
+        WHERE p.pool_id = ? AND b.timestamp >= ?
+        ORDER BY p.block_number, u.user
+        """,
+        (pool_id, since),
+    )
+    return [
+        (block_number, timestamp, user, share_of_balance(c_eth_bal, user_shares, c_shares, user_epoch, c_epoch))
+        for block_number, timestamp, user, c_eth_bal, c_shares, c_epoch, user_shares, user_epoch in rows
+    ]
+
+
+def parent_cooled_balance_history(db, parent_id, since=0):
+    """Every user's cooled balance in a parent pool at each indexed block since a timestamp,
+    as (block_number, timestamp, user, balance) rows."""
+    rows = db.execute(
+        """
+        SELECT p.block_number, b.timestamp, u.user, p.c_eth_bal, p.c_shares, p.c_epoch, u.c_shares, u.c_epoch
+        FROM parent_pool_state p
+        JOIN blocks b ON b.block_number = p.block_number
+        JOIN parent_user_balances u ON u.parent_id = p.parent_id AND u.block_number = (
+            SELECT MAX(block_number) FROM parent_user_balances
+            WHERE parent_id = p.parent_id AND user = u.user AND block_number <= p.block_number
+        )
+        WHERE p.parent_id = ? AND b.timestamp >= ?
+        ORDER BY p.block_number, u.user
+        """,
+        (parent_id, since),
+    )
+    return [
+        (block_number, timestamp, user, share_of_balance(c_eth_bal, user_shares, c_shares, user_epoch, c_epoch))
+        for block_number, timestamp, user, c_eth_bal, c_shares, c_epoch, user_shares, user_epoch in rows
+    ]
+
+
+def main(db_path=DEFAULT_DB_PATH, mode="once", from_block=0):
+    from brownie import GwinProtocol, web3
+
+    indexer = Indexer(GwinProtocol[-1], web3, db_path, int(from_block))
+    print(f"Indexed to block {indexer.index()}")
+    if mode == "follow":
+        indexer.follow()
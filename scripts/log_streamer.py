@@ -0,0 +1,211 @@
+"""Asyncio log streamer for GwinProtocol and any other contracts with an ABI.
+
+A single LogStreamer watches several contracts and events at once. It catches up from a starting block
+with bulk eth_getLogs pages and then follows the chain head. Decoded events come out through an async
+iterator in chain order:
+
+    streamer = LogStreamer(web3, from_block=0).watch(gwin_protocol, ["Settled", "TrancheLiquidated"]).watch(gwin_ERC20)
+    async for event in streamer:
+        print(event.event, event.args)
+
+Reorgs are detected by comparing the hashes of recently processed blocks with the canonical chain. When
+blocks that events were yielded from are dropped, those events are yielded again with removed set to
+True, and the new canonical blocks are streamed. Set confirmations to only stream blocks that deep.
+
+The RPC calls are blocking web3 calls run in the default executor, so one event loop can hold any
+number of streamers next to other tasks.
+
+    brownie run scripts/log_streamer.py --network ganache
+    brownie run scripts/log_streamer.py main 0 --network ganache
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from eth_utils import event_abi_to_log_topic, to_checksum_address, to_hex
+from web3.exceptions import BlockNotFound
+import asyncio
+
+PAGE_SIZE = 2000  # blocks per eth_getLogs request, halved when a node refuses a range
+REORG_DEPTH = 64  # blocks behind the head checked for reorgs
+
+
+@dataclass
+class StreamedEvent:
+    event: str
+    args: dict
+    address: str
+    block_number: int
+    block_hash: str
+    transaction_hash: str
+    log_index: int
+    removed: bool = False  # the block holding the event was reorged out
+
+
+class LogStreamer:
+    def __init__(self, web3, from_block="latest", confirmations=0, page_size=PAGE_SIZE, poll_interval=2, reorg_depth=REORG_DEPTH):
+        self.web3 = web3
+        self.from_block = from_block
+        self.confirmations = confirmations
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self.reorg_depth = reorg_depth
+        self.contracts = {}  # address => web3 contract
+        self.events = {}  # (address, topic) => event name
+        self.block_hashes = OrderedDict()  # block number => hash of the processed blocks checked for reorgs
+        self.emitted = {}  # block number => events yielded from it, while it could still be reorged out
+        self.next_block = None
+
+    def watch(self, contract, events=None):
+        """Adds a contract's events to the stream, all of them unless event names are given."""
+        address = to_checksum_address(contract.address)
+        self.contracts[address] = self.web3.eth.contract(address=address, abi=contract.abi)
+        for abi in contract.abi:
+            if abi["type"] == "event" and (events is None or abi["name"] in events):
+                self.events[(address, to_hex(event_abi_to_log_topic(abi)))] = abi["name"]
+        return self
+
+    def __aiter__(self):
+        return self.stream()
+
+    async def stream(self, to_block=None):
+        """Yields the events of every watched contract in chain order, following the head until
+        to_block has been streamed, or forever if it is None."""
+        if self.next_block is None:
+            self.next_block = await self._start_block()
+        while True:
+            for event in await self._rewind():
+                yield event
+            head = await self._call(lambda: self.web3.eth.block_number) - self.confirmations
+            if to_block is not None:
+                head = min(head, to_block)
+            if head >= self.next_block:
+                # state is updated before yielding, so a consumer that stops mid batch does not see events twice
+                for event in await self._advance(head):
+                    yield event
+            if to_block is not None and self.next_block > to_block:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _start_block(self):
+        if self.from_block == "latest":
+            # only events from blocks after the streamer starts, like a filter from "latest"
+            return await self._call(lambda: self.web3.eth.block_number) + 1
+        return int(self.from_block)
+
+    async def _block_hash(self, number):
+        try:
+            return to_hex((await self._call(self.web3.eth.get_block, number))["hash"])
+        except BlockNotFound:
+            # the chain is now shorter than the block
+            return None
+
+    async def _advance(self, head):
+        # an anchor block at most reorg_depth behind the head, so a reorg of every block since the
+        # last poll still finds a canonical block to step back to
+        anchor = max(self.next_block - 1, head - self.reorg_depth)
+        if anchor >= 0 and anchor not in self.block_hashes:
+            self.block_hashes[anchor] = await self._block_hash(anchor)
+        tip_hash = await self._block_hash(head)
+        logs = await self._get_logs(self.next_block, head)
+        events = [self._decode(log) for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"]))]
+        events = [event for event in events if event is not None]
+        for event in events:
+            self.emitted.setdefault(event.block_number, []).append(event)
+            self.block_hashes[event.block_number] = event.block_hash
+        self.block_hashes[head] = tip_hash
+        self.block_hashes = OrderedDict(sorted(self.block_hashes.items()))
+        self.next_block = head + 1
+        self._prune(head)
+        return events
+
+    async def _get_logs(self, from_block, to_block):
+        # one request covers every watched contract and event
+        params = {
+            "address": list(self.contracts),
+            "topics": [sorted({topic for address, topic in self.events})],
+        }
+        logs = []
+        page_size = self.page_size
+        start = from_block
+        while start <= to_block:
+            end = min(start + page_size - 1, to_block)
+            try:
+                logs += await self._call(self.web3.eth.get_logs, {**params, "fromBlock": start, "toBlock": end})
+            except ValueError:
+                # nodes cap the results or range of a request, retry the page with half the range
+                if page_size == 1:
+                    raise
+                page_size = max(page_size // 2, 1)
+                continue
+            start = end + 1
+        return logs
+
+    def _decode(self, log):
+        address = to_checksum_address(log["address"])
+        name = self.events.get((address, to_hex(log["topics"][0]))) if log["topics"] else None
+        if name is None:
+            # same topic from a watched contract, but not an event that was asked for
+            return None
+        decoded = self.contracts[address].events[name]().processLog(log)
+        return StreamedEvent(
+            event=name,
+            args=dict(decoded["args"]),
+            address=address,
+            block_number=log["blockNumber"],
+            block_hash=to_hex(log["blockHash"]),
+            transaction_hash=to_hex(log["transactionHash"]),
+            log_index=log["logIndex"],
+        )
+
+    async def _rewind(self):
+        """Steps back to the last processed block still on the canonical chain and returns the
+        events yielded from the blocks after it, marked as removed and latest first."""
+        removed = []
+        checked = bool(self.block_hashes)
+        while self.block_hashes:
+            number, block_hash = next(reversed(self.block_hashes.items()))
+            if await self._block_hash(number) == block_hash:
+                # blocks before a canonical block are canonical too, stream again from the one after it
+                self.next_block = min(self.next_block, number + 1)
+                return removed
+            self.block_hashes.popitem()
+            removed += [replace(event, removed=True) for event in reversed(self.emitted.pop(number, []))]
+            self.next_block = number
+        if checked:
+            raise Exception(f"Reorg deeper than the {self.reorg_depth} blocks checked, restart the stream from an earlier block")
+        return removed
+
+    def _prune(self, head):
+        # the last processed block is always kept to check the next poll against
+        while len(self.block_hashes) > 1 and next(iter(self.block_hashes)) < head - self.reorg_depth:
+            self.emitted.pop(self.block_hashes.popitem(last=False)[0], None)
+
+
+async def wait_for_event(web3, contract, event, timeout=200, poll_interval=2):
+    """Waits for the next event of a contract, returns None on timeout."""
+    streamer = LogStreamer(web3, poll_interval=poll_interval).watch(contract, [event])
+
+    async def first_event():
+        async for streamed_event in streamer:
+            if not streamed_event.removed:
+                return streamed_event
+
+    try:
+        return await asyncio.wait_for(first_event(), timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+def main(from_block="latest"):
+    from brownie import GwinProtocol, GwinToken, web3
+
+    streamer = LogStreamer(web3, from_block=from_block).watch(GwinProtocol[-1]).watch(GwinToken[-1], ["Transfer"])
+
+    async def print_events():
+        async for event in streamer:
+            status = " (removed)" if event.removed else ""
+            print(f"{event.block_number} {event.event}{status}: {event.args}")
+
+    asyncio.run(print_events())
@@ -0,0 +1,220 @@
+"""Monte Carlo simulator of tranche outcomes over many price paths at once.
+
+Pushes a matrix of price paths (one row per path) through the settlement math of simulateInteract,
+vectorized across paths with NumPy. Balances are floats in ETH and prices are floats in USD. Values
+are truncated to usdDecimals and Wei like the contract, so a tranche that pays out in full keeps the
+same kind of dust it would on chain. Balances only match scripts/settlement_engine.py to float
+precision though, and a path where an emptied tranche keeps dust and is later paid into again can
+drift from the exact engine, use the engine to replay such a path. Only single pools are simulated,
+child pools of a parent are not.
+
+    brownie run scripts/monte_carlo.py
+    brownie run scripts/monte_carlo.py main reports/monte_carlo.json jump 10000 1000
+    brownie run scripts/monte_carlo.py main reports/monte_carlo.json bootstrap 10000 1000 prices.csv
+
+Requires numpy, i.e. pipx inject eth-brownie numpy
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import csv
+import json
+import os
+
+DEFAULT_REPORT_PATH = "reports/monte_carlo.json"
+BPS = 10**12  # rates are percents followed by 10 decimals, as passed to initializePool
+USD_DECIMALS = 10**8
+WEI = 10**18
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+
+@dataclass
+class PoolConfig:
+    pool_type: int  # as in classic (0) or modified (1)
+    c_rate: int  # i.e. -50_0000000000
+    h_rate: int  # i.e. 50_0000000000
+    c_eth_bal: float  # in ETH
+    h_eth_bal: float  # in ETH
+    price: float  # initial price in USD
+
+
+@dataclass
+class SimulationResult:
+    c_eth_bals: np.ndarray  # final cooled balance of each path in ETH
+    h_eth_bals: np.ndarray  # final heated balance of each path in ETH
+    c_liquidated_step: np.ndarray  # step the cooled tranche was paid out, -1 if never
+    h_liquidated_step: np.ndarray  # step the heated tranche was paid out, -1 if never
+    final_prices: np.ndarray
+
+
+# ************* Price Paths *************
+
+def gbm_paths(price, paths, steps, mu=0.0, sigma=0.8, dt=1 / (365 * 24), seed=None):
+    # geometric brownian motion with annualized drift and volatility, hourly steps by default
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((paths, steps))
+    log_returns = (mu - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * shocks
+    return price * np.exp(np.cumsum(log_returns, axis=1))
+
+
+def jump_paths(price, paths, steps, mu=0.0, sigma=0.8, jump_rate=5.0, jump_mean=-0.05, jump_std=0.1, dt=1 / (365 * 24), seed=None):
+    # geometric brownian motion with log normal jumps arriving jump_rate times a year
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((paths, steps))
+    jump_counts = rng.poisson(jump_rate * dt, (paths, steps))
+    jumps = jump_mean * jump_counts + jump_std * np.sqrt(jump_counts) * rng.standard_normal((paths, steps))
+    log_returns = (mu - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * shocks + jumps
+    return price * np.exp(np.cumsum(log_returns, axis=1))
+
+
+def bootstrap_paths(price, paths, steps, history, seed=None):
+    # resample the log returns of a historical price series with replacement
+    rng = np.random.default_rng(seed)
+    history = np.asarray(history, dtype=float)
+    log_returns = np.diff(np.log(history))
+    samples = rng.choice(log_returns, size=(paths, steps), replace=True)
+    return price * np.exp(np.cumsum(samples, axis=1))
+
+
+PATH_GENERATORS = {
+    "gbm": gbm_paths,
+    "jump": jump_paths,
+    "bootstrap": bootstrap_paths,
+}
+
+
+def load_history(path, column="eth_usd_price_feed"):
+    # a price CSV as scripts/price_driver.py reads, one row per step and a column per feed name with the price in USD
+    with open(path) as f:
+        return [float(row[column]) for row in csv.DictReader(f) if row.get(column)]
+
+
+# ************* Settlement *************
+
+def allocation_difference(pool_type, rate, cooled_ratio, change):
+    # difference between the expected payout of a tranche and its natural change, in usdDecimals
+    if pool_type == 0:
+        return np.trunc(change * rate)
+    # modified pools shift the rate by the weight of the larger tranche
+    return np.trunc(change * np.where(cooled_ratio > 0.5, rate - cooled_ratio, rate - (1 - cooled_ratio)))
+
+
+def settle_paths(config, c_eth_bals, h_eth_bals, last_prices, prices):
+    """Settles every path at its price, returns the new balances and last settled prices."""
+    c_rate = config.c_rate / BPS
+    h_rate = config.h_rate / BPS
+    # pools without opposing balances or a price change are left as is
+    settling = (c_eth_bals > 0) & (h_eth_bals > 0) & (prices != last_prices)
+    total = np.where(settling, c_eth_bals + h_eth_bals, 1.0)
+    cooled_ratio = c_eth_bals / total
+    # USD values are truncated to usdDecimals as on chain, a fully paid out tranche can keep dust
+    usd_prices = prices * USD_DECIMALS
+    usd_change = (prices - last_prices) * USD_DECIMALS
+    cooled_diff = allocation_difference(config.pool_type, c_rate, cooled_ratio, c_eth_bals * usd_change)
+    heated_diff = allocation_difference(config.pool_type, h_rate, cooled_ratio, h_eth_bals * usd_change)
+    non_natural_multiplier = np.where(prices > last_prices, cooled_ratio, 1 - cooled_ratio)
+    abs_allocation_total = np.minimum(np.abs(cooled_diff), np.abs(heated_diff)) + np.floor(np.abs(heated_diff + cooled_diff) * non_natural_multiplier)
+    # move USD value between the tranches, capped at the balance of the paying tranche
+    cooled_usd = np.floor(c_eth_bals * usd_prices)
+    heated_usd = np.floor(h_eth_bals * usd_prices)
+    to_cooled = np.where(cooled_diff < 0, -np.minimum(abs_allocation_total, cooled_usd), np.minimum(abs_allocation_total, heated_usd))
+    cooled_after = cooled_usd + to_cooled
+    heated_after = np.floor((c_eth_bals + h_eth_bals) * usd_prices) - cooled_after
+    new_c_eth_bals = np.where(settling, to_eth(cooled_after, usd_prices), c_eth_bals)
+    new_h_eth_bals = np.where(settling, to_eth(heated_after, usd_prices), h_eth_bals)
+    return new_c_eth_bals, new_h_eth_bals, np.where(settling, prices, last_prices)
+
+
+def to_eth(usd, usd_prices):
+    # converts a value in usdDecimals to ETH, truncated to the Wei
+    return np.floor(np.maximum(usd, 0) / usd_prices * WEI) / WEI
+
+
+def simulate_pool_paths(config, price_paths, settle_every=1):
+    """Runs price paths through a pool, settling every settle_every steps, i.e. on each user interaction."""
+    price_paths = np.asarray(price_paths, dtype=float)
+    paths, steps = price_paths.shape
+    c_eth_bals = np.full(paths, float(config.c_eth_bal))
+    h_eth_bals = np.full(paths, float(config.h_eth_bal))
+    last_prices = np.full(paths, float(config.price))
+    c_liquidated_step = np.full(paths, -1)
+    h_liquidated_step = np.full(paths, -1)
+    for step in range(settle_every - 1, steps, settle_every):
+        c_eth_bals, h_eth_bals, last_prices = settle_paths(config, c_eth_bals, h_eth_bals, last_prices, price_paths[:, step])
+        # a tranche worth less than one usdDecimal has been paid out, even if it keeps some Wei
+        usd_prices = last_prices * USD_DECIMALS
+        c_liquidated_step = np.where((c_liquidated_step < 0) & (c_eth_bals * usd_prices < 1), step, c_liquidated_step)
+        h_liquidated_step = np.where((h_liquidated_step < 0) & (h_eth_bals * usd_prices < 1), step, h_liquidated_step)
+    return SimulationResult(c_eth_bals, h_eth_bals, c_liquidated_step, h_liquidated_step, price_paths[:, -1])
+
+
+def simulate_chunk(config, generator, paths, steps, settle_every, seed, generator_kwargs):
+    price_paths = PATH_GENERATORS[generator](config.price, paths, steps, seed=seed, **generator_kwargs)
+    return simulate_pool_paths(config, price_paths, settle_every)
+
+
+def simulate(config, generator="gbm", paths=10_000, steps=1_000, settle_every=1, seed=None, workers=1, **generator_kwargs):
+    """Generates price paths and simulates them, split across a process pool when workers > 1."""
+    if workers <= 1:
+        return simulate_chunk(config, generator, paths, steps, settle_every, seed, generator_kwargs)
+    # independent random streams for each chunk of paths
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    chunk_paths = [len(chunk) for chunk in np.array_split(np.arange(paths), workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = list(
+            executor.map(
+                simulate_chunk,
+                [config] * workers,
+                [generator] * workers,
+                chunk_paths,
+                [steps] * workers,
+                [settle_every] * workers,
+                seeds,
+                [generator_kwargs] * workers,
+            )
+        )
+    return SimulationResult(*(np.concatenate([getattr(chunk, name) for chunk in chunks]) for name in SimulationResult.__dataclass_fields__))
+
+
+# ************* Reporting *************
+
+def summarize(result):
+    """Distributions of the final balances and the liquidation probabilities of a simulation."""
+    return {
+        "paths": len(result.final_prices),
+        "cooled_liquidation_probability": float(np.mean(result.c_liquidated_step >= 0)),
+        "heated_liquidation_probability": float(np.mean(result.h_liquidated_step >= 0)),
+        "c_eth_bal_percentiles": dict(zip(PERCENTILES, np.percentile(result.c_eth_bals, PERCENTILES).tolist())),
+        "h_eth_bal_percentiles": dict(zip(PERCENTILES, np.percentile(result.h_eth_bals, PERCENTILES).tolist())),
+        "final_price_percentiles": dict(zip(PERCENTILES, np.percentile(result.final_prices, PERCENTILES).tolist())),
+    }
+
+
+def settlement_frequency_report(config, generator="gbm", paths=10_000, steps=1_000, intervals=(1, 10, 100), seed=0, **generator_kwargs):
+    # the same paths settled at different intervals, fewer settlements net price moves between them
+    price_paths = PATH_GENERATORS[generator](config.price, paths, steps, seed=seed, **generator_kwargs)
+    return {str(interval): summarize(simulate_pool_paths(config, price_paths, interval)) for interval in intervals}
+
+
+def main(output=DEFAULT_REPORT_PATH, generator="gbm", paths=10_000, steps=1_000, history=None):
+    # an evenly weighted classic pool, as in the local deployment
+    config = PoolConfig(0, -50_0000000000, 50_0000000000, 10.0, 10.0, 1000.0)
+    generator_kwargs = {}
+    if generator == "bootstrap":
+        # history is the path of the price CSV to resample
+        if not history:
+            raise Exception("The bootstrap generator needs a price history CSV")
+        generator_kwargs["history"] = load_history(history)
+    report = {
+        "config": config.__dict__,
+        "generator": generator,
+        "steps": int(steps),
+        "settle_every": settlement_frequency_report(config, generator, int(paths), int(steps), **generator_kwargs),
+    }
+    for interval, summary in report["settle_every"].items():
+        print(f'settle every {interval:>4} steps: cooled liquidated {summary["cooled_liquidation_probability"]:.2%}, heated liquidated {summary["heated_liquidation_probability"]:.2%}')
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
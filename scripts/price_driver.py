@@ -0,0 +1,123 @@
+from brownie import network, chain
+from scripts.helpful_scripts import NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS, LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account
+from scripts.deploy import deploy_gwin_protocol_and_gwin_token
+import csv
+import math
+import random
+import time
+
+# NOTE: Scenarios yield one {feed name: answer} dict per tick, answers are in each feed's own decimals
+#
+# Soak test a fresh deployment of the pools in deploy_pools.py, settling them on every tick:
+#   brownie run scripts/price_driver.py main step --network ganache
+#   brownie run scripts/price_driver.py main gbm 42 5000 --network ganache
+#   brownie run scripts/price_driver.py main csv prices.csv --network ganache
+
+TICK_INTERVAL = 20  # seconds between ticks
+HOURLY = 1 / (365 * 24)  # a tick as a fraction of a year
+
+
+def latest_answers(price_feeds):
+    return {name: feed.latestRoundData()[1] for name, feed in price_feeds.items()}
+
+
+def triangle_offset(step, steps_per_direction):
+    # steps from the start along a wave rising steps_per_direction steps, falling to as far below and rising back
+    step %= 4 * steps_per_direction
+    if step <= steps_per_direction:
+        return step
+    if step <= 3 * steps_per_direction:
+        return 2 * steps_per_direction - step
+    return step - 4 * steps_per_direction
+
+
+def step_scenario(price_feeds, ticks=1000, step_percent=1, steps_per_direction=10, base_feeds=("eth_usd_price_feed",)):
+    # every feed moves by step_percent of its starting price per tick, the base feeds along the wave and the quote
+    # feeds against it, so the derived prices of the pools, i.e. ETH/XAU, move too
+    start = latest_answers(price_feeds)
+    for tick in range(1, ticks + 1):
+        offset = triangle_offset(tick, steps_per_direction)
+        yield {
+            name: answer + (answer * step_percent * (offset if name in base_feeds else -offset)) // 100
+            for name, answer in start.items()
+        }
+
+
+def gbm_scenario(price_feeds, ticks=1000, seed=None, mu=0.0, sigma=0.8, dt=HOURLY):
+    # geometric brownian motion for each feed with annualized drift and volatility
+    rng = random.Random(seed)
+    prices = {name: float(answer) for name, answer in latest_answers(price_feeds).items()}
+    for tick in range(ticks):
+        for name in prices:
+            prices[name] *= math.exp((mu - 0.5 * sigma**2) * dt + sigma * math.sqrt(dt) * rng.gauss(0, 1))
+        yield {name: int(price) for name, price in prices.items()}
+
+
+def csv_scenario(price_feeds, path):
+    # one row per tick, a column per feed name with the price in USD, i.e. eth_usd_price_feed,xau_usd_price_feed
+    feed_decimals = {name: feed.decimals() for name, feed in price_feeds.items()}
+    with open(path) as f:
+        for row in csv.DictReader(f):
+            yield {
+                name: int(round(float(row[name]) * 10**decimals))
+                for name, decimals in feed_decimals.items()
+                if row.get(name)
+            }
+
+
+def build_scenario(price_feeds, scenario="step", source=None, ticks=1000):
+    # source is the seed for "gbm" or the CSV path for "csv", arguments may come from the command line as strings
+    if scenario == "csv":
+        return csv_scenario(price_feeds, source)
+    if scenario == "gbm":
+        return gbm_scenario(price_feeds, int(ticks), int(source) if source is not None else None)
+    if scenario == "step":
+        return step_scenario(price_feeds, int(ticks))
+    raise Exception(f"Unknown price scenario: {scenario}")
+
+
+def drive_prices(price_feeds, scenario, account, interval=TICK_INTERVAL, realtime=False, on_tick=None):
+    """Moves the price feeds through a scenario, all feeds are updated on each tick.
+    On development chains time is advanced by interval and a block is mined between ticks,
+    unless realtime is set, i.e. to trade through a front-end while the prices move."""
+    ticks = 0
+    for answers in scenario:
+        for name, answer in answers.items():
+            price_feeds[name].updateAnswer(answer, {"from": account})
+        ticks += 1
+        if on_tick is not None:
+            on_tick(ticks, answers)
+        if network.show_active() in NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS and not realtime:
+            chain.sleep(interval)
+            chain.mine()
+        else:
+            time.sleep(interval)
+    return ticks
+
+
+def main(scenario="step", source=None, ticks=1000):
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        raise Exception("Only for local soak testing!")
+    from scripts.deploy_pools import POOLS, deploy_pools # deploy_pools imports this module
+
+    account = get_account() # Protocol
+    non_owner = get_account(index=4) # Keeper and price feed updater
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    price_feeds = {
+        "eth_usd_price_feed": eth_usd_price_feed,
+        "xau_usd_price_feed": xau_usd_price_feed,
+        "btc_usd_price_feed": btc_usd_price_feed,
+        "jpy_usd_price_feed": jpy_usd_price_feed,
+    }
+    pool_ids = deploy_pools(gwin_protocol, POOLS, price_feeds, account, 10)
+    prices = build_scenario(price_feeds, scenario, source, ticks)
+
+    def settle(tick, answers):
+        # settle every pool on each tick, as a keeper would
+        gwin_protocol.settlePools(list(pool_ids.values()), {"from": non_owner})
+
+    start = time.time()
+    count = drive_prices(price_feeds, prices, non_owner, on_tick=settle)
+    print(f"Drove {count} ticks in {time.time() - start:.1f}s")
+    for name, pool_id in pool_ids.items():
+        print(f"{name}: cEth {gwin_protocol.retrieveProtocolCEthBalance(pool_id)}, hEth {gwin_protocol.retrieveProtocolHEthBalance(pool_id)}")
@@ -0,0 +1,378 @@
+"""Exact integer reference engine of the GwinProtocol settlement math.
+
+Mirrors initializePool, settle/interact and the settlement kernel, interactByPool
+and reAdjustChildPools, and the tranche share accounting of deposits, withdrawals and liquidations
+in plain Python integers, so what-if questions and test oracles do not need a running chain.
+Nothing here imports brownie.
+
+Solidity division truncates toward zero, so signed divisions go through sdiv rather than //.
+Conversions and subtractions that would revert on chain raise SolidityRevert.
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+
+# ********* Decimal Values *********
+DECIMALS = 10**18
+USD_DECIMALS_UINT = 8
+USD_DECIMALS = 10**USD_DECIMALS_UINT
+BPS = 10**12
+
+# Field order of the public pool(poolId) getter
+POOL_STRUCT_FIELDS = (
+    "id",
+    "parent_id",
+    "last_settled_usd_price",
+    "current_usd_price",
+    "base_price_feed_key",
+    "quote_price_feed_key",
+    "h_eth_bal",
+    "c_eth_bal",
+    "h_rate",
+    "c_rate",
+    "pool_type",
+    "ceth_per_heth",
+)
+
+
+class SolidityRevert(Exception):
+    pass
+
+
+def sdiv(a, b):
+    # int256 division, truncates toward zero
+    if b == 0:
+        raise SolidityRevert("Division_By_Zero")
+    quotient = abs(a) // abs(b)
+    return quotient if (a >= 0) == (b >= 0) else -quotient
+
+
+def to_uint(x):
+    # an explicit uint256(x) of a negative value wraps, and the multiplication that follows overflows
+    if x < 0:
+        raise SolidityRevert("Arithmetic_Overflow")
+    return x
+
+
+@dataclass
+class TrancheShares:
+    """Shares of one tranche, of a single pool or of a parent pool's cooled tranche."""
+
+    total: int = 0
+    epoch: int = 0  # increased on each liquidation of the tranche
+    users: dict = field(default_factory=dict)  # user => (shares, epoch)
+
+    def user_shares(self, user):
+        # shares from a liquidated epoch are worth nothing
+        shares, epoch = self.users.get(user, (0, 0))
+        return shares if epoch == self.epoch else 0
+
+
+@dataclass
+class Pool:
+    id: int
+    pool_type: int  # as in classic (0) or modified (1)
+    c_rate: int
+    h_rate: int
+    c_eth_bal: int
+    h_eth_bal: int
+    last_settled_usd_price: int  # in usdDecimals
+    current_usd_price: int = 0
+    parent_id: int = 0
+    ceth_per_heth: Optional[int] = None  # fixed by the rates at initialization
+    parent: "ParentPool" = field(default=None, repr=False, compare=False)
+    c_shares: TrancheShares = field(default_factory=TrancheShares, repr=False, compare=False)  # unused in a child pool
+    h_shares: TrancheShares = field(default_factory=TrancheShares, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.ceth_per_heth is None:
+            self.ceth_per_heth = abs(self.h_rate) // abs(self.c_rate)
+        if not self.current_usd_price:
+            self.current_usd_price = self.last_settled_usd_price
+
+
+@dataclass
+class ParentPool:
+    id: int
+    c_eth_bal: int = 0
+    h_eth_bal: int = 0
+    children: list = field(default_factory=list, repr=False)
+    c_shares: TrancheShares = field(default_factory=TrancheShares, repr=False)  # the cooled tranche of every child pool
+
+    @property
+    def c_eth_needed(self):
+        # sum of hEthBal * cethPerHeth over the child pools
+        return sum(child.h_eth_bal * child.ceth_per_heth for child in self.children)
+
+
+def shares_for_deposit(amount, tranche_bal, total_shares):
+    """Mirrors sharesForDeposit, the shares issued for a deposit into a tranche."""
+    if total_shares == 0 or tranche_bal == 0:
+        # an empty tranche issues shares 1:1 with Wei
+        return amount
+    return (amount * total_shares) // tranche_bal
+
+
+def shares_for_withdrawal(amount, tranche_bal, total_shares):
+    """Mirrors sharesForWithdrawal, the shares burned for a withdrawal from a tranche."""
+    if tranche_bal == 0:
+        raise SolidityRevert("Insufficient_User_Funds")
+    # round up so that a withdrawal never burns less than it is worth
+    return (amount * total_shares + tranche_bal - 1) // tranche_bal
+
+
+def share_of_balance(bal, shares, total_shares, epoch=0, current_epoch=0):
+    """Mirrors shareOfBalance, the part of a tranche balance that shares are worth."""
+    # shares from a liquidated epoch are worth nothing
+    if epoch != current_epoch or int(total_shares) == 0:
+        return 0
+    return int(bal) * int(shares) // int(total_shares)
+
+
+def issue_shares(tranche, user, amount, tranche_bal):
+    """Mirrors the issue*Shares functions, must run before the deposit is added to the tranche balance."""
+    shares = shares_for_deposit(amount, tranche_bal, tranche.total)
+    tranche.users[user] = (tranche.user_shares(user) + shares, tranche.epoch)
+    tranche.total += shares
+    return shares
+
+
+def burn_shares(tranche, user, amount, tranche_bal, is_all=False):
+    """Mirrors the burn*Shares functions, must run before the withdrawal is deducted from the tranche balance."""
+    user_shares = tranche.user_shares(user)
+    shares = user_shares if is_all else shares_for_withdrawal(amount, tranche_bal, tranche.total)
+    if shares > user_shares:
+        raise SolidityRevert("Insufficient_User_Funds")
+    tranche.users[user] = (user_shares - shares, tranche.epoch)
+    tranche.total -= shares
+    return shares
+
+
+def liquidate_if_zero(tranche, tranche_bal):
+    """Mirrors liquidateIfZero for one tranche, returns True if its shares were cancelled."""
+    if tranche_bal != 0 or tranche.total == 0:
+        return False
+    tranche.total = 0
+    tranche.epoch += 1
+    return True
+
+
+def pool_from_struct(values, parent=None):
+    """Builds a Pool from the values returned by the pool(poolId) getter."""
+    fields = dict(zip(POOL_STRUCT_FIELDS, values))
+    return Pool(
+        id=fields["id"],
+        pool_type=fields["pool_type"],
+        c_rate=fields["c_rate"],
+        h_rate=fields["h_rate"],
+        c_eth_bal=fields["c_eth_bal"],
+        h_eth_bal=fields["h_eth_bal"],
+        last_settled_usd_price=fields["last_settled_usd_price"],
+        current_usd_price=fields["current_usd_price"],
+        parent_id=fields["parent_id"],
+        ceth_per_heth=fields["ceth_per_heth"],
+        parent=parent,
+    )
+
+
+def parent_from_structs(parent_id, child_values):
+    """Builds a ParentPool and its child Pools from the pool(poolId) getter values of each child."""
+    parent = ParentPool(parent_id)
+    for values in child_values:
+        child = pool_from_struct(values, parent)
+        parent.children.append(child)
+        parent.c_eth_bal += child.c_eth_bal
+        parent.h_eth_bal += child.h_eth_bal
+    return parent
+
+
+def initialize_pool(pool_id, pool_type, c_rate, h_rate, value, price, parent=None, user=None, prices=None):
+    """Mirrors initializePool, adding the pool to its parent pool if given.
+
+    The child pools already in the parent settle at prices (a single price, or a mapping of pool ID to
+    price as in interact_by_pool, by default the price of the new pool) before the depositor's cooled
+    shares are issued against the parent balance, as on chain.
+    """
+    if not (c_rate < 0 and h_rate > 0):
+        raise SolidityRevert("Rates_Must_Oppose")
+    if pool_type != 0:
+        c_deposit_amount = value // 2
+        h_deposit_amount = value // 2
+    else:
+        c_eth_percent = (abs(h_rate) * BPS) // (abs(h_rate) + abs(c_rate))
+        c_deposit_amount = (value * c_eth_percent) // BPS
+        h_deposit_amount = value - c_deposit_amount
+    new_pool = Pool(
+        id=pool_id,
+        pool_type=pool_type,
+        c_rate=c_rate,
+        h_rate=h_rate,
+        c_eth_bal=c_deposit_amount,
+        h_eth_bal=h_deposit_amount,
+        last_settled_usd_price=price,
+        parent_id=parent.id if parent else 0,
+        parent=parent,
+    )
+    # first deposit issues shares 1:1 with Wei
+    issue_shares(new_pool.h_shares, user, h_deposit_amount, 0)
+    if parent is not None:
+        if parent.children:
+            # settle the existing child pools so shares are issued against the current parent balance
+            interact_by_pool(parent.children[0], price if prices is None else prices)
+            # cancel user shares in any tranche that was zeroed by the price change
+            for child in parent.children:
+                liquidate_if_zero(parent.c_shares, parent.c_eth_bal)
+                liquidate_if_zero(child.h_shares, child.h_eth_bal)
+        issue_shares(parent.c_shares, user, c_deposit_amount, parent.c_eth_bal)
+        parent.children.append(new_pool)
+        parent.c_eth_bal += c_deposit_amount
+        parent.h_eth_bal += h_deposit_amount
+        if len(parent.children) > 1:
+            re_adjust_child_pools(new_pool)
+    else:
+        issue_shares(new_pool.c_shares, user, c_deposit_amount, 0)
+    return new_pool
+
+
+def profit_at_price(last_settled_usd_price, current_usd_price):
+    # profit percent in basis points
+    return sdiv((current_usd_price - last_settled_usd_price) * BPS, last_settled_usd_price)
+
+
+def tranche_change(tranche_bal, price, last_settled_usd_price):
+    # change in value in usdDecimals * Wei
+    return tranche_bal * price - tranche_bal * last_settled_usd_price
+
+
+def allocation_difference(pool_type, rate, cooled_ratio, change):
+    expected_payout = 0
+    if pool_type == 0:
+        expected_payout = sdiv(change * (BPS + rate), BPS)
+    elif pool_type == 1:
+        if cooled_ratio > 50_0000000000:
+            expected_payout = sdiv(change * (BPS + (rate - cooled_ratio)), BPS)
+        else:
+            expected_payout = sdiv(change * (BPS + (rate - (BPS - cooled_ratio))), BPS)
+    return sdiv(expected_payout - change, DECIMALS)
+
+
+def cooled_allocation_at_price(pool, price, asset_usd_profit, cooled_change):
+    cooled_ratio = (pool.c_eth_bal * BPS) // (pool.c_eth_bal + pool.h_eth_bal)
+    cooled_allocation_diff = allocation_difference(pool.pool_type, pool.c_rate, cooled_ratio, cooled_change)
+    heated_allocation_diff = allocation_difference(
+        pool.pool_type,
+        pool.h_rate,
+        cooled_ratio,
+        tranche_change(pool.h_eth_bal, price, pool.last_settled_usd_price),
+    )
+    non_natural_multiplier = cooled_ratio if asset_usd_profit > 0 else BPS - cooled_ratio
+    min_abs_allocation = min(abs(cooled_allocation_diff), abs(heated_allocation_diff))
+    abs_allocation_total = min_abs_allocation + (
+        abs(heated_allocation_diff + cooled_allocation_diff) * non_natural_multiplier
+    ) // BPS
+    if cooled_allocation_diff < 0:
+        cooled_usd = (pool.c_eth_bal * price) // DECIMALS
+        if cooled_usd - abs_allocation_total > 0:
+            return -abs_allocation_total
+        return -cooled_usd
+    heated_usd = (pool.h_eth_bal * price) // DECIMALS
+    if heated_usd - abs_allocation_total > 0:
+        return abs_allocation_total
+    return heated_usd
+
+
+def settlement_kernel(pool, price, asset_usd_profit):
+    """Returns the settled (hEthBal, cEthBal) of a pool with opposing balances at a price."""
+    cooled_change = tranche_change(pool.c_eth_bal, price, pool.last_settled_usd_price)
+    cooled_allocation = cooled_allocation_at_price(pool, price, asset_usd_profit, cooled_change)
+    total_locked_usd = ((pool.c_eth_bal + pool.h_eth_bal) * price) // DECIMALS
+    cooled_bal_after_allocation = (
+        sdiv(pool.c_eth_bal * pool.last_settled_usd_price + cooled_change, DECIMALS) + cooled_allocation
+    )
+    heated_bal_after_allocation = total_locked_usd - cooled_bal_after_allocation
+    return (
+        (to_uint(heated_bal_after_allocation) * DECIMALS) // price,
+        (to_uint(cooled_bal_after_allocation) * DECIMALS) // price,
+    )
+
+
+def simulate_pool(pool, price):
+    """Mirrors simulateInteract, returns the (hEthBal, cEthBal) the pool would settle to at a price."""
+    asset_usd_profit = profit_at_price(pool.last_settled_usd_price, price)
+    if asset_usd_profit == 0 or pool.c_eth_bal == 0 or pool.h_eth_bal == 0:
+        return pool.h_eth_bal, pool.c_eth_bal
+    return settlement_kernel(pool, price, asset_usd_profit)
+
+
+def settle(pool, price):
+    """Settles a pool at a price, returns False if it could not be settled for lack of opposing balances."""
+    asset_usd_profit = profit_at_price(pool.last_settled_usd_price, price)
+    if asset_usd_profit == 0:
+        return True
+    if pool.c_eth_bal == 0 or pool.h_eth_bal == 0:
+        # nothing to settle against, the price is taken so a later depositor does not absorb the move
+        pool.last_settled_usd_price = price
+        return False
+    pool.h_eth_bal, pool.c_eth_bal = settlement_kernel(pool, price, asset_usd_profit)
+    pool.last_settled_usd_price = price
+    return True
+
+
+def interact(pool, price):
+    # the feed round bookkeeping only skips repeated work on chain, it never changes balances
+    pool.current_usd_price = price
+    return settle(pool, price)
+
+
+def price_of(pool, prices):
+    # a single price for every pool, or a mapping of pool ID to price for pools on different feeds
+    return prices[pool.id] if isinstance(prices, dict) else prices
+
+
+def interact_by_pool(pool, prices):
+    """Settles a pool, or every child pool of its parent and then the parent pool balances."""
+    parent = pool.parent
+    if parent is None:
+        interact(pool, price_of(pool, prices))
+        return
+    for child in parent.children:
+        interact(child, price_of(child, prices))
+    parent.c_eth_bal = sum(child.c_eth_bal for child in parent.children)
+    parent.h_eth_bal = sum(child.h_eth_bal for child in parent.children)
+
+
+def re_adjust_child_pools(pool):
+    """Uses the parent balances to optimally balance the cooled balances of the child pools."""
+    parent = pool.parent
+    if parent is None:
+        return
+    c_eth_for_balance = parent.c_eth_needed
+    c_eth_staked_to_targeted_ratio = 0
+    if c_eth_for_balance != 0:
+        c_eth_staked_to_targeted_ratio = (parent.c_eth_bal * BPS) // c_eth_for_balance
+    for child in parent.children:
+        if parent.c_eth_bal == 0:
+            child.c_eth_bal = 0
+        elif child.h_eth_bal > 0:
+            if c_eth_staked_to_targeted_ratio <= BPS:
+                # underweight/even cooled allocation to each child pool
+                child.c_eth_bal = (child.h_eth_bal * child.ceth_per_heth * c_eth_staked_to_targeted_ratio) // BPS
+            else:
+                # overweight cooled allocation to each child pool
+                c_eth_over_even = parent.c_eth_bal - c_eth_for_balance
+                child.c_eth_bal = child.h_eth_bal * child.ceth_per_heth + c_eth_over_even // len(parent.children)
+        else:
+            # if values didn't exist to balance, leave the remaining cEth balances as is
+            return
+
+
+def settle_pools(pools, prices):
+    """Mirrors settlePools, settling each pool or parent pool and rebalancing its child pools."""
+    settled = set()
+    for pool in pools:
+        # child pools settle with their parent, a parent already settled is skipped
+        key = ("parent", pool.parent.id) if pool.parent is not None else ("pool", pool.id)
+        if key in settled:
+            continue
+        settled.add(key)
+        interact_by_pool(pool, prices)
+        re_adjust_child_pools(pool)
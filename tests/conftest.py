@@ -1,6 +1,7 @@
 from web3 import Web3
-from brownie import MockERC20
-from scripts.helpful_scripts import get_account
+from brownie import MockERC20, chain, network
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account, deploy_mock_protocol_in_use
+from scripts.deploy import deploy_gwin_protocol_and_gwin_token
 import pytest
 
 @pytest.fixture
@@ -11,4 +12,36 @@ def amount_staked():
 def random_erc20():
     account = get_account()
     erc20 = MockERC20.deploy({"from": account})
-    return erc20
\ No newline at end of file
+    return erc20
+
+# NOTE: The deployments below are made once per test session. Tests get them through the fixtures without the
+# leading underscore, which snapshot the chain after the deployments and revert whatever the test does on chain.
+# Tests that use the chain without a deployment fixture ask for isolation themselves, chain-free tests need neither.
+
+@pytest.fixture
+def isolation():
+    chain.snapshot()
+    yield
+    chain.revert()
+
+@pytest.fixture(scope="session")
+def _gwin_deployment():
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    return deploy_gwin_protocol_and_gwin_token()
+
+@pytest.fixture(scope="session")
+def _protocol_in_use():
+    return deploy_mock_protocol_in_use()
+
+# session scoped fixtures are set up before function scoped ones, so both deployments predate the snapshot
+
+@pytest.fixture
+def gwin_deployment(_gwin_deployment, isolation):
+    # gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed
+    return _gwin_deployment
+
+@pytest.fixture
+def protocol_in_use(_protocol_in_use, isolation):
+    # a separate deployment with pool 0 initialized and three transactions made, see deploy_mock_protocol_in_use
+    return _protocol_in_use
@@ -1,14 +1,14 @@
 from re import T
 from brownie import GwinProtocol, GwinToken, network, exceptions
 from pyparsing import null_debug_action
-from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, INITIAL_VALUE, DECIMALS, get_account, get_contract, rounded, roundedDec, extra_rounded, rnd, empty_account
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, INITIAL_VALUE, DECIMALS, get_account, get_contract, rounded, roundedDec, extra_rounded, rnd, short_round, empty_account
 from scripts.deploy import deploy_gwin_protocol_and_gwin_token
 from web3 import Web3
 import pytest
 
 # NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
 
-def test_use_protocol():
+def test_use_protocol(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -17,7 +17,7 @@ def test_use_protocol():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
 
     parent_id = 1
@@ -432,7 +432,7 @@ def test_use_protocol():
     assert rnd(roundedDec(gwin_protocol.getParentUserCEthPercent(pool_2x_id, non_owner.address, {"from": account}))) == rnd(0) # cEth user has in parent pool
     # Assert
     # Make sure all ETH sufficiently accounted for    &    dust remains in pool (true ETH balance >= accounted balance)
-    assert gwin_protocol.retrieveEthInContract({"from": account}) >= 60_061998573929900000 # total in protocol
+    assert gwin_protocol.retrieveEthInContract({"from": account}) >= 60_061998573929000000 # total in protocol (share rounding leaves different dust)
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 60_0619985739 # total in protocol
 
     # Parent Pool Balances
@@ -525,4 +525,106 @@ def test_use_protocol():
     empty_account(gwin_protocol, non_owner_four)
 
     # Ensure dust is less that $0.01
-    assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) < 9000000000000 # total in protocol
\ No newline at end of file
+    assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) < 9000000000000 # total in protocol
+def deploy_parent_with_children(account):
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    #                   2x                5x                10x leverage
+    for pool_h_rate in [100_0000000000, 400_0000000000, 900_0000000000]:
+        gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x4554482f555344", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, pool_h_rate, {"from": account, "value": Web3.toWei(20, "ether")})
+    return gwin_protocol, eth_usd_price_feed
+
+def test_batch_tranche_actions_match_single_actions(isolation):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    single_protocol, single_feed = deploy_parent_with_children(account)
+    batch_protocol, batch_feed = deploy_parent_with_children(account)
+    for gwin_protocol in [single_protocol, batch_protocol]:
+        gwin_protocol.depositToTranche(2, False, True, 0, Web3.toWei(2, "ether"), {"from": non_owner, "value": Web3.toWei(2, "ether")})
+    single_feed.updateAnswer(1200_00000000, {"from": account})
+    batch_feed.updateAnswer(1200_00000000, {"from": account})
+
+    # Act - move Alice from the 10x child to the 2x and 5x children
+    #                                                isCooled, isHeated, cAmount, hAmount, isAll {from}
+    single_protocol.withdrawFromTranche(2, False, True, 0, 0, True, {"from": non_owner})
+    #                                             isCooled, isHeated, cAmount, hAmount {from, msg.value}
+    single_protocol.depositToTranche(0, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    single_protocol.depositToTranche(1, True, True, Web3.toWei(1, "ether"), Web3.toWei(1, "ether"), {"from": non_owner, "value": Web3.toWei(2, "ether")})
+    #              poolId, isDeposit, isCooled, isHeated, cAmount, hAmount, isAll
+    actions = [
+        (2, False, False, True, 0, 0, True),
+        (0, True, False, True, 0, Web3.toWei(1, "ether"), False),
+        (1, True, True, True, Web3.toWei(1, "ether"), Web3.toWei(1, "ether"), False),
+    ]
+    batch_protocol.batchTrancheActions(actions, {"from": non_owner, "value": Web3.toWei(3, "ether")})
+
+    # Assert
+    for pool_id in [0, 1, 2]:
+        assert batch_protocol.retrieveProtocolHEthBalance(pool_id) == single_protocol.retrieveProtocolHEthBalance(pool_id) # hEth in protocol
+        assert short_round(batch_protocol.retrieveProtocolCEthBalance(pool_id)) == short_round(single_protocol.retrieveProtocolCEthBalance(pool_id)) # cEth in protocol
+        assert batch_protocol.retrieveHEthBalance(pool_id, non_owner.address) == single_protocol.retrieveHEthBalance(pool_id, non_owner.address) # hEth for non_owner
+        assert batch_protocol.retrieveEthStakersLength(pool_id) == single_protocol.retrieveEthStakersLength(pool_id)
+    assert short_round(batch_protocol.getParentUserCEthBalance(1, non_owner.address)) == short_round(single_protocol.getParentUserCEthBalance(1, non_owner.address)) # parent cEth for non_owner
+    assert short_round(batch_protocol.retrieveEthInContract()) == short_round(single_protocol.retrieveEthInContract()) # total in protocol
+    assert batch_protocol.retrieveHEthBalance(2, non_owner.address) == 0 # hEth for non_owner in 10x
+    assert short_round(batch_protocol.retrieveHEthBalance(0, non_owner.address)) == short_round(Web3.toWei(1, "ether")) # hEth for non_owner in 2x
+
+def test_batch_tranche_actions_require_matching_value(isolation):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, eth_usd_price_feed = deploy_parent_with_children(account)
+    #              poolId, isDeposit, isCooled, isHeated, cAmount, hAmount, isAll
+    actions = [
+        (0, True, False, True, 0, Web3.toWei(1, "ether"), False),
+        (1, True, False, True, 0, Web3.toWei(1, "ether"), False),
+    ]
+    # Act / Assert
+    with pytest.raises(exceptions.VirtualMachineError):
+        gwin_protocol.batchTrancheActions(actions, {"from": non_owner, "value": Web3.toWei(3, "ether")})
+
+def test_cEth_needed_tracks_child_heated_balances(isolation):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, eth_usd_price_feed = deploy_parent_with_children(account)
+    assert [gwin_protocol.cethPerHethTarget(pool_id) for pool_id in [0, 1, 2]] == [1, 4, 9]
+
+    def expected_cEth_needed():
+        return sum(gwin_protocol.retrieveProtocolHEthBalance(pool_id) * gwin_protocol.cethPerHethTarget(pool_id) for pool_id in [0, 1, 2])
+
+    # Act / Assert - the running sum follows deposits, settlements and withdrawals
+    assert gwin_protocol.cEthNeededForPools(0) == expected_cEth_needed()
+    gwin_protocol.depositToTranche(1, False, True, 0, Web3.toWei(3, "ether"), {"from": non_owner, "value": Web3.toWei(3, "ether")})
+    assert gwin_protocol.cEthNeededForPools(0) == expected_cEth_needed()
+    eth_usd_price_feed.updateAnswer(800_00000000, {"from": account})
+    gwin_protocol.depositToTranche(2, True, False, Web3.toWei(1, "ether"), 0, {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    assert gwin_protocol.cEthNeededForPools(2) == expected_cEth_needed()
+    eth_usd_price_feed.updateAnswer(1300_00000000, {"from": account})
+    gwin_protocol.withdrawFromTranche(1, False, True, 0, 0, True, {"from": non_owner})
+    assert gwin_protocol.cEthNeededForPools(1) == expected_cEth_needed()
+
+def test_child_pool_events_are_emitted(isolation):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, eth_usd_price_feed = deploy_parent_with_children(account)
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+    # Act
+    tx = gwin_protocol.depositToTranche(1, True, False, Web3.toWei(1, "ether"), 0, {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    # Assert - every child settles, then the parent rebalances once
+    assert [event["poolId"] for event in tx.events["Settled"]] == [0, 1, 2]
+    assert len(tx.events["ChildPoolsRebalanced"]) == 1
+    event = tx.events["ChildPoolsRebalanced"]
+    assert event["parentId"] == 1
+    assert event["cEthBal"] == gwin_protocol.getParentPoolCEthBalance(1)
+    assert event["cEthNeeded"] == gwin_protocol.cEthNeededForPools(1)
+    assert tx.events["Deposit"]["cAmount"] == Web3.toWei(1, "ether")
@@ -6,7 +6,7 @@ import pytest
 
 # NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
 
-def test_can_withdraw_all():
+def test_can_withdraw_all(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -15,7 +15,7 @@ def test_can_withdraw_all():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
 
     parent_id = 1
@@ -0,0 +1,88 @@
+from brownie import chain, network
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account
+from scripts.gwin_client import GwinClient, ViewCache, MISSING
+from web3 import Web3
+import pytest
+
+# NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
+
+def test_client_dump_matches_views(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    # a single pool and two child pools of parent 1
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(10, "ether")})
+    for h_rate in [100_0000000000, 300_0000000000]:
+        gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, h_rate, {"from": account, "value": Web3.toWei(10, "ether")})
+    for index in range(1, 4):
+        user = get_account(index=index)
+        gwin_protocol.depositToTranche(0, True, True, Web3.toWei(index, "ether"), Web3.toWei(1, "ether"), {"from": user, "value": Web3.toWei(index + 1, "ether")})
+        gwin_protocol.depositToTranche(2, True, False, Web3.toWei(index, "ether"), 0, {"from": user, "value": Web3.toWei(index, "ether")})
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+    gwin_protocol.settlePools([0, 1], {"from": account})
+    client = GwinClient(gwin_protocol)
+    # Act
+    state = client.dump_state()
+    # Assert
+    # the pools, the shares and staker counts, the stakers, and the staker balances
+    assert client.round_trips == 4
+    assert sorted(state.pools) == [0, 1, 2]
+    assert state.pools[0].c_eth_bal == gwin_protocol.retrieveProtocolCEthBalance(0)
+    assert state.parent_pools[1].c_eth_bal == gwin_protocol.getParentPoolCEthBalance(1)
+    # the cooled only deposits to pool 2 are positions of parent 1, not of pool 2
+    assert len(state.user_balances) == 6
+    assert sorted((balance.parent_id, balance.user) for balance in state.parent_user_balances) == sorted((1, get_account(index=index).address) for index in range(4))
+    for balance in state.parent_user_balances:
+        assert balance.c_eth_bal == gwin_protocol.getParentUserCEthBalance(2, balance.user)
+    for balance in state.user_balances:
+        if state.pools[balance.pool_id].parent_id != 0:
+            assert balance.c_eth_bal == gwin_protocol.getParentUserCEthBalance(balance.pool_id, balance.user)
+        else:
+            assert balance.c_eth_bal == gwin_protocol.retrieveCEthBalance(balance.pool_id, balance.user)
+        assert balance.h_eth_bal == gwin_protocol.retrieveHEthBalance(balance.pool_id, balance.user)
+
+def test_client_caches_views_per_block(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    non_owner = get_account(index=1)
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(10, "ether")})
+    gwin_protocol.depositToTranche(0, True, False, Web3.toWei(2, "ether"), 0, {"from": non_owner, "value": Web3.toWei(2, "ether")})
+    client = GwinClient(gwin_protocol, cache=ViewCache())
+    client.on_block(chain.height)
+    calls = [("previewUserCEthBalance", [0, non_owner.address]), ("previewPoolBalances", [0]), ("getPoolHealth", [0, True])]
+    first = client.call_many(calls)
+    round_trips = client.round_trips
+    # Act
+    second = client.call_many(calls)
+    eth_usd_price_feed.updateAnswer(1200_00000000, {"from": account})
+    client.on_block(chain.height)
+    third = client.call_many(calls)
+    # Assert
+    assert second == first
+    assert client.round_trips == round_trips + 1
+    assert client.cache.stats()["hits"] == 3
+    assert client.cache.stats()["misses"] == 6
+    assert third[0] == gwin_protocol.previewUserCEthBalance(0, non_owner.address)
+    assert third[0] != first[0]
+
+def test_view_cache_evicts_least_recently_used():
+    # Arrange
+    cache = ViewCache()
+    for block_number in range(1, 4):
+        cache.put(("getPoolHealth", (0, True), block_number), block_number)
+    # Act
+    # room for exactly the three entries, then the least recently used of them is evicted for a fourth
+    cache.max_bytes = cache.size
+    cache.get(("getPoolHealth", (0, True), 1))
+    cache.put(("getPoolHealth", (0, True), 4), 4)
+    # Assert
+    assert cache.get(("getPoolHealth", (0, True), 2)) is MISSING
+    assert cache.get(("getPoolHealth", (0, True), 1)) == 1
+    assert cache.get(("getPoolHealth", (0, True), 4)) == 4
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 3
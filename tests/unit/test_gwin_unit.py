@@ -13,18 +13,18 @@ def test_get_account():
     account = get_account()
     assert account
 
-def test_can_deploy_ERC20():
+def test_can_deploy_ERC20(isolation):
     account = get_account()
     gwin_ERC20 = GwinToken.deploy({"from": account})
     assert gwin_ERC20
 
-def test_stake_tokens():
+def test_stake_tokens(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     gwin_protocol.addAllowedTokens(gwin_ERC20.address, {"from": account})
     gwin_ERC20.approve(gwin_protocol.address, Web3.toWei(1, "ether"), {"from": account})
@@ -33,13 +33,13 @@ def test_stake_tokens():
     assert gwin_protocol.stakingBalance(gwin_ERC20.address, account.address) == Web3.toWei(1, "ether")
     assert gwin_protocol.stakers(0) == account.address
 
-def test_initialize_protocol():
+def test_initialize_protocol(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -60,12 +60,12 @@ def test_initialize_protocol():
     # Ensure dust is less that $0.01
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) < 9000000000000 # total in protocol
 
-def test_initialize_protocol_with_positive_rates():
+def test_initialize_protocol_with_positive_rates(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     # Assert
@@ -73,12 +73,12 @@ def test_initialize_protocol_with_positive_rates():
         #              attempt to initialize with two positive rates
         gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", 50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether"), "gasLimit": 20000000000})
 
-def test_initialize_protocol_with_negative_rates():
+def test_initialize_protocol_with_negative_rates(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     # Assert
@@ -86,13 +86,13 @@ def test_initialize_protocol_with_negative_rates():
         #              attempt to initialize with two positive rates
         gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, -50_0000000000, {"from": account, "value": Web3.toWei(20, "ether"), "gasLimit": 20000000000})
 
-def test_non_owner_can_initialize():
+def test_non_owner_can_initialize(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": non_owner, "value": Web3.toWei(20, "ether")})
@@ -126,7 +126,7 @@ def test_non_owner_can_initialize():
     #     parent_id = 0
     #     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": non_owner, "value": Web3.toWei(20, "ether")})
 
-def test_deploy_mock_protocol_in_use():
+def test_deploy_mock_protocol_in_use(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -135,7 +135,7 @@ def test_deploy_mock_protocol_in_use():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     assert rounded(gwin_protocol.retrieveProtocolCEthBalance.call(0, {"from": account})) == 8_8804772808 # cEth in protocol
     assert rounded(gwin_protocol.retrieveProtocolHEthBalance.call(0, {"from": account})) == 12_1507433794 # hEth in protocol
 
@@ -167,7 +167,7 @@ def test_deploy_mock_protocol_in_use():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_estimate_balances():
+def test_estimate_balances(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -176,39 +176,41 @@ def test_estimate_balances():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     # Act
     eth_usd_price_feed.updateAnswer(1000_00000000, {"from": account}) # Started at 1300
     # Assert
     assert gwin_protocol.retrieveCurrentPrice(0, {"from": account}) == 1000_00000000
+    # Shares split each tranche exactly, where the percent based balances left up to ~1e7 Wei of a tranche unallocated,
+    # so these sit a few parts per trillion above the percent based values from before share accounting
     
     # Entire balance of non_owner_two               id      address        isCooled   isAll
     rangeOfReturns = gwin_protocol.getRangeOfReturns(0, non_owner_two.address, False, True, {"from": account})
-    assert rangeOfReturns[0] == 280932113371062956 # at $500/ETH
-    assert rangeOfReturns[1] == 466384665201171342 # at $600/ETH
-    assert rangeOfReturns[2] == 598850773651248760 # at $700/ETH
-    assert rangeOfReturns[3] == 698200354988806824 # at $800/ETH
-    assert rangeOfReturns[4] == 775472251583802262 # at $900/ETH
-    assert rangeOfReturns[5] == 837289768860593363 # at $1000/ETH
-    assert rangeOfReturns[6] == 887867737541604263 # at $1100/ETH
-    assert rangeOfReturns[7] == 930016044775780014 # at $1200/ETH
-    assert rangeOfReturns[8] == 965679997050240457 # at $1300/ETH
-    assert rangeOfReturns[9] == 994805741012481654 # at $1400/ETH
-    assert rangeOfReturns[10] == 1020048052446424025 # at $1500/ETH
+    assert rangeOfReturns[0] == 280932113372233154 # at $500/ETH
+    assert rangeOfReturns[1] == 466384665203114025 # at $600/ETH
+    assert rangeOfReturns[2] == 598850773653743219 # at $700/ETH
+    assert rangeOfReturns[3] == 698200354991715115 # at $800/ETH
+    assert rangeOfReturns[4] == 775472251587032423 # at $900/ETH
+    assert rangeOfReturns[5] == 837289768864875768 # at $1000/ETH
+    assert rangeOfReturns[6] == 887867737545302597 # at $1100/ETH
+    assert rangeOfReturns[7] == 930016044779653913 # at $1200/ETH
+    assert rangeOfReturns[8] == 965679997054262911 # at $1300/ETH
+    assert rangeOfReturns[9] == 994805741016625428 # at $1400/ETH
+    assert rangeOfReturns[10] == 1020048052450672944 # at $1500/ETH
 
     # Heated balance of non_owner_two               id      address        isCooled   isAll
     rangeOfReturns = gwin_protocol.getRangeOfReturns(0, non_owner_two.address, False, False, {"from": account})
-    assert rangeOfReturns[0] == 280932113371062956 # at $500/ETH
-    assert rangeOfReturns[1] == 466384665201171342 # at $600/ETH
-    assert rangeOfReturns[2] == 598850773651248760 # at $700/ETH
-    assert rangeOfReturns[3] == 698200354988806824 # at $800/ETH
-    assert rangeOfReturns[4] == 775472251583802262 # at $900/ETH
-    assert rangeOfReturns[5] == 837289768860593363 # at $1000/ETH
-    assert rangeOfReturns[6] == 887867737541604263 # at $1100/ETH
-    assert rangeOfReturns[7] == 930016044775780014 # at $1200/ETH
-    assert rangeOfReturns[8] == 965679997050240457 # at $1300/ETH
-    assert rangeOfReturns[9] == 994805741012481654 # at $1400/ETH
-    assert rangeOfReturns[10] == 1020048052446424025 # at $1500/ETH
+    assert rangeOfReturns[0] == 280932113372233154 # at $500/ETH
+    assert rangeOfReturns[1] == 466384665203114025 # at $600/ETH
+    assert rangeOfReturns[2] == 598850773653743219 # at $700/ETH
+    assert rangeOfReturns[3] == 698200354991715115 # at $800/ETH
+    assert rangeOfReturns[4] == 775472251587032423 # at $900/ETH
+    assert rangeOfReturns[5] == 837289768864875768 # at $1000/ETH
+    assert rangeOfReturns[6] == 887867737545302597 # at $1100/ETH
+    assert rangeOfReturns[7] == 930016044779653913 # at $1200/ETH
+    assert rangeOfReturns[8] == 965679997054262911 # at $1300/ETH
+    assert rangeOfReturns[9] == 994805741016625428 # at $1400/ETH
+    assert rangeOfReturns[10] == 1020048052450672944 # at $1500/ETH
 
     # Cooled balance of non_owner_two               id      address        isCooled   isAll
     rangeOfReturns = gwin_protocol.getRangeOfReturns(0, non_owner_two.address, True, False, {"from": account})
@@ -226,29 +228,67 @@ def test_estimate_balances():
 
     # Cooled balance of account               id      address        isCooled   isAll
     rangeOfReturns = gwin_protocol.getRangeOfReturns(0, account.address, True, False, {"from": account})
-    assert rangeOfReturns[0] == 17496370578385007258 # at $500/ETH
-    assert rangeOfReturns[1] == 15162899476969674201 # at $600/ETH
-    assert rangeOfReturns[4] == 11273780974610785771 # at $900/ETH
-    assert rangeOfReturns[6] == 9859556064653008159 # at $1100/ETH
-    assert rangeOfReturns[10] == 8196387011636940558 # at $1500/ETH
+    assert rangeOfReturns[0] == 17496370578420000000 # at $500/ETH
+    assert rangeOfReturns[1] == 15162899476983333333 # at $600/ETH
+    assert rangeOfReturns[4] == 11273780974622222222 # at $900/ETH
+    assert rangeOfReturns[6] == 9859556064663636363 # at $1100/ETH
+    assert rangeOfReturns[10] == 8196387011646666666 # at $1500/ETH
 
     # Heated balance of account               id      address        isCooled   isAll
     rangeOfReturns = gwin_protocol.getRangeOfReturns(0, account.address, False, False, {"from": account})
-    assert rangeOfReturns[0] == 3253917968465402192 # at $500/ETH
-    assert rangeOfReturns[1] == 5401936518059627002 # at $600/ETH
-    assert rangeOfReturns[4] == 8981967434039773630 # at $900/ETH
-    assert rangeOfReturns[6] == 10283796858038133161 # at $1100/ETH
-    assert rangeOfReturns[10] == 11814785596154074473 # at $1500/ETH
+    assert rangeOfReturns[0] == 3253917968467766845 # at $500/ETH
+    assert rangeOfReturns[1] == 5401936518063552640 # at $600/ETH
+    assert rangeOfReturns[4] == 8981967434046300909 # at $900/ETH
+    assert rangeOfReturns[6] == 10283796858045606492 # at $1100/ETH
+    assert rangeOfReturns[10] == 11814785596162660388 # at $1500/ETH
 
     # Entire balance of account               id      address        isCooled   isAll
     rangeOfReturns = gwin_protocol.getRangeOfReturns(0, account.address, False, True, {"from": account})
-    assert rangeOfReturns[0] == 20750288546850409450 # at $500/ETH
-    assert rangeOfReturns[1] == 20564835995029301203 # at $600/ETH
-    assert rangeOfReturns[4] == 20255748408650559401 # at $900/ETH
-    assert rangeOfReturns[6] == 20143352922691141320 # at $1100/ETH
-    assert rangeOfReturns[10] == 20011172607791015031 # at $1500/ETH
+    assert rangeOfReturns[0] == 20750288546887766845 # at $500/ETH
+    assert rangeOfReturns[1] == 20564835995046885973 # at $600/ETH
+    assert rangeOfReturns[4] == 20255748408668523131 # at $900/ETH
+    assert rangeOfReturns[6] == 20143352922709242855 # at $1100/ETH
+    assert rangeOfReturns[10] == 20011172607809327054 # at $1500/ETH
 
-def test_withdrawal_greater_than_user_balance():
+def test_estimate_balances_at_resolution(protocol_in_use):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner_two = get_account(index=2) # Bob
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
+    # Act
+    eth_usd_price_feed.updateAnswer(1000_00000000, {"from": account}) # Started at 1300
+    #                                                                            id    address         points   minPercent      maxPercent
+    hEthEsts, cEthEsts = gwin_protocol.getRangeOfReturnsAtResolution(0, account.address, 101, -50_0000000000, 50_0000000000, {"from": account})
+    # Assert
+    assert len(hEthEsts) == 101
+    assert len(cEthEsts) == 101
+    # every 10th point lines up with the default range of returns
+    rangeOfReturns = gwin_protocol.getRangeOfReturns(0, account.address, False, True, {"from": account})
+    for index in range(11):
+        assert hEthEsts[index * 10] + cEthEsts[index * 10] == rangeOfReturns[index]
+    assert cEthEsts[0] == 17496370578420000000 # at $500/ETH
+    assert hEthEsts[100] == 11814785596162660388 # at $1500/ETH
+    # heated estimates rise with the price
+    for index in range(100):
+        assert hEthEsts[index] <= hEthEsts[index + 1]
+
+    hEthEsts, cEthEsts = gwin_protocol.getRangeOfReturnsAtResolution(0, non_owner_two.address, 2, -20_0000000000, 30_0000000000, {"from": account})
+    assert hEthEsts[0] == 698200354991715115 # at $800/ETH
+    assert hEthEsts[1] == 965679997054262911 # at $1300/ETH
+    assert cEthEsts[0] == 0
+    assert cEthEsts[1] == 0
+
+    # Invalid ranges revert
+    with pytest.raises(exceptions.VirtualMachineError):
+        gwin_protocol.getRangeOfReturnsAtResolution(0, account.address, 1, -50_0000000000, 50_0000000000, {"from": account})
+    with pytest.raises(exceptions.VirtualMachineError):
+        gwin_protocol.getRangeOfReturnsAtResolution(0, account.address, 11, 50_0000000000, -50_0000000000, {"from": account})
+    with pytest.raises(exceptions.VirtualMachineError):
+        gwin_protocol.getRangeOfReturnsAtResolution(0, account.address, 11, -100_0000000000, 50_0000000000, {"from": account})
+
+def test_withdrawal_greater_than_user_balance(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -257,7 +297,7 @@ def test_withdrawal_greater_than_user_balance():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     # Act
     eth_usd_price_feed.updateAnswer(1000_00000000, {"from": account}) # Started at 1300
     # Assert
@@ -267,7 +307,7 @@ def test_withdrawal_greater_than_user_balance():
         tx = gwin_protocol.withdrawFromTranche(0, True, False, 10, 0, False, {"from": non_owner_two, "gasLimit": 200000000})
         tx.wait(1)
 
-def test_zero_deposit():
+def test_zero_deposit(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -276,7 +316,7 @@ def test_zero_deposit():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     # Act
     eth_usd_price_feed.updateAnswer(1000_00000000, {"from": account}) # Started at 1300
     # Assert 
@@ -286,7 +326,7 @@ def test_zero_deposit():
         tx = gwin_protocol.depositToTranche(0, True, False, 0, 0, {"from": non_owner_two, "value": 0})
         tx.wait(1)
 
-def test_ledger_exploit_deposit():
+def test_ledger_exploit_deposit(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -295,7 +335,7 @@ def test_ledger_exploit_deposit():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     # Act
     eth_usd_price_feed.updateAnswer(1000_00000000, {"from": account}) # Started at 1300
     # Assert
@@ -306,7 +346,7 @@ def test_ledger_exploit_deposit():
         tx = gwin_protocol.depositToTranche(0, True, False, Web3.toWei(1, "ether"), 0, {"from": non_owner_two, "value": 0})
         tx.wait(1)
 
-def test_zero_withdrawal():
+def test_zero_withdrawal(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -315,7 +355,7 @@ def test_zero_withdrawal():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     # Act
     eth_usd_price_feed.updateAnswer(1000_00000000, {"from": account}) # Started at 1300
     # Assert
@@ -325,7 +365,7 @@ def test_zero_withdrawal():
         tx = gwin_protocol.withdrawFromTranche(0, True, False, 0, 0, False, {"from": non_owner})
         tx.wait(1)
 
-def test_can_create_second_pool():
+def test_can_create_second_pool(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -334,7 +374,7 @@ def test_can_create_second_pool():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     tx = gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -369,7 +409,7 @@ def test_can_create_second_pool():
     assert valOne == 10_000000000000000000
     assert valTwo == 10_000000000000000000
 
-def test_cannot_deposit_before_initialized():
+def test_cannot_deposit_before_initialized(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -378,7 +418,7 @@ def test_cannot_deposit_before_initialized():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     eth_usd_price_feed.updateAnswer(1200_00000000, {"from": account})
     # Assert
@@ -392,7 +432,7 @@ def test_cannot_deposit_before_initialized():
         tx = gwin_protocol.depositToTranche(0, True, False, Web3.toWei(1, "ether"), 0, {"from": non_owner, "value": Web3.toWei(1, "ether")})
         tx.wait(1)
 
-def test_cannot_readjust_without_tx():
+def test_cannot_readjust_without_tx(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -401,7 +441,7 @@ def test_cannot_readjust_without_tx():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     # Act
     eth_usd_price_feed.updateAnswer(1200_00000000, {"from": account})
     # Assert
@@ -425,7 +465,7 @@ def test_cannot_readjust_without_tx():
             tx.wait(1)
 
 
-def test_unbalanced_hot_cold_ratio():
+def test_unbalanced_hot_cold_ratio(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -434,7 +474,7 @@ def test_unbalanced_hot_cold_ratio():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     # Assert
     assert gwin_protocol.retrieveCurrentPrice(0, {"from": account}) == 1300_00000000
     # Act
@@ -528,7 +568,33 @@ def test_unbalanced_hot_cold_ratio():
     assert gwin_protocol.retrieveHEthPercentBalance.call(0, non_owner_two.address, {"from": account}) == 7_9474972592 # hEth % for non_owner_two
 
 
-def test_liquidation():
+def test_settlement_is_recorded_per_round(protocol_in_use):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
+    # Act
+    eth_usd_price_feed.updateAnswer(1400_00000000, {"from": account}) # Started at 1300
+    tx = gwin_protocol.depositToTranche(0, True, False, Web3.toWei(1, "ether"), 0, {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    tx.wait(1)
+    # Assert
+    assert gwin_protocol.lastSettlement(0)[0] == eth_usd_price_feed.latestRoundData()[0] # base feed round
+    assert gwin_protocol.lastSettlement(0)[1] == 0 # no quote feed
+    assert gwin_protocol.pool(0)[2] == 1400_00000000 # last settled price
+
+    # Act
+    round_id = eth_usd_price_feed.latestRoundData()[0]
+    tx = gwin_protocol.depositToTranche(0, True, False, Web3.toWei(1, "ether"), 0, {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    tx.wait(1)
+    # Assert
+    # oracle has not moved, the settlement is skipped
+    assert "Settled" not in tx.events
+    assert gwin_protocol.lastSettlement(0)[0] == round_id
+    assert gwin_protocol.retrieveCurrentRound(0) == (1400_00000000, round_id, 0)
+
+def test_liquidation(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -537,7 +603,7 @@ def test_liquidation():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     
     valOne, valTwo = gwin_protocol.simulateInteract.call(0, 300_00000000)
     # test_value = gwin_protocol.simulateInteract.call(0, 300_00000000)
@@ -545,7 +611,7 @@ def test_liquidation():
     assert rounded(valTwo) == 210312206602
     assert rounded(valOne) == 0
 
-def test_deposit_after_liquidation():
+def test_deposit_after_liquidation(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -554,7 +620,7 @@ def test_deposit_after_liquidation():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     
     valOne, valTwo = gwin_protocol.simulateInteract.call(0, 300_00000000)
     # test_value = gwin_protocol.simulateInteract.call(0, 300_00000000)
@@ -591,7 +657,7 @@ def test_deposit_after_liquidation():
     assert rounded(gwin_protocol.retrieveHEthBalance.call(0, non_owner_two.address, {"from": account})) == 0 # hEth for non_owner_two
     assert gwin_protocol.retrieveHEthPercentBalance.call(0, non_owner_two.address, {"from": account}) == 0 # hEth % for non_owner_two
 
-def test_withdrawal_after_liquidation():
+def test_withdrawal_after_liquidation(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -600,7 +666,7 @@ def test_withdrawal_after_liquidation():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     
     valOne, valTwo = gwin_protocol.simulateInteract.call(0, 300_00000000)
     # test_value = gwin_protocol.simulateInteract.call(0, 300_00000000)
@@ -640,15 +706,175 @@ def test_withdrawal_after_liquidation():
     assert rounded(gwin_protocol.retrieveHEthBalance.call(0, non_owner_two.address, {"from": account})) == 0 # hEth for non_owner_two
     assert gwin_protocol.retrieveHEthPercentBalance.call(0, non_owner_two.address, {"from": account}) == 0 # hEth % for non_owner_two
 
+def test_redeposit_after_liquidation_ignores_liquidated_shares(protocol_in_use):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    non_owner_two = get_account(index=2) # Bob
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
+
+    # Act
+    eth_usd_price_feed.updateAnswer(300_00000000, {"from": account}) # Started at 1300, heated tranche is liquidated
+    tx = gwin_protocol.depositToTranche(0, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    tx.wait(1)
+    # Bob held heated shares before the liquidation, they should not count towards his new deposit
+    tx = gwin_protocol.depositToTranche(0, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner_two, "value": Web3.toWei(1, "ether")})
+    tx.wait(1)
+    # Assert
+    assert rounded(gwin_protocol.retrieveProtocolHEthBalance.call(0, {"from": account})) == 2_0000000000 # hEth in protocol
+    assert gwin_protocol.retrieveHEthBalance.call(0, account.address, {"from": account}) == 0 # hEth for account
+    assert gwin_protocol.retrieveHEthPercentBalance.call(0, account.address, {"from": account}) == 0 # hEth % for account
+    assert gwin_protocol.retrieveHEthBalance.call(0, non_owner.address, {"from": account}) == 1_000000000000000000 # hEth for non_owner
+    assert gwin_protocol.retrieveHEthPercentBalance.call(0, non_owner.address, {"from": account}) == 50_0000000000 # hEth % for non_owner
+    assert gwin_protocol.retrieveHEthBalance.call(0, non_owner_two.address, {"from": account}) == 1_000000000000000000 # hEth for non_owner_two
+    assert gwin_protocol.retrieveHEthPercentBalance.call(0, non_owner_two.address, {"from": account}) == 50_0000000000 # hEth % for non_owner_two
+
+    # the liquidated account cannot withdraw heated ETH
+    with brownie.reverts("Insufficient_User_Funds"):
+        gwin_protocol.withdrawFromTranche(0, False, True, 0, Web3.toWei(1, "ether"), False, {"from": account})
+
+def test_child_pool_on_zeroed_parent_is_not_diluted(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    # a 2x short cooled tranche is zeroed once ETH doubles
+    gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -200_0000000000, 200_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    eth_usd_price_feed.updateAnswer(2000_00000000, {"from": account})
+
+    # Act - the sibling is settled and the stale parent shares are liquidated before Alice's shares are issued
+    tx = gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -200_0000000000, 200_0000000000, {"from": non_owner, "value": Web3.toWei(20, "ether")})
+
+    # Assert
+    event = tx.events["TrancheLiquidated"]
+    assert event["poolId"] == 0
+    assert event["parentId"] == 1
+    assert event["isCooled"] == True
+    assert event["epoch"] == 1
+    assert gwin_protocol.getParentUserCEthBalance(0, account.address) == 0 # cEth for account
+    assert gwin_protocol.getParentUserCEthBalance(1, non_owner.address) == 10_000000000000000000 # cEth for non_owner
+    assert gwin_protocol.getParentPoolCEthBalance(1) == 10_000000000000000000 # cEth in parent pool
+
+def test_events_are_emitted(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+
+    # Act / Assert - initialize
+    tx = gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    event = tx.events["PoolInitialized"]
+    assert event["poolId"] == 0
+    assert event["parentId"] == 0
+    assert event["creator"] == account.address
+    assert event["cRate"] == -50_0000000000
+    assert event["hRate"] == 50_0000000000
+    assert event["cEthBal"] == 10_000000000000000000
+    assert event["hEthBal"] == 10_000000000000000000
+
+    # deposit after a price move settles the pool first, the drop zeroes the heated tranche
+    eth_usd_price_feed.updateAnswer(300_00000000, {"from": account})
+    tx = gwin_protocol.depositToTranche(0, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    event = tx.events["Settled"]
+    assert event["poolId"] == 0
+    assert event["lastSettledUsdPrice"] == 1000_00000000
+    assert event["currentUsdPrice"] == 300_00000000
+    assert event["cEthBal"] == 20_000000000000000000
+    assert event["hEthBal"] == 0
+    event = tx.events["TrancheLiquidated"]
+    assert event["poolId"] == 0
+    assert event["parentId"] == 0
+    assert event["isCooled"] == False
+    assert event["epoch"] == 1
+    event = tx.events["Deposit"]
+    assert event["poolId"] == 0
+    assert event["user"] == non_owner.address
+    assert event["cAmount"] == 0
+    assert event["hAmount"] == Web3.toWei(1, "ether")
+
+    # withdraw without a price move does not settle
+    tx = gwin_protocol.withdrawFromTranche(0, False, True, 0, 0, True, {"from": non_owner})
+    assert "Settled" not in tx.events
+    assert "TrancheLiquidated" not in tx.events
+    event = tx.events["Withdraw"]
+    assert event["user"] == non_owner.address
+    assert event["cAmount"] == 0
+    assert event["hAmount"] == Web3.toWei(1, "ether")
+
+def test_settle_pools_skips_settled_pools(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 100_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 400_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+
+    # Act / Assert - new pools have not been settled at a feed round yet, children settle with their parent
+    tx = gwin_protocol.settlePools([0, 1, 2], {"from": non_owner})
+    assert tx.return_value == 2
+    tx = gwin_protocol.settlePools([0, 1, 2], {"from": non_owner})
+    assert tx.return_value == 0
+    assert "Settled" not in tx.events
+
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+    tx = gwin_protocol.settlePools([0, 1, 2], {"from": non_owner})
+    assert tx.return_value == 2
+    assert [event["poolId"] for event in tx.events["Settled"]] == [0, 1, 2]
+    for pool_id in [0, 1, 2]:
+        assert gwin_protocol.pool(pool_id)[2] == 1100_00000000 # last settled price
+
+    # the next user interaction has nothing left to settle
+    tx = gwin_protocol.depositToTranche(1, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    assert "Settled" not in tx.events
+
+    with brownie.reverts("Pool_Is_Not_Initialized"):
+        gwin_protocol.settlePools([3], {"from": non_owner})
+
+def test_settle_pools_skips_one_sided_pools(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    # only the cooled tranche has a balance
+    gwin_protocol.withdrawFromTranche(0, False, True, 0, 0, True, {"from": account})
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+
+    # Act / Assert - the rounds and the price are recorded although there is nothing to settle against
+    tx = gwin_protocol.settlePools([0], {"from": non_owner})
+    assert tx.return_value == 1
+    assert "Settled" not in tx.events
+    tx = gwin_protocol.settlePools([0], {"from": non_owner})
+    assert tx.return_value == 0
+    assert gwin_protocol.pool(0)[2] == 1100_00000000 # last settled price moves with the feed
+    assert gwin_protocol.lastSettlement(0)[0] == eth_usd_price_feed.latestRoundData()[0]
+    # a heated depositor joins at the current price and does not absorb the move before the deposit
+    gwin_protocol.depositToTranche(0, False, True, 0, Web3.toWei(5, "ether"), {"from": non_owner, "value": Web3.toWei(5, "ether")})
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+    gwin_protocol.settlePools([0], {"from": non_owner})
+    assert gwin_protocol.retrieveCEthBalance(0, account.address) == Web3.toWei(10, "ether")
+    assert gwin_protocol.retrieveHEthBalance(0, non_owner.address) == Web3.toWei(5, "ether")
+
 #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@\  XAU Long Short (-100, 100) /@@@@@@@@@@@@@@@@@@@@@@@@@@@@@#
 
-def test_initialize_xau_pool():
+def test_initialize_xau_pool(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     eth_usd_price_feed.updateAnswer(1300_00000000, {"from": account})
     xau_usd_price_feed.updateAnswer(Web3.toWei(1600, "ether"), {"from": account}) 
     assert xau_usd_price_feed.decimals() == 18 
@@ -684,12 +910,12 @@ def test_initialize_xau_pool():
 
 #@@@@@@@@@@@@@@@@@@@@@@@@@@@@@\  XAU Long Short (-200, 400)  /@@@@@@@@@@@@@@@@@@@@@@@@@@@@@#
 
-def test_initialize_xau_pool():
+def test_initialize_xau_pool(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     feed_eth = 1300_00000000
     assert xau_usd_price_feed.decimals() == 18 
     xau_ls_pool_id = 0
@@ -727,7 +953,7 @@ def test_initialize_xau_pool():
     assert gwin_protocol.retrieveCurrentPrice(xau_ls_pool_id, {"from": account}) == 85000000
     assert gwin_protocol.getProfit(xau_ls_pool_id, 85000000) == 46153846153
 
-def test_everyone_withdraws():
+def test_everyone_withdraws(protocol_in_use):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -736,7 +962,7 @@ def test_everyone_withdraws():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_mock_protocol_in_use()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
     
     valOne, valTwo = gwin_protocol.simulateInteract.call(0, 300_00000000)
     # test_value = gwin_protocol.simulateInteract.call(0, 300_00000000)
@@ -764,7 +990,9 @@ def test_everyone_withdraws():
     assert rounded(gwin_protocol.retrieveHEthBalance.call(0, account.address, {"from": account})) == 0 # hEth for account
     assert gwin_protocol.retrieveHEthPercentBalance.call(0, account.address, {"from": account}) == 0 # hEth % for account 
 
-    assert gwin_protocol.retrieveAddressAtIndex.call(0, 0, {"from": account}) == account.address
+    # account is fully withdrawn and swapped out of the stakers array, Bob's liquidated position remains until he interacts
+    assert gwin_protocol.retrieveAddressAtIndex.call(0, 0, {"from": account}) == non_owner_two.address
+    assert gwin_protocol.retrieveEthStakersLength.call(0, {"from": account}) == 1
 
     assert rounded(gwin_protocol.retrieveCEthBalance.call(0, non_owner.address, {"from": account})) == 0 # cEth for non_owner
     assert gwin_protocol.retrieveCEthPercentBalance.call(0, non_owner.address, {"from": account}) == 0 # cEth % non_owner
@@ -776,13 +1004,79 @@ def test_everyone_withdraws():
     assert rounded(gwin_protocol.retrieveHEthBalance.call(0, non_owner_two.address, {"from": account})) == 0 # hEth for non_owner_two
     assert gwin_protocol.retrieveHEthPercentBalance.call(0, non_owner_two.address, {"from": account}) == 0 # hEth % for non_owner_two
 
-def test_zero_price_change_full_withdrawal():
+def test_withdrawn_stakers_are_removed(protocol_in_use):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol 
+    non_owner = get_account(index=1) # Alice
+    non_owner_two = get_account(index=2) # Bob
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = protocol_in_use
+    # Alice withdrew all during deployment, so only the protocol and Bob remain
+    assert gwin_protocol.retrieveEthStakersLength.call(0, {"from": account}) == 2
+    assert gwin_protocol.retrieveAddressAtIndex.call(0, 0, {"from": account}) == account.address
+    assert gwin_protocol.retrieveAddressAtIndex.call(0, 1, {"from": account}) == non_owner_two.address
+    assert gwin_protocol.isUniqueEthStaker(0, non_owner.address) == False
+
+    # Act
+    #              WITHDRAWAL              isCooled, isHeated, cAmount, hAmount {from, msg.value}
+    tx = gwin_protocol.withdrawFromTranche(0, False, True, 0, 0, True, {"from": non_owner_two})
+    tx.wait(1)
+    # Assert
+    assert gwin_protocol.retrieveEthStakersLength.call(0, {"from": account}) == 1
+    assert gwin_protocol.isUniqueEthStaker(0, non_owner_two.address) == False
+
+    # Act
+    tx = gwin_protocol.depositToTranche(0, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    tx.wait(1)
+    # Assert
+    assert gwin_protocol.retrieveEthStakersLength.call(0, {"from": account}) == 2
+    assert gwin_protocol.retrieveAddressAtIndex.call(0, 1, {"from": account}) == non_owner.address
+    assert gwin_protocol.ethStakerIndex(0, non_owner.address) == 1
+
+def test_parent_stakers_are_tracked_apart_from_child_stakers(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account() # Protocol
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    # two child pools of parent 1
+    for h_rate in [100_0000000000, 300_0000000000]:
+        gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, h_rate, {"from": account, "value": Web3.toWei(10, "ether")})
+    # Alice is cooled with the parent through pool 0 and heated in pool 1
+    gwin_protocol.depositToTranche(0, True, False, Web3.toWei(2, "ether"), 0, {"from": non_owner, "value": Web3.toWei(2, "ether")})
+    gwin_protocol.depositToTranche(1, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    assert gwin_protocol.isUniqueEthStaker(0, non_owner.address) == False
+    assert gwin_protocol.isUniqueEthStaker(1, non_owner.address) == True
+    assert gwin_protocol.retrieveParentEthStakersLength(1) == 2
+    assert gwin_protocol.parentEthStakers(1, 1) == non_owner.address
+
+    # Act
+    #              WITHDRAWAL              isCooled, isHeated, cAmount, hAmount {from, msg.value}
+    tx = gwin_protocol.withdrawFromTranche(1, False, True, 0, 0, True, {"from": non_owner})
+    tx.wait(1)
+    # Assert
+    # out of pool 1 once its heated shares are gone, still a staker of the parent
+    assert gwin_protocol.isUniqueEthStaker(1, non_owner.address) == False
+    assert gwin_protocol.retrieveEthStakersLength(1) == 1
+    assert gwin_protocol.isUniqueParentEthStaker(1, non_owner.address) == True
+
+    # Act
+    tx = gwin_protocol.withdrawFromTranche(1, True, False, 0, 0, True, {"from": non_owner})
+    tx.wait(1)
+    # Assert
+    assert gwin_protocol.isUniqueParentEthStaker(1, non_owner.address) == False
+    assert gwin_protocol.retrieveParentEthStakersLength(1) == 1
+    assert gwin_protocol.parentEthStakers(1, 0) == account.address
+
+def test_zero_price_change_full_withdrawal(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -810,14 +1104,14 @@ def test_zero_price_change_full_withdrawal():
     assert gwin_protocol.retrieveHEthBalance.call(0, account.address, {"from": account}) == 0 # hEth for account
     assert gwin_protocol.retrieveCurrentPrice(0, {"from": account}) == 1000_00000000 
 
-def test_full_withdrawal_then_both_pools_have_balances_in_interact_via_deposit():
+def test_full_withdrawal_then_both_pools_have_balances_in_interact_via_deposit(gwin_deployment):
     # Testing the bothPoolsHaveBalance() check in the interact function
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     pool_id = 0
@@ -866,7 +1160,7 @@ def test_full_withdrawal_then_both_pools_have_balances_in_interact_via_deposit()
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_zero_price_change_partial_heated_withdrawal():
+def test_zero_price_change_partial_heated_withdrawal(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -875,7 +1169,7 @@ def test_zero_price_change_partial_heated_withdrawal():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     pool_id = 0
@@ -925,7 +1219,7 @@ def test_zero_price_change_partial_heated_withdrawal():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_withdraw_not_all_with_zero_amounts():
+def test_withdraw_not_all_with_zero_amounts(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -934,7 +1228,7 @@ def test_withdraw_not_all_with_zero_amounts():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     pool_id = 0
@@ -972,7 +1266,7 @@ def test_withdraw_not_all_with_zero_amounts():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_neither_heated_nor_cooled_withdraw():
+def test_neither_heated_nor_cooled_withdraw(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -981,7 +1275,7 @@ def test_neither_heated_nor_cooled_withdraw():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     pool_id = 0
@@ -1019,7 +1313,7 @@ def test_neither_heated_nor_cooled_withdraw():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_deposit_with_partial_msg_value():
+def test_deposit_with_partial_msg_value(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -1028,7 +1322,7 @@ def test_deposit_with_partial_msg_value():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     pool_id = 0
@@ -1066,7 +1360,7 @@ def test_deposit_with_partial_msg_value():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_deposit_with_zero_msg_value():
+def test_deposit_with_zero_msg_value(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -1075,7 +1369,7 @@ def test_deposit_with_zero_msg_value():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     pool_id = 0
@@ -1113,7 +1407,7 @@ def test_deposit_with_zero_msg_value():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_deposit_to_uninitialized_pool():
+def test_deposit_to_uninitialized_pool(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -1122,7 +1416,7 @@ def test_deposit_to_uninitialized_pool():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     pool_id = 100
 
     # Act - Expecting revert with deposit to uninitialized pool
@@ -1140,7 +1434,7 @@ def test_deposit_to_uninitialized_pool():
     assert gwin_protocol.retrieveCEthBalance.call(pool_id, account.address, {"from": account}) == 0 # cEth for account
     assert gwin_protocol.retrieveHEthBalance.call(pool_id, account.address, {"from": account}) == 0 # hEth for account
 
-def test_deposit_with_neither_cooled_nor_heated():
+def test_deposit_with_neither_cooled_nor_heated(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -1149,7 +1443,7 @@ def test_deposit_with_neither_cooled_nor_heated():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     pool_id = 0
@@ -1187,7 +1481,7 @@ def test_deposit_with_neither_cooled_nor_heated():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_deposit_and_test_get_all_pools():
+def test_deposit_and_test_get_all_pools(gwin_deployment):
     # Check get all pools to make sure it returns expected values
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
@@ -1197,7 +1491,7 @@ def test_deposit_and_test_get_all_pools():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     pool_id = 0
@@ -1253,7 +1547,47 @@ def test_deposit_and_test_get_all_pools():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_can_withdraw_all_after_all_heated():
+def test_get_pools_with_balances_pages_and_selects_fields(gwin_deployment):
+    # Check the paginated getter matches getAllPoolsWithBalances and only fills the requested fields
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    non_owner = get_account(index=1) # Alice
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 100_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 400_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    gwin_protocol.depositToTranche(0, False, True, 0, Web3.toWei(1, "ether"), {"from": non_owner, "value": Web3.toWei(1, "ether")})
+    eth_usd_price_feed.updateAnswer(1100_00000000, {"from": account})
+    all_fields = gwin_protocol.allFields()
+
+    # Act
+    all_pools = gwin_protocol.getAllPoolsWithBalances.call(non_owner.address, {"from": account})
+    first_page = gwin_protocol.getPoolsWithBalances.call(non_owner.address, 0, 2, all_fields, {"from": account})
+    second_page = gwin_protocol.getPoolsWithBalances.call(non_owner.address, 2, 2, all_fields, {"from": account})
+    past_end = gwin_protocol.getPoolsWithBalances.call(non_owner.address, 3, 2, all_fields, {"from": account})
+    price_only = gwin_protocol.getPoolsWithBalances.call(non_owner.address, 0, 3, gwin_protocol.currentPriceField(), {"from": account})
+    previews_only = gwin_protocol.getPoolsWithBalances.call(non_owner.address, 0, 3, gwin_protocol.balancePreviewField(), {"from": account})
+
+    # Assert
+    assert len(all_pools) == 3
+    assert list(first_page) + list(second_page) == list(all_pools)
+    assert len(past_end) == 0
+    for i in range(3):
+        assert price_only[i][0] == all_pools[i][0]
+        assert price_only[i][3] == 1100_00000000 # current price
+        assert price_only[i][10] == 0 and price_only[i][11] == 0 # health not filled
+        assert price_only[i][13] == 0 and price_only[i][14] == 0 # previews not filled
+        assert previews_only[i][3] == 0 # current price not filled
+        assert previews_only[i][13] == all_pools[i][13] # cEth preview
+        assert previews_only[i][14] == all_pools[i][14] # hEth preview
+        assert previews_only[i][15] == 0 and previews_only[i][16] == 0 # user previews not filled
+    assert all_pools[0][16] == gwin_protocol.previewUserHEthBalance(0, non_owner.address, {"from": account})
+    assert all_pools[0][10] == gwin_protocol.getPoolHealth(0, False, {"from": account})
+    assert all_pools[0][11] == gwin_protocol.getPoolHealth(0, True, {"from": account})
+
+def test_can_withdraw_all_after_all_heated(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -1262,7 +1596,7 @@ def test_can_withdraw_all_after_all_heated():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
 
     parent_id = 1
@@ -1571,14 +1905,14 @@ def test_can_withdraw_all_after_all_heated():
     # Ensure dust is less that $0.01
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) < 9000000000000 # total in protocol
 
-def test_both_pools_have_balances_is_false():
+def test_both_pools_have_balances_is_false(gwin_deployment):
     # Heated is zero and Cooled is zero
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -1601,14 +1935,14 @@ def test_both_pools_have_balances_is_false():
     # Assert
     assert gwin_protocol.bothPoolsHaveBalance.call(0) == False
 
-def test_both_pools_have_balances():
+def test_both_pools_have_balances(gwin_deployment):
     # Heated is positive and Cooled is positive
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -1631,13 +1965,13 @@ def test_both_pools_have_balances():
     tx = gwin_protocol.withdrawFromTranche(0, False, True, 0, 0, True, {"from": account})
     tx.wait(1)
 
-def test_both_pools_have_balances_after_price_change():
+def test_both_pools_have_balances_after_price_change(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -1678,14 +2012,14 @@ def test_both_pools_have_balances_after_price_change():
     # Ensure dust is less that $0.01
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) < 9000000000000 # total in protocol
 
-def test_both_pools_have_balances_heated_zeroed():
+def test_both_pools_have_balances_heated_zeroed(gwin_deployment):
     # Heated is positive and Cooled is zero
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -1711,14 +2045,14 @@ def test_both_pools_have_balances_heated_zeroed():
     tx = gwin_protocol.withdrawFromTranche(0, False, True, 0, 0, True, {"from": account})
     tx.wait(1)
 
-def test_both_pools_have_balances_cooled_zeroed():
+def test_both_pools_have_balances_cooled_zeroed(gwin_deployment):
     # Heated is zero and Cooled is positive
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -1744,14 +2078,14 @@ def test_both_pools_have_balances_cooled_zeroed():
     tx = gwin_protocol.withdrawFromTranche(0, True, False, 0, 0, True, {"from": account})
     tx.wait(1)
 
-def test_withdraw_all():
+def test_withdraw_all(gwin_deployment):
     # Heated is zero and Cooled is positive
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -1779,14 +2113,14 @@ def test_withdraw_all():
     assert gwin_protocol.retrieveHEthBalance.call(0, account.address, {"from": account}) == 0 # hEth for account
 
 
-def test_dual_deposit():
+def test_dual_deposit(gwin_deployment):
     # Heated is zero and Cooled is positive
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     non_owner = get_account(index=1)
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
     parent_id = 0
     gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
@@ -1827,7 +2161,7 @@ def test_dual_deposit():
     assert gwin_protocol.retrieveCEthBalance.call(0, account.address, {"from": account}) == 0 # cEth for account
     assert gwin_protocol.retrieveHEthBalance.call(0, account.address, {"from": account}) == 0 # hEth for account
 
-def test_ceth_needed_for_zeroed_parent():
+def test_ceth_needed_for_zeroed_parent(gwin_deployment):
     # Set up parent pool, withdraw, and then do dual deposit
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
@@ -1837,7 +2171,7 @@ def test_ceth_needed_for_zeroed_parent():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
 
     parent_id = 1
@@ -2089,7 +2423,7 @@ def test_ceth_needed_for_zeroed_parent():
 
     assert gwin_protocol.cEthNeededForPools.call(pool_2x_id, {"from": account}) == 1_000000000000000000
 
-def test_dual_deposit_with_parent():
+def test_dual_deposit_with_parent(gwin_deployment):
     # Set up parent pool, withdraw, and then do dual deposit
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
@@ -2099,7 +2433,7 @@ def test_dual_deposit_with_parent():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
 
     parent_id = 1
@@ -2426,7 +2760,7 @@ def test_dual_deposit_with_parent():
     assert gwin_protocol.retrieveCEthBalance.call(pool_2x_id, account.address, {"from": account}) == 0 # cEth for account
     assert gwin_protocol.retrieveHEthBalance.call(pool_2x_id, account.address, {"from": account}) == 0 # hEth for account
 
-def test_cooled_deposit_to_parent():
+def test_cooled_deposit_to_parent(gwin_deployment):
     # Set up parent pool, withdraw, and then do cooled deposit
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
@@ -2436,7 +2770,7 @@ def test_cooled_deposit_to_parent():
     non_owner_two = get_account(index=2) # Bob
     non_owner_three = get_account(index=3) # Chris
     non_owner_four = get_account(index=4) # Dan
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act
 
     parent_id = 1
@@ -2680,42 +3014,42 @@ def test_cooled_deposit_to_parent():
     assert gwin_protocol.retrieveCEthBalance.call(pool_2x_id, account.address, {"from": account}) == 0 # cEth for account
     assert gwin_protocol.retrieveHEthBalance.call(pool_2x_id, account.address, {"from": account}) == 0 # hEth for account
 
-def test_get_derived_price_rejects_too_many_decimals():
+def test_get_derived_price_rejects_too_many_decimals(gwin_deployment):
     # Arrange
     usdDecimalsUint = 20 # The protocol base decimals in uint form
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account() # Protocol 
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     test_price_feed = get_contract("test_price_feed")
     # Act / Assert - does revert
     with brownie.reverts("Invalid_decimals"):
         gwin_protocol.getDerivedPrice(eth_usd_price_feed.address, test_price_feed.address, usdDecimalsUint)
 
-def test_get_derived_price_rejects_zero_decimals():
+def test_get_derived_price_rejects_zero_decimals(gwin_deployment):
     # Arrange
     usdDecimalsUint = 0 # The protocol base decimals in uint form
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account() # Protocol 
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     test_price_feed = get_contract("test_price_feed")
     # Act / Assert - does revert
     with brownie.reverts("Invalid_decimals"):
         gwin_protocol.getDerivedPrice(eth_usd_price_feed.address, test_price_feed.address, usdDecimalsUint)
 
-def test_get_derived_price_accepts_proper_decimals():
+def test_get_derived_price_accepts_proper_decimals(gwin_deployment):
     # Arrange
     usdDecimalsUint = 8 # The protocol base decimals in uint form
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account() # Protocol 
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     test_price_feed = get_contract("test_price_feed")
     # Act / Assert 
     assert gwin_protocol.getDerivedPrice(eth_usd_price_feed.address, xau_usd_price_feed.address, usdDecimalsUint) == 62500000
 
-def test_retrieve_current_price_with_feed_decimals_greater_than_usd_decimals():
+def test_retrieve_current_price_with_feed_decimals_greater_than_usd_decimals(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
@@ -2723,7 +3057,7 @@ def test_retrieve_current_price_with_feed_decimals_greater_than_usd_decimals():
     account = get_account()
     parent_id = 0
     pool_id = 0
-    tx = gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    tx = gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     tx = gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", test_price_feed.address, "0x544553542f555344", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
     # Act / Assert 
     assert gwin_protocol.retrieveCurrentPrice(pool_id) == 1_00000000
@@ -2732,14 +3066,14 @@ def test_retrieve_current_price_with_feed_decimals_greater_than_usd_decimals():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_retrieve_current_price_with_feed_decimals_less_than_usd_decimals():
+def test_retrieve_current_price_with_feed_decimals_less_than_usd_decimals(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account()
     parent_id = 0
     pool_id = 0
-    tx = gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    tx = gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     tx = gwin_protocol.initializePool(0, parent_id, eth_usd_price_feed.address, "0x455448", btc_usd_price_feed.address, "0x4254432f555344", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
     # Act / Assert 
     assert gwin_protocol.retrieveCurrentPrice(pool_id) == 6250000
@@ -2748,13 +3082,13 @@ def test_retrieve_current_price_with_feed_decimals_less_than_usd_decimals():
 
     assert rounded(gwin_protocol.retrieveEthInContract({"from": account})) == 0 # total in protocol
 
-def test_retrieve_current_price_on_non_initialized_pool_reverts():
+def test_retrieve_current_price_on_non_initialized_pool_reverts(gwin_deployment):
     # Arrange
     if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
         pytest.skip("Only for local testing!")
     account = get_account() # Protocol
     pool_id = 100
-    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = deploy_gwin_protocol_and_gwin_token()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
     # Act / Assert - does revert
     with brownie.reverts("Pool_Is_Not_Initialized"):
         gwin_protocol.retrieveCurrentPrice(pool_id)
\ No newline at end of file
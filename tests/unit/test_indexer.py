@@ -0,0 +1,65 @@
+from brownie import chain, network, web3
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account
+from scripts.indexer import Indexer, cooled_balance_history, parent_cooled_balance_history
+from scripts.settlement_engine import POOL_STRUCT_FIELDS
+from web3 import Web3
+import pytest
+
+# NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
+
+def latest_balances(history):
+    # the last balance of each user in a (block_number, timestamp, user, balance) history
+    return {user: balance for block_number, timestamp, user, balance in history}
+
+def test_indexer_matches_pool_state(gwin_deployment, tmp_path):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    non_owner = get_account(index=1)
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    from_block = chain.height + 1
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(10, "ether")})
+    gwin_protocol.depositToTranche(0, True, False, Web3.toWei(3, "ether"), 0, {"from": non_owner, "value": Web3.toWei(3, "ether")})
+    eth_usd_price_feed.updateAnswer(1200_00000000, {"from": account})
+    gwin_protocol.settlePools([0], {"from": non_owner})
+    # Act
+    indexer = Indexer(gwin_protocol, web3, str(tmp_path / "gwin_index.db"), from_block)
+    last_block = indexer.index()
+    # Assert
+    assert last_block == chain.height
+    pool = dict(zip(POOL_STRUCT_FIELDS, gwin_protocol.pool(0)))
+    assert indexer.db.execute(
+        "SELECT last_settled_usd_price, c_eth_bal, h_eth_bal FROM pool_state WHERE pool_id = 0 ORDER BY block_number DESC LIMIT 1"
+    ).fetchone() == (pool["last_settled_usd_price"], str(pool["c_eth_bal"]), str(pool["h_eth_bal"]))
+    balances = latest_balances(cooled_balance_history(indexer.db, 0))
+    assert balances[account.address] == gwin_protocol.retrieveCEthBalance(0, account.address)
+    assert balances[non_owner.address] == gwin_protocol.retrieveCEthBalance(0, non_owner.address)
+
+def test_indexer_resumes_from_checkpoint(gwin_deployment, tmp_path):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    non_owner = get_account(index=1)
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    db_path = str(tmp_path / "gwin_index.db")
+    from_block = chain.height + 1
+    for h_rate in [100_0000000000, 300_0000000000]:
+        gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, h_rate, {"from": account, "value": Web3.toWei(10, "ether")})
+    first_checkpoint = Indexer(gwin_protocol, web3, db_path, from_block).index()
+    # Act
+    gwin_protocol.depositToTranche(1, True, False, Web3.toWei(4, "ether"), 0, {"from": non_owner, "value": Web3.toWei(4, "ether")})
+    indexer = Indexer(gwin_protocol, web3, db_path, from_block)
+    resumed_from = indexer.last_block
+    indexer.index()
+    # Assert
+    assert resumed_from == first_checkpoint
+    assert indexer.db.execute("SELECT MIN(block_number) FROM blocks").fetchone()[0] >= from_block
+    assert indexer.db.execute("SELECT COUNT(*) FROM blocks WHERE block_number > ?", (first_checkpoint,)).fetchone()[0] == 1
+    assert indexer.db.execute(
+        "SELECT c_eth_bal FROM parent_pool_state WHERE parent_id = 1 ORDER BY block_number DESC LIMIT 1"
+    ).fetchone() == (str(gwin_protocol.getParentPoolCEthBalance(1)),)
+    balances = latest_balances(parent_cooled_balance_history(indexer.db, 1))
+    assert balances[non_owner.address] == gwin_protocol.getParentUserCEthBalance(1, non_owner.address)
+    assert balances[account.address] == gwin_protocol.getParentUserCEthBalance(1, account.address)
@@ -0,0 +1,69 @@
+from brownie import chain, network, web3
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account, listen_for_event
+from scripts.log_streamer import LogStreamer
+from web3 import Web3
+import asyncio
+import pytest
+
+# NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
+
+def collect(streamer, to_block):
+    async def stream():
+        return [event async for event in streamer.stream(to_block)]
+    return asyncio.run(stream())
+
+def test_log_streamer_catches_up_across_contracts(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    non_owner = get_account(index=1)
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    from_block = chain.height + 1
+    gwin_ERC20.transfer(non_owner, Web3.toWei(1, "ether"), {"from": account})
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(10, "ether")})
+    gwin_protocol.depositToTranche(0, True, False, Web3.toWei(2, "ether"), 0, {"from": non_owner, "value": Web3.toWei(2, "ether")})
+    # a page per block, so the catch up takes several eth_getLogs requests
+    streamer = LogStreamer(web3, from_block=from_block, page_size=1, poll_interval=0)
+    streamer.watch(gwin_protocol, ["PoolInitialized", "Deposit"]).watch(gwin_ERC20, ["Transfer"])
+    # Act
+    events = collect(streamer, chain.height)
+    # Assert
+    assert [event.event for event in events] == ["Transfer", "PoolInitialized", "Deposit"]
+    assert events[0].args["value"] == Web3.toWei(1, "ether")
+    assert events[2].args["poolId"] == 0
+    assert events[2].args["user"] == non_owner.address
+    assert events[2].args["cAmount"] == Web3.toWei(2, "ether")
+    assert not any(event.removed for event in events)
+
+def test_log_streamer_yields_removed_events_after_reorg(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    streamer = LogStreamer(web3, from_block=chain.height + 1, poll_interval=0).watch(gwin_protocol, ["PoolInitialized"])
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(10, "ether")})
+    first_events = collect(streamer, chain.height)
+    # Act
+    # replace the block holding the first pool with one holding a different pool
+    chain.undo()
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 100_0000000000, {"from": account, "value": Web3.toWei(4, "ether")})
+    events = collect(streamer, chain.height)
+    # Assert
+    assert first_events[0].args["cRate"] == -50_0000000000
+    assert [(event.removed, event.args["cRate"]) for event in events] == [(True, -50_0000000000), (False, -100_0000000000)]
+    assert events[0].block_number == events[1].block_number
+    assert events[0].block_hash != events[1].block_hash
+
+def test_listen_for_event_blocks_inside_running_loop(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    async def caller():
+        return listen_for_event(gwin_protocol, "PoolInitialized", timeout=1, poll_interval=0)
+    # Act
+    event_response = asyncio.run(caller())
+    # Assert
+    assert event_response == {"event": None}
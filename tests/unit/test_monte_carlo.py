@@ -0,0 +1,46 @@
+from scripts import settlement_engine
+import json
+import pytest
+
+np = pytest.importorskip("numpy")
+from scripts import monte_carlo
+
+
+def test_simulated_paths_match_settlement_engine():
+    # Arrange
+    config = monte_carlo.PoolConfig(0, -50_0000000000, 50_0000000000, 8.0, 12.0, 1000.0)
+    price_paths = monte_carlo.gbm_paths(config.price, 20, 60, sigma=2.0, seed=1)
+    # Act
+    result = monte_carlo.simulate_pool_paths(config, price_paths, settle_every=3)
+    # Assert
+    for path in range(20):
+        pool = settlement_engine.Pool(0, 0, -50_0000000000, 50_0000000000, 8 * 10**18, 12 * 10**18, 1000_00000000)
+        for step in range(2, 60, 3):
+            settlement_engine.settle(pool, int(round(price_paths[path, step] * 10**8)))
+        assert result.c_eth_bals[path] == pytest.approx(pool.c_eth_bal / 10**18, rel=1e-9)
+        assert result.h_eth_bals[path] == pytest.approx(pool.h_eth_bal / 10**18, rel=1e-9)
+
+def test_simulate_reports_liquidations_across_workers():
+    # Arrange
+    config = monte_carlo.PoolConfig(0, -100_0000000000, 900_0000000000, 8.0, 12.0, 1000.0)
+    # Act
+    result = monte_carlo.simulate(config, "jump", paths=200, steps=100, seed=7, workers=2, sigma=3.0)
+    summary = monte_carlo.summarize(result)
+    # Assert
+    assert summary["paths"] == 200
+    assert 0 < summary["heated_liquidation_probability"] < 1
+    assert np.all(result.c_eth_bals >= 0) and np.all(result.h_eth_bals >= 0)
+
+@pytest.mark.parametrize("generator", sorted(monte_carlo.PATH_GENERATORS))
+def test_main_reports_each_generator(generator, tmp_path):
+    # Arrange
+    history = tmp_path / "prices.csv"
+    history.write_text("eth_usd_price_feed,xau_usd_price_feed\n" + "".join(f"{1000 + 10 * (step % 7)},1800\n" for step in range(50)))
+    output = tmp_path / "monte_carlo.json"
+    # Act
+    monte_carlo.main(str(output), generator, 50, 100, str(history))
+    # Assert
+    report = json.loads(output.read_text())
+    assert report["generator"] == generator
+    assert sorted(report["settle_every"]) == ["1", "10", "100"]
+    assert all(summary["paths"] == 50 for summary in report["settle_every"].values())
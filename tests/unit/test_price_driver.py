@@ -0,0 +1,34 @@
+from brownie import network
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account
+from scripts.price_driver import build_scenario, drive_prices
+import pytest
+
+# NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
+
+def test_step_scenario_moves_derived_prices(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    price_feeds = {
+        "eth_usd_price_feed": eth_usd_price_feed,
+        "xau_usd_price_feed": xau_usd_price_feed,
+        "btc_usd_price_feed": btc_usd_price_feed,
+        "jpy_usd_price_feed": jpy_usd_price_feed,
+    }
+    quote_feeds = [xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed]
+
+    def derived_prices():
+        return [gwin_protocol.getDerivedPrice(eth_usd_price_feed.address, quote_feed.address, 8) for quote_feed in quote_feeds]
+
+    start = derived_prices()
+    history = []
+    # Act
+    ticks = drive_prices(price_feeds, build_scenario(price_feeds, "step", ticks=5), account, on_tick=lambda tick, answers: history.append(derived_prices()))
+    # Assert
+    # ETH/XAU, ETH/BTC and ETH/JPY each move on every tick
+    assert ticks == 5
+    for before, after in zip([start] + history, history):
+        for before_price, after_price in zip(before, after):
+            assert after_price != before_price
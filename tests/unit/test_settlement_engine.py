@@ -0,0 +1,137 @@
+from brownie import network
+from scripts.helpful_scripts import LOCAL_BLOCKCHAIN_ENVIRONMENTS, get_account
+from scripts.deploy import deploy_gwin_protocol_and_gwin_token
+from scripts import settlement_engine
+from web3 import Web3
+import pytest
+
+# NOTE: If you start a new instance of Ganache etc., be sure to delete the previous deployments in the build folder
+
+def test_engine_matches_simulate_interact(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    non_owner = get_account(index=1)
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    # classic and modified pools, the classic pool unevenly weighted by a deposit
+    gwin_protocol.initializePool(0, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -50_0000000000, 50_0000000000, {"from": account, "value": Web3.toWei(20, "ether")})
+    gwin_protocol.initializePool(1, 0, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 300_0000000000, {"from": account, "value": Web3.toWei(10, "ether")})
+    gwin_protocol.depositToTranche(0, False, True, 0, Web3.toWei(3, "ether"), {"from": non_owner, "value": Web3.toWei(3, "ether")})
+    # Act / Assert
+    for pool_id in [0, 1]:
+        pool = settlement_engine.pool_from_struct(gwin_protocol.pool(pool_id))
+        for price in [300_00000000, 700_00000000, 999_99999999, 1000_00000001, 1300_00000000, 2500_00000000]:
+            assert settlement_engine.simulate_pool(pool, price) == tuple(gwin_protocol.simulateInteract(pool_id, price))
+
+def test_engine_matches_child_pool_settlement(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    non_owner = get_account(index=1)
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    parent = settlement_engine.ParentPool(1)
+    for pool_id, h_rate in enumerate([100_0000000000, 400_0000000000, 900_0000000000]):
+        gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, h_rate, {"from": account, "value": Web3.toWei(10, "ether")})
+        settlement_engine.initialize_pool(pool_id, 0, -100_0000000000, h_rate, Web3.toWei(10, "ether"), 1000_00000000, parent)
+    gwin_protocol.depositToTranche(2, False, True, 0, Web3.toWei(2, "ether"), {"from": non_owner, "value": Web3.toWei(2, "ether")})
+    engine_pool = parent.children[2]
+    engine_pool.h_eth_bal += Web3.toWei(2, "ether")
+    parent.h_eth_bal += Web3.toWei(2, "ether")
+    settlement_engine.re_adjust_child_pools(engine_pool)
+    # Act
+    for price in [1250_00000000, 800_00000000]:
+        eth_usd_price_feed.updateAnswer(price, {"from": account})
+        gwin_protocol.settlePools([0], {"from": non_owner})
+        settlement_engine.settle_pools([parent.children[0]], price)
+        # Assert
+        for child in parent.children:
+            assert settlement_engine.pool_from_struct(gwin_protocol.pool(child.id)) == child
+        assert gwin_protocol.getParentPoolCEthBalance(0) == parent.c_eth_bal
+        assert gwin_protocol.cEthNeededForPools(0) == parent.c_eth_needed
+
+def test_sdiv_truncates_toward_zero():
+    # Act / Assert
+    assert settlement_engine.sdiv(7, 2) == 3
+    assert settlement_engine.sdiv(-7, 2) == -3 # floor division would give -4
+    assert settlement_engine.sdiv(7, -2) == -3
+    assert settlement_engine.sdiv(-7, -2) == 3
+    with pytest.raises(settlement_engine.SolidityRevert):
+        settlement_engine.sdiv(1, 0)
+
+def test_to_uint_reverts_on_negative_values():
+    # Act / Assert
+    assert settlement_engine.to_uint(0) == 0
+    assert settlement_engine.to_uint(5) == 5
+    with pytest.raises(settlement_engine.SolidityRevert):
+        settlement_engine.to_uint(-1)
+
+def test_profit_truncates_toward_zero():
+    # Act / Assert
+    # a one unit move on a price of 3_00000000 is a profit of -3333.33..., which truncates to -3333, not -3334
+    assert settlement_engine.profit_at_price(3_00000000, 2_99999999) == -3333
+    assert settlement_engine.profit_at_price(3_00000000, 3_00000001) == 3333
+
+def test_settle_known_vector():
+    # Arrange
+    # 20 ETH in a classic -50% / +50% pool is split 10 / 10 at $1000
+    pool = settlement_engine.initialize_pool(0, 0, -50_0000000000, 50_0000000000, 20 * 10**18, 1000_00000000)
+    # Act
+    settled = settlement_engine.settle(pool, 1200_00000000)
+    # Assert
+    # +20% makes $10000 of heated worth $13000 and $10000 of cooled worth $11000, in ETH at $1200
+    assert settled == True
+    assert (pool.h_eth_bal, pool.c_eth_bal) == (10_833333333333333333, 9_166666666666666666)
+    assert pool.last_settled_usd_price == 1200_00000000
+    # -20% from $1000 makes the heated tranche worth $7000 and the cooled tranche worth $9000, in ETH at $800
+    pool = settlement_engine.initialize_pool(0, 0, -50_0000000000, 50_0000000000, 20 * 10**18, 1000_00000000)
+    assert settlement_engine.simulate_pool(pool, 800_00000000) == (8_750000000000000000, 11_250000000000000000)
+
+def test_engine_matches_child_pool_added_after_price_change(gwin_deployment):
+    # Arrange
+    if network.show_active() not in LOCAL_BLOCKCHAIN_ENVIRONMENTS:
+        pytest.skip("Only for local testing!")
+    account = get_account()
+    gwin_protocol, gwin_ERC20, eth_usd_price_feed, xau_usd_price_feed, btc_usd_price_feed, jpy_usd_price_feed = gwin_deployment
+    parent = settlement_engine.ParentPool(1)
+    for pool_id, h_rate in enumerate([100_0000000000, 400_0000000000]):
+        gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, h_rate, {"from": account, "value": Web3.toWei(10, "ether")})
+        settlement_engine.initialize_pool(pool_id, 0, -100_0000000000, h_rate, Web3.toWei(10, "ether"), 1000_00000000, parent, account.address)
+    eth_usd_price_feed.updateAnswer(1250_00000000, {"from": account})
+    # Act
+    # the existing child pools settle at the new price before the cooled shares of the new pool are issued
+    gwin_protocol.initializePool(0, 1, eth_usd_price_feed.address, "0x455448", "0x0000000000000000000000000000000000000000", "0x0", -100_0000000000, 900_0000000000, {"from": account, "value": Web3.toWei(10, "ether")})
+    settlement_engine.initialize_pool(2, 0, -100_0000000000, 900_0000000000, Web3.toWei(10, "ether"), 1250_00000000, parent, account.address)
+    # Assert
+    for child in parent.children:
+        assert settlement_engine.pool_from_struct(gwin_protocol.pool(child.id)) == child
+    c_eth_bal, h_eth_bal, c_shares, c_epoch, c_eth_needed = gwin_protocol.parentPoolBal(1)
+    assert (c_eth_bal, h_eth_bal, c_eth_needed) == (parent.c_eth_bal, parent.h_eth_bal, parent.c_eth_needed)
+    assert (c_shares, c_epoch) == (parent.c_shares.total, parent.c_shares.epoch)
+    assert gwin_protocol.ethStakedWithParent(1, account.address)[0] == parent.c_shares.user_shares(account.address)
+
+def test_share_accounting():
+    # Arrange
+    tranche = settlement_engine.TrancheShares()
+    bal = 0
+    # Act / Assert
+    # the first deposit issues shares 1:1, later deposits at the balance after a settlement
+    assert settlement_engine.issue_shares(tranche, "alice", 10 * 10**18, bal) == 10 * 10**18
+    bal = 20 * 10**18 # the tranche doubled in a settlement
+    assert settlement_engine.issue_shares(tranche, "bob", 10 * 10**18, bal) == 5 * 10**18
+    bal += 10 * 10**18
+    assert settlement_engine.share_of_balance(bal, tranche.user_shares("alice"), tranche.total) == 20 * 10**18
+    assert settlement_engine.share_of_balance(bal, tranche.user_shares("bob"), tranche.total) == 10 * 10**18
+    # withdrawals round the burned shares up
+    assert settlement_engine.burn_shares(tranche, "bob", 1, bal) == 1
+    bal -= 1
+    with pytest.raises(settlement_engine.SolidityRevert):
+        settlement_engine.burn_shares(tranche, "bob", 10 * 10**18, bal)
+    assert settlement_engine.burn_shares(tranche, "bob", 0, bal, is_all=True) == 5 * 10**18 - 1
+    # a liquidation cancels every share, and a new deposit starts over at 1:1
+    assert settlement_engine.liquidate_if_zero(tranche, 0) == True
+    assert tranche.user_shares("alice") == 0
+    assert settlement_engine.share_of_balance(bal, 10 * 10**18, tranche.total, 0, tranche.epoch) == 0
+    assert settlement_engine.issue_shares(tranche, "bob", 10**18, 0) == 10**18
+    assert tranche.total == 10**18